@@ -0,0 +1,403 @@
+"""Local HTTP/JSON API over the Student Management System use cases.
+
+Started with `sms serve`. Only the standard library is used: every HTTP/1.1
+keep-alive connection gets its own thread, and each request borrows one of a
+bounded pool of StudentManagementSystem instances (one SQLite connection each)
+for its duration.
+"""
+import json
+import queue
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+class AppPool:
+    """Fixed pool of StudentManagementSystem instances, each owning one SQLite connection.
+
+    A worker borrows an instance for one request, so connections are never shared
+    between threads at the same time.
+    """
+
+    def __init__(self, app_class, db_name, size, timeout=30):
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._all = []
+        refresher = None  # one background timetable rebuilder for the whole pool
+        for _ in range(size):
+            app = app_class(db_name, check_same_thread=False)
+            # WAL lets readers proceed while another connection writes
+            app.conn.execute("PRAGMA journal_mode=WAL")
+            app.conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+            refresher = app.enable_timetable_refresh(refresher)
+            self._all.append(app)
+            self._idle.put(app)
+
+    @contextmanager
+    def acquire(self, user=None):
+        app = self._idle.get(timeout=self.timeout)
+        app.begin_request(dict(user) if user else None)  # a copy: the app refreshes its profile fields
+        try:
+            yield app
+        finally:
+            if app.conn.in_transaction:
+                app.conn.rollback()
+            app.current_user = None
+            self._idle.put(app)
+
+    def close(self):
+        if self._all and self._all[0].timetable_refresher is not None:
+            self._all[0].timetable_refresher.close()
+        for app in self._all:
+            app.conn.close()
+
+
+class SessionStore:
+    """Bearer tokens -> {"AccountID", "Role"} of the logged-in user.
+
+    Nothing else of the User row is kept: endpoints read the profile through the app's
+    session identity. A token expires after ttl seconds idle or max_age seconds in total;
+    expired tokens are purged at most once per purge_interval.
+    """
+
+    def __init__(self, ttl=3600, max_age=12 * 3600, purge_interval=60):
+        self.ttl = ttl
+        self.max_age = max_age
+        self.purge_interval = purge_interval
+        self._sessions = {}  # token -> [session, idle deadline, hard deadline]
+        self._next_purge = time.monotonic() + purge_interval
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            for token in [t for t, (_, idle, hard) in self._sessions.items() if min(idle, hard) < now]:
+                del self._sessions[token]
+
+    def create(self, user):
+        token = secrets.token_urlsafe(24)
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            self._sessions[token] = [{"AccountID": user['AccountID'], "Role": user['Role']},
+                                     now + self.ttl, now + self.max_age]
+        return token
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            entry = self._sessions.get(token)
+            if not entry:
+                return None
+            if min(entry[1], entry[2]) < now:
+                del self._sessions[token]
+                return None
+            entry[1] = now + self.ttl
+            return entry[0]
+
+    def drop(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _rows(rows):
+    return [dict(r) for r in rows]
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over the same use cases as the menus.
+
+    POST /login {"username", "password"} returns a token; every other endpoint
+    expects "Authorization: Bearer <token>".
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive
+    timeout = 15  # seconds an idle keep-alive connection keeps its thread
+    disable_nagle_algorithm = True  # headers and body are written separately
+    server_version = "SMS-API/1.0"
+
+    ROUTES = {
+        ("POST", "/login"): "api_login",
+        ("POST", "/logout"): "api_logout",
+        ("GET", "/profile"): "api_profile",
+        ("GET", "/schedule"): "api_schedule",
+        ("GET", "/courses"): "api_courses",
+        ("GET", "/grades"): "api_grades",
+        ("POST", "/grades"): "api_enter_grades",
+        ("GET", "/attendance"): "api_attendance",
+        ("POST", "/attendance"): "api_record_attendance",
+        ("GET", "/reports"): "api_report",
+    }
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        if method == "GET" and path == "/metrics" and self.server.latency is not None:
+            _send_metrics(self, self.server.latency)
+            return
+        name = None
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        # /reports/<type> carries its argument in the path
+        if path.startswith("/reports/"):
+            path, self.query["type"] = "/reports", path.rsplit("/", 1)[1]
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            name = self.ROUTES.get((method, path))
+            if name is None:
+                raise ApiError(404, "not found")
+            try:
+                self.body = json.loads(raw) if raw else {}
+            except ValueError:
+                raise ApiError(400, "invalid JSON body")
+            if not isinstance(self.body, dict):
+                raise ApiError(400, "JSON body must be an object")
+            status, payload = 200, getattr(self, name)()
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except queue.Empty:
+            status, payload = 503, {"error": "server busy"}
+        except sqlite3.Error as e:
+            status, payload = 500, {"error": f"database error: {e}"}
+        except Exception:
+            # A bug in an endpoint: still answer, so the client isn't left with a dropped connection
+            sys.stderr.write(f"[Error]: unhandled exception in {method} {self.path}\n{traceback.format_exc()}")
+            status, payload = 500, {"error": "internal server error"}
+        elapsed = time.perf_counter() - started
+        if name and self.server.latency is not None:
+            self.server.latency.record(name, elapsed)
+        elapsed_ms = elapsed * 1000
+        self._send_json(status, payload, elapsed_ms)
+        self.log_message('"%s %s" %d %.2fms', method, self.path, status, elapsed_ms)
+
+    def _send_json(self, status, payload, elapsed_ms):
+        data = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Response-Time", f"{elapsed_ms:.2f}ms")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_request(self, code="-", size="-"):
+        pass  # _dispatch logs one line per request, with timing
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _token(self):
+        auth = self.headers.get("Authorization") or ""
+        return auth[7:].strip() if auth.startswith("Bearer ") else None
+
+    def _user(self, *roles):
+        user = self.server.sessions.get(self._token())
+        if user is None:
+            raise ApiError(401, "login required")
+        if roles and user['Role'].lower() not in roles:
+            raise ApiError(403, "not allowed for this role")
+        return user
+
+    # --- endpoints ---
+    def api_login(self):
+        with self.server.apps.acquire() as app:
+            user = app.authenticate(self.body.get("username"), self.body.get("password"))
+        if not user:
+            raise ApiError(401, "incorrect username or password")
+        return {"token": self.server.sessions.create(user), "role": user['Role'], "full_name": user['FullName']}
+
+    def api_logout(self):
+        self._user()
+        self.server.sessions.drop(self._token())
+        return {"ok": True}
+
+    def api_profile(self):
+        user = self._user()
+        with self.server.apps.acquire(user) as app:
+            identity = app.session_identity()
+        if identity is None:
+            self.server.sessions.drop(self._token())
+            raise ApiError(401, "account no longer exists")
+        return identity['Profile']
+
+    def api_schedule(self):
+        user = self._user("student", "teacher")
+        with self.server.apps.acquire(user) as app:
+            if user['Role'].lower() == 'student':
+                return {"schedule": _rows(app.fetch_student_schedule(app.get_student_id()))}
+            return {"schedule": _rows(app.fetch_teacher_schedule(app.get_teacher_id()))}
+
+    def api_courses(self):
+        user = self._user()
+        role = user['Role'].lower()
+        with self.server.apps.acquire(user) as app:
+            if role == 'student':
+                return {"courses": _rows(app.fetch_student_courses(app.get_student_id()))}
+            if role == 'teacher':
+                return {"courses": _rows(app.fetch_teacher_courses(app.get_teacher_id()))}
+            return {"courses": _rows(app.fetch_course_sections())}
+
+    def api_grades(self):
+        user = self._user()
+        role = user['Role'].lower()
+        with self.server.apps.acquire(user) as app:
+            if role == 'student':
+                courses = app.fetch_student_courses(app.get_student_id())
+                return {"grades": [{"CourseID": c['CourseID'], "SubjectName": c['SubjectName'],
+                                    "Credits": c['Credits'], "Grade": c['Grade']} for c in courses]}
+            course_id = self.query.get("course")
+            if not course_id:
+                raise ApiError(400, "query parameter 'course' is required")
+            if role == 'teacher':
+                owner = app.cursor.execute("SELECT TeacherID FROM Course WHERE CourseID = ?", (course_id,)).fetchone()
+                if not owner or owner['TeacherID'] != app.get_teacher_id():
+                    raise ApiError(403, "course is not taught by you")
+            return {"course": course_id, "roster": _rows(app.fetch_course_roster(course_id)),
+                    "stats": app.get_course_grade_stats(course_id)}
+
+    def api_enter_grades(self):
+        user = self._user("teacher", "admin")
+        course_id = self.body.get("course_id")
+        entries = self.body.get("grades")
+        if not course_id or not isinstance(entries, list):
+            raise ApiError(400, "expected {\"course_id\": ..., \"grades\": [{\"student_id\", \"grade\"}]}")
+        rows = [{"CourseID": course_id, "StudentID": e.get("student_id"), "Grade": e.get("grade")}
+                for e in entries if isinstance(e, dict)]
+        with self.server.apps.acquire(user) as app:
+            try:
+                updated, skipped = app.batch_import_grades(rows)
+            except ValueError as e:
+                raise ApiError(400, str(e))
+        return {"updated": updated,
+                "skipped": [{"index": line_no - 2, "reason": reason} for line_no, reason in skipped]}
+
+    def api_attendance(self):
+        user = self._user()
+        role = user['Role'].lower()
+        with self.server.apps.acquire(user) as app:
+            if role == 'student':
+                return {"attendance": _rows(app.attendance_rates(student_id=app.get_student_id()))}
+            course_id = self.query.get("course")
+            if not course_id:
+                raise ApiError(400, "query parameter 'course' is required")
+            if role == 'teacher':
+                owner = app.cursor.execute("SELECT TeacherID FROM Course WHERE CourseID = ?", (course_id,)).fetchone()
+                if not owner or owner['TeacherID'] != app.get_teacher_id():
+                    raise ApiError(403, "course is not taught by you")
+            summary = app.course_attendance_rate(course_id)
+            return {"course": course_id, "attendance": _rows(app.attendance_rates(course_id=course_id)),
+                    "summary": dict(summary) if summary else None}
+
+    def api_record_attendance(self):
+        user = self._user("teacher", "admin")
+        schedule_id, session_date = self.body.get("schedule_id"), self.body.get("date")
+        marks = self.body.get("marks")
+        if (not isinstance(schedule_id, int) or isinstance(schedule_id, bool) or not isinstance(session_date, str)
+                or not session_date or not isinstance(marks, list)):
+            raise ApiError(400, "expected {\"schedule_id\": <integer>, \"date\": \"YYYY-MM-DD\", "
+                                "\"marks\": [{\"student_id\", \"status\"}]}")
+        for index, m in enumerate(marks):
+            if not (isinstance(m, dict) and isinstance(m.get("student_id"), str) and isinstance(m.get("status"), str)):
+                raise ApiError(400, f"marks[{index}]: expected {{\"student_id\": \"...\", \"status\": \"P|L|A|E\"}}")
+        # One row per mark, in order: a skipped row's line number maps back to its index in marks
+        rows = [{"ScheduleID": schedule_id, "Date": session_date, "StudentID": m["student_id"],
+                 "Status": m["status"]} for m in marks]
+        with self.server.apps.acquire(user) as app:
+            try:
+                # One session's roll call: a single transaction
+                recorded, skipped = app.batch_import_attendance(rows, batch_size=None)
+            except ValueError as e:
+                raise ApiError(400, str(e))
+        return {"recorded": recorded,
+                "skipped": [{"index": line_no - 2, "reason": reason} for line_no, reason in skipped]}
+
+    def api_report(self):
+        user = self._user("admin")
+        with self.server.apps.acquire(user) as app:
+            report = app.build_report(self.query.get("type"))
+        if report is None:
+            raise ApiError(404, "unknown report type (1-5)")
+        report_lines, rows = report
+        return {"type": self.query["type"], "data": dict(rows), "text": report_lines}
+
+
+class ApiServer(ThreadingHTTPServer):
+    """HTTP server with a thread per connection; only the AppPool (workers apps) is bounded.
+
+    An idle keep-alive connection holds just its own thread, never an app, so it cannot
+    stall other clients' requests.
+    """
+    daemon_threads = True  # idle keep-alive connections must not delay shutdown
+
+    def __init__(self, address, app_class, db_name, workers=8, quiet=False, latency=None):
+        super().__init__(address, ApiRequestHandler)
+        self.quiet = quiet
+        self.latency = latency  # LatencyRecorder for per-endpoint timings (served at /metrics)
+        self.apps = AppPool(app_class, db_name, workers)
+        self.sessions = SessionStore()
+
+    def server_close(self):
+        super().server_close()
+        self.apps.close()
+
+
+def _send_metrics(handler, latency):
+    data = latency.prometheus().encode("utf-8")
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+    handler.send_header("Content-Length", str(len(data)))
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /metrics only: the latency recorder of an interactive session"""
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/metrics":
+            self.send_error(404)
+            return
+        _send_metrics(self, self.server.latency)
+
+    def log_message(self, format, *args):
+        pass  # the interactive screens own the terminal
+
+
+def start_metrics_server(latency, port, host="127.0.0.1"):
+    """Serve latency on http://host:port/metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, name="sms-metrics", daemon=True).start()
+    return server
+
+
+def serve_api(args, app_class, latency=None):
+    server = ApiServer((args.host, args.port), app_class, args.db, workers=args.workers, quiet=args.quiet,
+                       latency=latency)
+    print(f"[Notification]: API listening on http://{args.host}:{server.server_port} ({args.workers} workers)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
@@ -0,0 +1,261 @@
+"""asyncio front end for the read-heavy kiosk/portal use cases.
+
+Started with `sms serve-async`. One event loop holds any number of mostly idle
+keep-alive connections; the blocking sqlite3 work runs on a bounded thread pool
+where every worker thread owns its own StudentManagementSystem (and connection).
+Identical reads that are in flight at the same time are coalesced into a
+single query whose result is shared by all waiting requests.
+"""
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from api_server import ApiError, SessionStore, _rows
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 500: "Internal Server Error"}
+
+
+class AsyncApiServer:
+    def __init__(self, app_class, db_name, workers=8, queue_depth=64, idle_timeout=60, quiet=False):
+        self.app_class = app_class
+        self.db_name = db_name
+        self.idle_timeout = idle_timeout
+        self.quiet = quiet
+        self.sessions = SessionStore()
+        self._local = threading.local()
+        self._refresher = None  # one background timetable rebuilder shared by the worker apps
+        self._refresher_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sms-db",
+                                            initializer=self._open_worker_app)
+        # Bounds the executor's queue: at most this many DB jobs submitted at once
+        self._slots = asyncio.Semaphore(workers + queue_depth)
+        self._inflight = {}
+        self.coalesced = 0
+        self.queries = 0
+
+    def _open_worker_app(self):
+        app = self.app_class(self.db_name, check_same_thread=False)
+        app.conn.execute("PRAGMA journal_mode=WAL")
+        app.conn.execute("PRAGMA busy_timeout=30000")
+        with self._refresher_lock:
+            self._refresher = app.enable_timetable_refresh(self._refresher)
+        self._local.app = app
+
+    def _run_on_worker(self, fn, user):
+        app = self._local.app
+        app.begin_request(dict(user) if user else None)  # a copy: the app refreshes its profile fields
+        try:
+            return fn(app)
+        finally:
+            if app.conn.in_transaction:
+                app.conn.rollback()
+            app.current_user = None
+
+    async def run_blocking(self, fn, user=None):
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._run_on_worker, fn, user)
+
+    async def read(self, key, fn, user=None):
+        """Run a read-only query, sharing the result with identical concurrent reads.
+
+        Only results and query errors are shared: when the leading request is cancelled (its
+        client went away), the waiting requests run the read again instead.
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise  # this request itself was cancelled
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.queries += 1
+        try:
+            result = await self.run_blocking(fn, user)
+        except asyncio.CancelledError:
+            future.cancel()  # waiters retry, see above
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    # --- endpoints ---
+    def _user(self, headers, *roles):
+        auth = headers.get("authorization", "")
+        user = self.sessions.get(auth[7:].strip()) if auth.startswith("Bearer ") else None
+        if user is None:
+            raise ApiError(401, "login required")
+        if roles and user['Role'].lower() not in roles:
+            raise ApiError(403, "not allowed for this role")
+        return user
+
+    async def api_login(self, headers, query, body):
+        username, password = body.get("username"), body.get("password")
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise ApiError(400, "expected {\"username\": \"...\", \"password\": \"...\"}")
+        user = await self.run_blocking(lambda app: app.authenticate(username, password))
+        if not user:
+            raise ApiError(401, "incorrect username or password")
+        return {"token": self.sessions.create(user), "role": user['Role'], "full_name": user['FullName']}
+
+    async def api_schedule(self, headers, query, body):
+        user = self._user(headers, "student", "teacher")
+        if user['Role'].lower() == 'student':
+            rows = await self.read(("student_schedule", user['AccountID']),
+                                   lambda app: _rows(app.fetch_student_schedule(app.get_student_id())), user)
+        else:
+            rows = await self.read(("teacher_schedule", user['AccountID']),
+                                   lambda app: _rows(app.fetch_teacher_schedule(app.get_teacher_id())), user)
+        return {"schedule": rows}
+
+    async def api_courses(self, headers, query, body):
+        self._user(headers)
+        return {"courses": await self.read(("course_sections",), lambda app: _rows(app.fetch_course_sections()))}
+
+    async def api_roster(self, headers, query, body):
+        user = self._user(headers, "teacher", "admin")
+        course_id = query.get("course")
+        if not course_id:
+            raise ApiError(400, "query parameter 'course' is required")
+        if user['Role'].lower() == 'teacher':
+            teaching = await self.read(("teacher_courses", user['AccountID']),
+                                       lambda app: _rows(app.fetch_teacher_courses(app.get_teacher_id())), user)
+            if course_id not in {c['CourseID'] for c in teaching}:
+                raise ApiError(403, "course is not taught by you")
+        roster = await self.read(("roster", course_id), lambda app: _rows(app.fetch_course_roster(course_id)))
+        return {"course": course_id, "roster": roster}
+
+    async def api_report(self, headers, query, body):
+        self._user(headers, "admin")
+        report_type = query.get("type")
+        report = await self.read(("report", report_type), lambda app: app.build_report(report_type))
+        if report is None:
+            raise ApiError(404, "unknown report type (1-5)")
+        report_lines, rows = report
+        return {"type": report_type, "data": dict(rows), "text": report_lines}
+
+    async def api_stats(self, headers, query, body):
+        return {"queries": self.queries, "coalesced": self.coalesced, "inflight": len(self._inflight)}
+
+    ROUTES = {
+        ("POST", "/login"): api_login,
+        ("GET", "/schedule"): api_schedule,
+        ("GET", "/courses"): api_courses,
+        ("GET", "/roster"): api_roster,
+        ("GET", "/reports"): api_report,
+        ("GET", "/stats"): api_stats,
+    }
+
+    # --- HTTP/1.1 plumbing ---
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                raw = await reader.readexactly(length) if length else b""
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+
+                started = time.perf_counter()
+                status, payload = await self.dispatch(method, target, headers, raw)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                data = json.dumps(payload, default=str).encode("utf-8")
+                writer.write((
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"X-Response-Time: {elapsed_ms:.2f}ms\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode("latin-1") + data)
+                await writer.drain()
+                if not self.quiet:
+                    print(f'"{method} {target}" {status} {elapsed_ms:.2f}ms', flush=True)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, raw):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if path.startswith("/reports/"):
+            path, query["type"] = "/reports", path.rsplit("/", 1)[1]
+        try:
+            handler = self.ROUTES.get((method, path))
+            if handler is None:
+                raise ApiError(404, "not found")
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                raise ApiError(400, "invalid JSON body")
+            if not isinstance(body, dict):
+                raise ApiError(400, "JSON body must be an object")
+            return 200, await handler(self, headers, query, body)
+        except ApiError as e:
+            return e.status, {"error": str(e)}
+        except sqlite3.Error as e:
+            return 500, {"error": f"database error: {e}"}
+        except Exception:
+            # A bug in an endpoint: still answer, so the client isn't left with a dropped connection
+            sys.stderr.write(f"[Error]: unhandled exception in {method} {target}\n{traceback.format_exc()}")
+            return 500, {"error": "internal server error"}
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        port = server.sockets[0].getsockname()[1]
+        print(f"[Notification]: async API listening on http://{host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._refresher is not None:
+            self._refresher.close()
+
+
+def serve_async(args, app_class):
+    server = AsyncApiServer(app_class, args.db, workers=args.workers, idle_timeout=args.idle_timeout,
+                            quiet=args.quiet)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
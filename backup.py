@@ -0,0 +1,184 @@
+"""Online backups of the live database with sqlite3's backup API.
+
+Started with `sms backup create`. The copy is made a few pages at a time from a
+separate connection, pausing between steps so that interactive users and the
+API servers keep writing while it runs. In WAL mode the copy reads one snapshot
+held open for its whole duration, which does not block writers; in rollback
+journal mode a commit restarts the copy, and a copy that keeps restarting is
+retried after a pause rather than taken in one long step. Each copy is checked with
+PRAGMA integrity_check in a separate process before it replaces the oldest of
+the kept generations:
+
+    sms --db management_system.db backup create --dir backups --keep 7
+    sms backup list
+"""
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+GENERATION = re.compile(r"-(\d{8}-\d{6})(?:-\d+)?\.db$")
+
+
+class BackupRestarted(Exception):
+    """The source changed under the stepwise copy too often; the copy is retried after a pause"""
+
+
+def verify_backup(path, quick=False):
+    """Integrity check of one backup file (run in a worker process). Returns the problems found."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA quick_check" if quick else "PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as e:
+        return [str(e)]  # too damaged for the check to run at all
+    finally:
+        conn.close()
+    return [] if rows == [("ok",)] else [r[0] for r in rows]
+
+
+def list_generations(backup_dir, db_path):
+    """Backups of db_path in backup_dir, newest first"""
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    paths = [p for p in glob.glob(os.path.join(glob.escape(backup_dir), f"{glob.escape(stem)}-*.db"))
+             if GENERATION.search(p)]
+    return sorted(paths, key=lambda p: (GENERATION.search(p).group(1), os.path.getmtime(p)), reverse=True)
+
+
+class BackupRunner:
+    def __init__(self, db_path, backup_dir, keep=7, pages=256, sleep=0.02, max_restarts=5, quick=False,
+                 attempts=5, backoff=0.5):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.max_restarts = max_restarts  # per attempt
+        self.quick = quick
+        self.attempts = attempts
+        self.backoff = backoff  # seconds before the second attempt, doubled for each further one
+        self.restarts = 0
+        self.steps = 0
+        self._attempt_restarts = 0
+        self._remaining = None
+
+    def _progress(self, status, remaining, total):
+        self.steps += 1
+        # Another connection committed mid-copy: SQLite starts over from the first page
+        if self._remaining is not None and remaining > self._remaining:
+            self.restarts += 1
+            self._attempt_restarts += 1
+            if self._attempt_restarts > self.max_restarts:
+                raise BackupRestarted(f"source changed {self._attempt_restarts} times during the copy")
+        self._remaining = remaining
+        if remaining and self.sleep:
+            time.sleep(self.sleep)  # between steps no lock is held, so writers get their turn
+
+    def _copy(self, target):
+        source = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True, timeout=30)
+        dest = sqlite3.connect(target)
+        try:
+            wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+            for attempt in range(self.attempts):
+                if attempt:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))  # let a burst of writes pass
+                self._remaining, self._attempt_restarts = None, 0
+                try:
+                    if wal:
+                        # Every step reads this one snapshot, so commits cannot restart the copy,
+                        # and WAL readers never block writers
+                        source.execute("BEGIN")
+                        source.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+                    source.backup(dest, pages=self.pages, progress=self._progress)
+                    break
+                except BackupRestarted:
+                    continue
+                finally:
+                    if source.in_transaction:
+                        source.rollback()
+            else:
+                raise sqlite3.OperationalError(
+                    f"the database changed under every one of {self.attempts} copy attempts; retry later, or "
+                    f"switch it to WAL mode (PRAGMA journal_mode=WAL) to copy a snapshot while it is written")
+            # A self-contained single file, whatever the source's journal mode
+            dest.execute("PRAGMA journal_mode=DELETE")
+            return dest.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            dest.close()
+            source.close()
+
+    def run(self):
+        """Copy, verify, rotate. Returns a dict describing the new generation."""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"database not found: {self.db_path}")
+        os.makedirs(self.backup_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        final = os.path.join(self.backup_dir, f"{stem}-{stamp}.db")
+        n = 1
+        while os.path.exists(final):  # more than one backup within a second
+            final = os.path.join(self.backup_dir, f"{stem}-{stamp}-{n}.db")
+            n += 1
+        partial = final + ".part"
+
+        started = time.perf_counter()
+        try:
+            pages = self._copy(partial)
+            copied = time.perf_counter() - started
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                problems = pool.submit(verify_backup, partial, self.quick).result()
+            if problems:
+                raise sqlite3.DatabaseError(f"backup failed the integrity check: {'; '.join(problems[:5])}")
+            os.replace(partial, final)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        removed = []
+        for old in list_generations(self.backup_dir, self.db_path)[self.keep:]:
+            os.remove(old)
+            removed.append(old)
+        return {
+            "path": final,
+            "pages": pages,
+            "bytes": os.path.getsize(final),
+            "copy_seconds": copied,
+            "total_seconds": time.perf_counter() - started,
+            "steps": self.steps,
+            "restarts": self.restarts,
+            "removed": removed,
+        }
+
+
+def run_backup_command(args):
+    """`sms backup create|list`; returns the exit code"""
+    backup_dir = args.dir or os.path.join(os.path.dirname(os.path.abspath(args.db)), "backups")
+    if args.action == "list":
+        generations = list_generations(backup_dir, args.db)
+        for path in generations:
+            print(f"{os.path.basename(path)}  {os.path.getsize(path):>12,} bytes")
+        print(f"[Completed]: {len(generations)} backup(s) in {backup_dir}")
+        return 0
+
+    if args.keep < 1:
+        print("[Error]: --keep must be at least 1 (the new backup is one of the kept generations)", file=sys.stderr)
+        return 1
+    if args.pages < 1:
+        print("[Error]: --pages must be at least 1", file=sys.stderr)
+        return 1
+    runner = BackupRunner(args.db, backup_dir, keep=args.keep, pages=args.pages, sleep=args.sleep,
+                          quick=args.quick)
+    try:
+        result = runner.run()
+    except (OSError, sqlite3.Error) as e:
+        print(f"[Error]: Backup failed: {e}", file=sys.stderr)
+        return 1
+    print(f"[Success]: Backup saved to {result['path']} ({result['bytes']:,} bytes, {result['pages']:,} pages)")
+    print(f"  copied in {result['copy_seconds']:.2f}s over {result['steps']} step(s), "
+          f"{result['restarts']} restart(s); integrity verified, total {result['total_seconds']:.2f}s")
+    for path in result['removed']:
+        print(f"  removed old generation {os.path.basename(path)}")
+    return 0
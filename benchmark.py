@@ -0,0 +1,266 @@
+"""Benchmark harness for the data paths behind the interactive menus.
+
+Every use case is driven through its real menu method with scripted keystrokes
+(input/getpass patched, output line-buffered to /dev/null, clear_screen disabled), so
+the same harness runs against any version of the app:
+
+    python benchmark.py --app main_EN_1.0.2.py --output before.json
+    python benchmark.py --app main_EN_1.0.3.py --output after.json --compare before.json
+
+Datasets are produced by generate_dataset.py and cached per size in --cache-dir;
+each run works on a fresh copy because some use cases write.
+"""
+import argparse
+import builtins
+import getpass
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import generate_dataset
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+class ScriptExhausted(Exception):
+    """The use case asked for more input than its script provides"""
+
+
+def load_app_module(path, name="sms_bench_app"):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def dataset_params(size):
+    """Generator parameters for a dataset of `size` enrollments"""
+    students = max(size // 100, 50)
+    return dict(enrollments=size, students=students, teachers=max(students // 25, 5),
+                subjects=max(min(students // 50, 800), 20), years=10)
+
+
+def ensure_dataset(cache_dir, size, seed):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"dataset_{size}_seed{seed}.db")
+    if not os.path.exists(path):
+        print(f"[Benchmark]: generating {size:,}-enrollment dataset...", flush=True)
+        generate_dataset.generate(path + ".tmp", seed=seed, log=lambda *_: None, **dataset_params(size))
+        os.replace(path + ".tmp", path)
+    return path
+
+
+class Scripted:
+    """Patch input()/getpass() to replay keys and silence stdout for the duration"""
+
+    def __init__(self, keys):
+        self.keys = iter(keys)
+
+    def _next(self, prompt=""):
+        try:
+            return next(self.keys)
+        except StopIteration:
+            raise ScriptExhausted(prompt)
+
+    def __enter__(self):
+        self._saved = builtins.input, getpass.getpass, sys.stdout
+        builtins.input = self._next
+        getpass.getpass = self._next
+        # Line-buffered like a terminal, so per-row print() costs what it costs interactively
+        sys.stdout = open(os.devnull, "w", buffering=1)
+        return self
+
+    def __exit__(self, *exc):
+        sys.stdout.close()
+        builtins.input, getpass.getpass, sys.stdout = self._saved
+        return False
+
+
+def build_cases(conn):
+    """(name, role, method, keys()) for every benchmarked use case.
+
+    Keys are computed per repetition from the current data, so write paths
+    always have something new to write.
+    """
+    teacher = conn.execute("""
+        SELECT u.UserName, t.TeacherID FROM Teacher t JOIN User u ON t.AccountID = u.AccountID
+        WHERE EXISTS (SELECT 1 FROM Course c JOIN Enrollment e ON e.CourseID = c.CourseID WHERE c.TeacherID = t.TeacherID)
+        ORDER BY t.TeacherID LIMIT 1
+    """).fetchone()
+    student = conn.execute("""
+        SELECT u.UserName FROM Student s JOIN User u ON s.AccountID = u.AccountID
+        WHERE EXISTS (SELECT 1 FROM Enrollment e WHERE e.StudentID = s.StudentID)
+        ORDER BY s.StudentID LIMIT 1
+    """).fetchone()
+    admin = conn.execute("SELECT UserName, PassWord FROM User WHERE Role = 'admin' ORDER BY AccountID LIMIT 1").fetchone()
+
+    def login_keys():
+        return ['1', admin[0], admin[1], '']
+
+    def add_student_keys():
+        # First subject, its first course section (same ordering as the menu), a student not in it yet
+        subject_id = conn.execute("SELECT SubjectID FROM Subject ORDER BY SubjectID LIMIT 1").fetchone()[0]
+        course_id = conn.execute("SELECT CourseID FROM Course WHERE SubjectID = ? ORDER BY Year DESC, Semester DESC",
+                                 (subject_id,)).fetchone()[0]
+        student_id = conn.execute("""
+            SELECT StudentID FROM Student s
+            WHERE NOT EXISTS (SELECT 1 FROM Enrollment e WHERE e.CourseID = ? AND e.StudentID = s.StudentID)
+            LIMIT 1
+        """, (course_id,)).fetchone()[0]
+        return ['5', '1', '1', student_id, 'Y', '', '6']
+
+    def grade_entry_keys():
+        course_id = conn.execute("SELECT CourseID FROM Course WHERE TeacherID = ? ORDER BY Year DESC, Semester DESC",
+                                 (teacher[1],)).fetchone()[0]
+        roster = conn.execute("SELECT COUNT(*) FROM Enrollment WHERE CourseID = ?", (course_id,)).fetchone()[0]
+        return ['1'] + [f"{5 + (i % 50) / 10:.1f}" for i in range(roster)] + ['']
+
+    cases = [
+        ("login", None, "login", login_keys),
+        ("list_users", "admin", "manage_users", lambda: ['1', '1', '', '5']),
+        ("list_subjects", "admin", "manage_subjects", lambda: ['1', '', '5']),
+        ("list_courses", "admin", "manage_course_sections", lambda: ['1', '', '6']),
+        ("add_student_to_class", "admin", "manage_course_sections", add_student_keys),
+        ("enter_grades", "teacher", "teacher_enter_grades", grade_entry_keys),
+        ("teacher_schedule", "teacher", "teacher_view_schedule", lambda: ['']),
+        ("teacher_courses", "teacher", "teacher_view_courses", lambda: ['']),
+        ("student_schedule", "student", "student_view_schedule", lambda: ['']),
+        ("student_courses", "student", "student_view_courses", lambda: ['']),
+    ]
+    for n in range(1, 6):
+        cases.append((f"report_{n}", "admin", "view_reports", lambda n=n: [str(n), 'N', '', '6']))
+    users = {"admin": admin[0], "teacher": teacher[0], "student": student[0]}
+    return cases, users
+
+
+def run_size(module, dataset, repeat, workdir):
+    """Time all use cases against a fresh copy of `dataset`. Returns {case: stats}."""
+    shutil.copyfile(dataset, os.path.join(workdir, "management_system.db"))
+    cwd = os.getcwd()
+    os.chdir(workdir)  # older versions always open ./management_system.db
+    try:
+        app = module.StudentManagementSystem()
+        app.clear_screen = lambda: None
+        conn = sqlite3.connect("management_system.db")
+        cases, users = build_cases(conn)
+        accounts = {role: dict(app.cursor.execute("SELECT * FROM User WHERE UserName = ?", (name,)).fetchone())
+                    for role, name in users.items()}
+        results = {}
+        for name, role, method, keys in cases:
+            app.current_user = dict(accounts[role]) if role else None
+            samples, error = [], None
+            for _ in range(repeat):
+                script = keys()
+                conn.commit()  # see the app's latest writes when building the next script
+                try:
+                    with Scripted(script):
+                        started = time.perf_counter()
+                        getattr(app, method)()
+                        samples.append((time.perf_counter() - started) * 1000)
+                except ScriptExhausted as e:
+                    error = f"script exhausted at prompt {str(e)!r}"
+                    break
+            if error:
+                results[name] = {"error": error}
+                print(f"  {name:<22} ERROR: {error}", flush=True)
+                continue
+            samples.sort()
+            results[name] = {
+                "n": len(samples),
+                "min_ms": round(samples[0], 3),
+                "median_ms": round(statistics.median(samples), 3),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+                "mean_ms": round(statistics.fmean(samples), 3),
+            }
+            print(f"  {name:<22} median {results[name]['median_ms']:>10.3f} ms", flush=True)
+        conn.close()
+        app.conn.close()
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """Print median ratios per size/case; return the number of regressions.
+
+    A regression is a median over threshold x the baseline and at least min_delta_ms slower,
+    so sub-millisecond jitter is not reported.
+    """
+    regressions = 0
+    print(f"\n{'size':>9}  {'use case':<22} {'baseline':>11} {'current':>11}  ratio")
+    for size, cases in current["results"].items():
+        base_cases = baseline.get("results", {}).get(size, {})
+        for name, stats in cases.items():
+            base = base_cases.get(name)
+            if not base or "median_ms" not in base or "median_ms" not in stats:
+                continue
+            ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+            slower_ms = stats["median_ms"] - base["median_ms"]
+            flag = "  << REGRESSION" if ratio > threshold and slower_ms >= min_delta_ms else ""
+            regressions += bool(flag)
+            print(f"{size:>9}  {name:<22} {base['median_ms']:>9.3f}ms {stats['median_ms']:>9.3f}ms  {ratio:5.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every use case at several dataset sizes.")
+    parser.add_argument("--app", default=os.path.join(HERE, "main_EN_1.0.3.py"), help="app version to benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated dataset sizes (enrollments)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache-dir", default=os.path.join(HERE, ".bench_data"))
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="median ratio counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    app_path = os.path.abspath(args.app)
+    module = load_app_module(app_path)
+    with open(app_path, "rb") as f:
+        app_sha1 = hashlib.sha1(f.read()).hexdigest()
+    output = {
+        "meta": {
+            "app": os.path.basename(app_path),
+            "app_sha1": app_sha1,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        dataset = ensure_dataset(args.cache_dir, size, args.seed)
+        print(f"[Benchmark]: {os.path.basename(app_path)} @ {size:,} enrollments", flush=True)
+        with tempfile.TemporaryDirectory() as workdir:
+            output["results"][str(size)] = run_size(module, dataset, args.repeat, workdir)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"[Success]: Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(output, baseline, args.threshold, args.min_delta_ms)
+        print(f"[Completed]: {regressions} regression(s) over {args.threshold:.2f}x")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
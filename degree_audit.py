@@ -0,0 +1,233 @@
+"""Degree audit: each student's passed subjects against the curriculum of their Major.
+
+A curriculum (tables Curriculum, CurriculumGroup, CurriculumSubject) has a credit total
+and groups of subjects: in a 'required' group every subject must be passed, an 'elective'
+group needs MinCredits from its subjects. Passed subjects come from PassedSubject, so
+archived years count. Started with `sms audit`:
+
+    sms audit run --workers 4          # whole student body -> table DegreeAudit
+    sms audit student ST0000001        # one student, computed live
+    sms curriculum import curricula.csv
+
+The batch run reads students in StudentID ranges, one range per worker process, and
+writes all results in one transaction.
+"""
+import csv
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+TOTAL = "(total credits)"  # Requirement of the credit-total row
+Group = namedtuple("Group", "name kind min_credits subjects")
+Curriculum = namedtuple("Curriculum", "total_credits groups")
+
+
+def load_curricula(conn):
+    """({Major: Curriculum}, {SubjectID: Credits})"""
+    credits = {sid: c or 0 for sid, c in conn.execute("SELECT SubjectID, Credits FROM Subject")}
+    curricula = {major: Curriculum(total, []) for major, total in
+                 conn.execute("SELECT Major, TotalCredits FROM Curriculum")}
+    groups = {}
+    for group_id, major, name, kind, min_credits in conn.execute(
+            "SELECT GroupID, Major, GroupName, Kind, MinCredits FROM CurriculumGroup ORDER BY Major, GroupName"):
+        groups[group_id] = Group(name, kind, min_credits, [])
+        curricula[major].groups.append(groups[group_id])
+    for group_id, subject_id in conn.execute(
+            "SELECT GroupID, SubjectID FROM CurriculumSubject ORDER BY GroupID, SubjectID"):
+        groups[group_id].subjects.append(subject_id)
+    return curricula, credits
+
+
+def audit(curriculum, passed, credits):
+    """[(Requirement, Needed, Earned, Remaining, Missing)] for one student's set of passed subjects.
+
+    Needed/Earned/Remaining are credits; Missing lists the unpassed subjects of a required group.
+    A subject listed in several groups counts toward each of them.
+    """
+    earned_total = sum(credits.get(s, 0) for s in passed)
+    rows = [(TOTAL, curriculum.total_credits, earned_total, max(curriculum.total_credits - earned_total, 0), "")]
+    for group in curriculum.groups:
+        earned = sum(credits.get(s, 0) for s in group.subjects if s in passed)
+        if group.kind == "required":
+            needed = sum(credits.get(s, 0) for s in group.subjects)
+            missing = [s for s in group.subjects if s not in passed]
+        else:
+            needed, missing = group.min_credits or 0, []
+        rows.append((group.name, needed, earned, max(needed - earned, 0), ", ".join(missing)))
+    return rows
+
+
+def _audit_range(job):
+    """Worker process: audit the students with first <= StudentID <= last"""
+    db_path, first, last = job
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, timeout=30)
+    try:
+        curricula, credits = load_curricula(conn)
+        passed = {}
+        for student_id, subject_id in conn.execute(
+                "SELECT StudentID, SubjectID FROM PassedSubject WHERE StudentID BETWEEN ? AND ?", (first, last)):
+            passed.setdefault(student_id, set()).add(subject_id)
+        rows, skipped = [], 0
+        for student_id, major in conn.execute(
+                "SELECT StudentID, Major FROM Student WHERE StudentID BETWEEN ? AND ?", (first, last)):
+            curriculum = curricula.get(major)
+            if curriculum is None:
+                skipped += 1
+                continue
+            for requirement, needed, earned, remaining, missing in audit(curriculum, passed.get(student_id, ()), credits):
+                rows.append((student_id, requirement, needed, earned, remaining, missing))
+        return rows, skipped
+    finally:
+        conn.close()
+
+
+def student_ranges(conn, chunk_size):
+    """(first, last) StudentID bounds of consecutive chunks of chunk_size students"""
+    ids = [r[0] for r in conn.execute("SELECT StudentID FROM Student ORDER BY StudentID")]
+    return [(ids[i], ids[min(i + chunk_size, len(ids)) - 1]) for i in range(0, len(ids), chunk_size)]
+
+
+def run_audit(app, workers=None, chunk_size=2000):
+    """Audit every student into DegreeAudit. Returns (students audited, students without a curriculum)."""
+    jobs = [(app.db_name, first, last) for first, last in student_ranges(app.conn, chunk_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    if workers == 1:
+        results = list(map(_audit_range, jobs))
+    else:
+        # A worker that cannot start raises BrokenProcessPool here, where a Pool would respawn it forever
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_audit_range, jobs))
+    # Written only after every worker is done, so the write lock never waits on their reads
+    audited, skipped = set(), 0
+    try:
+        app.conn.commit()
+        app.conn.execute("BEGIN IMMEDIATE")
+        app.conn.execute("DELETE FROM DegreeAudit")
+        for rows, chunk_skipped in results:
+            app.conn.executemany(
+                "INSERT INTO DegreeAudit (StudentID, Requirement, Needed, Earned, Remaining, Missing, AuditedAt) "
+                "VALUES (?, ?, ?, ?, ?, ?, datetime('now'))", rows)
+            audited.update(r[0] for r in rows)
+            skipped += chunk_skipped
+        app.conn.commit()
+    except Exception:
+        app.conn.rollback()
+        raise
+    return len(audited), skipped
+
+
+def import_curricula(app, rows):
+    """Replace the curricula of the Majors in CSV dicts (Major, Kind, Group, Credits, SubjectID).
+
+    Kind 'total' sets the Major's credit total; 'required' and 'elective' rows add SubjectID
+    to Group (an elective group needs Credits from its subjects). One transaction; raises
+    ValueError (nothing written) on a bad row. Returns the number of Majors imported.
+    """
+    curricula = {}
+    for line_no, row in enumerate(rows, 2):
+        major = (row.get('Major') or '').strip()
+        kind = (row.get('Kind') or '').strip().lower()
+        group = (row.get('Group') or '').strip()
+        subject_id = (row.get('SubjectID') or '').strip()
+        credits = (row.get('Credits') or '').strip()
+        if not major or kind not in ('total', 'required', 'elective'):
+            raise ValueError(f"line {line_no}: Major and a Kind of total/required/elective are required")
+        try:
+            credits = int(credits) if credits else None
+        except ValueError:
+            raise ValueError(f"line {line_no}: Credits must be an integer")
+        groups = curricula.setdefault(major, [None, {}])[1]
+        if kind == 'total':
+            curricula[major][0] = credits
+            continue
+        if not group or not subject_id:
+            raise ValueError(f"line {line_no}: Group and SubjectID are required")
+        if app.catalog.subject(subject_id) is None:
+            raise ValueError(f"line {line_no}: subject {subject_id} not found")
+        entry = groups.setdefault(group, [kind, credits, []])
+        if entry[0] != kind:
+            raise ValueError(f"line {line_no}: group '{group}' is both required and elective")
+        if kind == 'elective' and credits is not None:
+            entry[1] = credits
+        entry[2].append(subject_id)
+    for major, (total, groups) in curricula.items():
+        if total is None:
+            raise ValueError(f"Major '{major}': a 'total' row with Credits is required")
+        for name, (kind, credits, _) in groups.items():
+            if kind == 'elective' and not credits:
+                raise ValueError(f"Major '{major}': elective group '{name}' needs Credits")
+
+    try:
+        for major, (total, groups) in curricula.items():
+            # ON DELETE CASCADE takes the old groups and their subjects
+            app.conn.execute("DELETE FROM Curriculum WHERE Major = ?", (major,))
+            app.conn.execute("INSERT INTO Curriculum (Major, TotalCredits) VALUES (?, ?)", (major, total))
+            for name, (kind, credits, subjects) in groups.items():
+                group_id = app.conn.execute(
+                    "INSERT INTO CurriculumGroup (Major, GroupName, Kind, MinCredits) VALUES (?, ?, ?, ?)",
+                    (major, name, kind, credits if kind == 'elective' else None)).lastrowid
+                app.conn.executemany("INSERT OR IGNORE INTO CurriculumSubject (GroupID, SubjectID) VALUES (?, ?)",
+                                     [(group_id, s) for s in subjects])
+        app.conn.commit()
+    except sqlite3.Error:
+        app.conn.rollback()
+        raise
+    return len(curricula)
+
+
+def audit_student(app, student_id):
+    """(Major, rows of audit()) for one student from the live tables; rows is None without a curriculum"""
+    row = app.conn.execute("SELECT Major FROM Student WHERE StudentID = ?", (student_id,)).fetchone()
+    if row is None:
+        return None, None
+    curricula, credits = load_curricula(app.conn)
+    curriculum = curricula.get(row['Major'])
+    if curriculum is None:
+        return row['Major'], None
+    passed = {r[0] for r in app.conn.execute("SELECT SubjectID FROM PassedSubject WHERE StudentID = ?", (student_id,))}
+    return row['Major'], audit(curriculum, passed, credits)
+
+
+AUDIT_COLUMNS = [
+    ("Requirement", 0, 25),
+    ("Needed", 1, 6),
+    ("Earned", 2, 6),
+    ("Remaining", 3, 9),
+    ("Missing subjects", 4, 40),
+]
+
+
+def run_audit_command(app, args):
+    """`sms audit run|student` and `sms curriculum import`; returns the exit code"""
+    if args.command == "curriculum":
+        with open(args.file, newline="", encoding="utf-8-sig") as f:
+            majors = import_curricula(app, list(csv.DictReader(f)))
+        print(f"[Success]: Imported the curricula of {majors} major(s).")
+        return 0
+    if args.action == "student":
+        major, rows = audit_student(app, args.student)
+        if major is None and rows is None:
+            print(f"[Error]: Student {args.student} not found", file=sys.stderr)
+            return 1
+        if rows is None:
+            print(f"[Error]: No curriculum for major '{major}'", file=sys.stderr)
+            return 1
+        print(f"DEGREE AUDIT {args.student} ({major})")
+        app.render_table([(h, lambda r, i=i: r[i], w) for h, i, w in AUDIT_COLUMNS], rows)
+        remaining = sum(1 for r in rows if r[3])
+        print(f"[Completed]: {remaining} requirement(s) outstanding.")
+        return 0
+    started = time.perf_counter()
+    try:
+        audited, skipped = run_audit(app, workers=args.workers, chunk_size=args.chunk_size)
+    except BrokenProcessPool as e:
+        print(f"[Error]: Audit worker process failed: {e}", file=sys.stderr)
+        return 1
+    print(f"[Success]: Audited {audited} student(s) in {time.perf_counter() - started:.2f}s; results in table DegreeAudit.")
+    if skipped:
+        print(f"[Notification]: {skipped} student(s) skipped: no curriculum for their major.")
+    return 0
@@ -0,0 +1,170 @@
+"""End-of-term exam timetabling by colouring the course co-enrollment graph.
+
+Two course sections are adjacent when at least one student takes both; the edge weight is
+the number of such students. Slots are colours: DSatur colours the sections one at a
+time (most distinct neighbouring slots first, then heaviest weighted degree), each into
+the first slot with no neighbour and a free room, so no student ever has two exams at
+once. Started with `sms exams`:
+
+    sms exams plan --term 2025-2 --slots-per-day 3   # -> table ExamSchedule
+    sms exams list --term 2025-2
+"""
+import heapq
+import sys
+import time
+from collections import defaultdict
+
+
+def co_enrollment_graph(conn, term):
+    """(CourseIDs, {i: {j: shared students}}) of one (Year, Semester).
+
+    The sparse product B^T.B of the student x course incidence matrix, accumulated
+    student by student over integer course indexes (only pairs that occur are stored).
+    """
+    courses = [r[0] for r in conn.execute(
+        "SELECT CourseID FROM Course WHERE Year = ? AND Semester = ? ORDER BY CourseID", term)]
+    index = {course_id: i for i, course_id in enumerate(courses)}
+    taking = defaultdict(list)  # StudentID -> course indexes
+    for student_id, course_id in conn.execute("""
+        SELECT e.StudentID, e.CourseID
+        FROM Course c JOIN Enrollment e ON e.CourseID = c.CourseID
+        WHERE c.Year = ? AND c.Semester = ?
+    """, term):
+        taking[student_id].append(index[course_id])
+    n = len(courses)
+    pairs = defaultdict(int)  # i * n + j (i < j) -> weight
+    for taken in taking.values():
+        if len(taken) < 2:
+            continue
+        taken.sort()
+        for a in range(len(taken) - 1):
+            base = taken[a] * n
+            for b in taken[a + 1:]:
+                pairs[base + b] += 1
+    graph = {i: {} for i in range(n)}
+    for key, weight in pairs.items():
+        i, j = divmod(key, n)
+        graph[i][j] = graph[j][i] = weight
+    return courses, graph
+
+
+def dsatur(graph, rooms_per_slot=None, sizes=None):
+    """{vertex: slot} colouring of graph; at most rooms_per_slot vertices share a slot.
+
+    sizes (vertex -> students) only breaks ties: the larger exam is placed first.
+    """
+    sizes = sizes or {}
+    degree = {v: sum(edges.values()) for v, edges in graph.items()}
+    saturation = {v: set() for v in graph}
+    slot_of, used = {}, defaultdict(int)
+    heap = [(0, -degree[v], -sizes.get(v, 0), v) for v in graph]
+    heapq.heapify(heap)
+    while heap:
+        sat, _, _, v = heapq.heappop(heap)
+        if v in slot_of or -sat != len(saturation[v]):
+            continue  # coloured already, or a stale entry from before a neighbour was coloured
+        slot = 0
+        while slot in saturation[v] or (rooms_per_slot is not None and used[slot] >= rooms_per_slot):
+            slot += 1
+        slot_of[v] = slot
+        used[slot] += 1
+        for u in graph[v]:
+            if u not in slot_of and slot not in saturation[u]:
+                saturation[u].add(slot)
+                heapq.heappush(heap, (-len(saturation[u]), -degree[u], -sizes.get(u, 0), u))
+    return slot_of
+
+
+def plan_exams(app, term, slots_per_day=3):
+    """Colour the co-enrollment graph of term and store the result in ExamSchedule.
+
+    Each slot gets at most one exam per room used by the term's lectures; an exam keeps its
+    own lecture room when that room is free in its slot. Returns a stats dict.
+    """
+    started = time.perf_counter()
+    courses, graph = co_enrollment_graph(app.conn, term)
+    built = time.perf_counter() - started
+    sizes, home = {}, {}
+    index = {course_id: i for i, course_id in enumerate(courses)}
+    for course_id, students, room in app.conn.execute("""
+        SELECT c.CourseID, (SELECT COUNT(*) FROM Enrollment e WHERE e.CourseID = c.CourseID),
+               (SELECT MIN(s.Room) FROM Schedule s WHERE s.CourseID = c.CourseID)
+        FROM Course c WHERE c.Year = ? AND c.Semester = ?
+    """, term):
+        sizes[index[course_id]] = students
+        if room:
+            home[index[course_id]] = room
+    rooms = sorted(set(home.values()))
+    slot_of = dsatur(graph, len(rooms) or None, sizes)
+    coloured = time.perf_counter() - started - built
+
+    # Rooms: the lecture room if still free in the slot, otherwise the first free one
+    free = defaultdict(lambda: list(rooms))
+    room_of = {}
+    for v in sorted(slot_of, key=lambda v: (v not in home, v)):
+        available = free[slot_of[v]]
+        room = home.get(v) if home.get(v) in available else (available[0] if available else None)
+        if room is not None:
+            available.remove(room)
+        room_of[v] = room
+
+    clashes = sum(1 for v, edges in graph.items() for u in edges if u > v and slot_of[u] == slot_of[v])
+    if clashes:
+        raise RuntimeError(f"exam plan has {clashes} clashing pair(s)")  # cannot happen with a proper colouring
+    rows = [(courses[v], term[0], term[1], slot, slot // slots_per_day + 1, slot % slots_per_day + 1, room_of[v])
+            for v, slot in slot_of.items()]
+    try:
+        app.conn.execute("DELETE FROM ExamSchedule WHERE Year = ? AND Semester = ?", term)
+        app.conn.executemany("INSERT INTO ExamSchedule (CourseID, Year, Semester, Slot, ExamDay, Period, Room) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        app.conn.commit()
+    except Exception:
+        app.conn.rollback()
+        raise
+    return {
+        "courses": len(courses),
+        "edges": sum(len(edges) for edges in graph.values()) // 2,
+        "slots": max(slot_of.values()) + 1 if slot_of else 0,
+        "rooms": len(rooms),
+        "graph_seconds": built,
+        "colour_seconds": coloured,
+        "total_seconds": time.perf_counter() - started,
+    }
+
+
+def run_exams_command(app, args):
+    """`sms exams plan|list`; returns the exit code"""
+    term = args.term or app.catalog.current_term()
+    if term is None:
+        print("[Error]: No course sections yet", file=sys.stderr)
+        return 1
+    if args.action == "plan":
+        if args.slots_per_day < 1:
+            print("[Error]: --slots-per-day must be at least 1", file=sys.stderr)
+            return 1
+        stats = plan_exams(app, term, args.slots_per_day)
+        print(f"[Success]: {stats['courses']} exams in {stats['slots']} slots "
+              f"({-(-stats['slots'] // args.slots_per_day)} days of {args.slots_per_day}), "
+              f"{stats['rooms']} rooms, no student with two exams at once.")
+        print(f"  co-enrollment graph: {stats['edges']} edges in {stats['graph_seconds']:.2f}s; "
+              f"colouring {stats['colour_seconds']:.2f}s; total {stats['total_seconds']:.2f}s")
+        return 0
+    rows = app.conn.execute("""
+        SELECT x.ExamDay, x.Period, x.Room, x.CourseID, sub.SubjectName,
+               (SELECT COUNT(*) FROM Enrollment e WHERE e.CourseID = x.CourseID) AS Students
+        FROM ExamSchedule x
+        JOIN Course c ON c.CourseID = x.CourseID
+        LEFT JOIN Subject sub ON sub.SubjectID = c.SubjectID
+        WHERE x.Year = ? AND x.Semester = ?
+        ORDER BY x.Slot, x.Room
+    """, term).fetchall()
+    print(f"EXAM SCHEDULE {term[0]} semester {term[1]}")
+    app.render_table([
+        ("Day", 'ExamDay', 3),
+        ("Period", 'Period', 6),
+        ("Room", lambda r: r['Room'] or '-', 8),
+        ("CourseID", 'CourseID', 11),
+        ("Subject", 'SubjectName', 25),
+        ("Students", 'Students', 8),
+    ], rows, empty_message="No exam schedule for this term yet (run 'sms exams plan').")
+    return 0
@@ -0,0 +1,291 @@
+"""Deterministic synthetic dataset generator for load testing and benchmarks.
+
+Builds a complete database (Users, Students, Teachers, Subjects, Courses,
+Schedules, Enrollments with grades) at institutional scale, e.g.
+
+    python generate_dataset.py --db big.db --students 50000 --teachers 2000 \
+        --years 10 --enrollments 5000000
+
+The same --seed always produces the same database. Rows are written with
+executemany() inside one transaction per table, with journaling and per-row
+foreign key checks off while loading, so millions of enrollments take seconds
+rather than hours.
+"""
+import argparse
+import importlib.util
+import json
+import math
+import operator
+import os
+import random
+import sys
+import time
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main_EN_1.0.3.py")
+
+MAJORS = ["IT", "Computer Science", "Software Engineering", "Data Science", "Information Systems",
+          "Electrical Engineering", "Mechanical Engineering", "Civil Engineering", "Logistics",
+          "Economics", "Business Administration", "Maritime Transport"]
+INSTITUTES = ["Information Technology", "Electrical & Electronics", "Mechanical Engineering",
+              "Civil Engineering", "Economics", "Transport", "Foundation Sciences", "Languages"]
+TOPICS = ["Programming", "Databases", "Networks", "Algorithms", "Statistics", "Calculus", "Physics",
+          "Accounting", "Marketing", "Circuits", "Mechanics", "Thermodynamics", "Logistics", "Law",
+          "English", "Operating Systems", "Machine Learning", "Security", "Graphics", "Economics"]
+LEVELS = ["Introduction to", "Fundamentals of", "Applied", "Advanced", "Topics in", "Project in"]
+FAMILY_NAMES = ["Nguyen", "Tran", "Le", "Pham", "Hoang", "Huynh", "Phan", "Vu", "Vo", "Dang", "Bui", "Do"]
+MIDDLE_NAMES = ["Van", "Thi", "Minh", "Ngoc", "Duc", "Thanh", "Quoc", "Hoai", "Gia", "Bao"]
+GIVEN_NAMES = ["An", "Binh", "Chau", "Dung", "Giang", "Ha", "Hieu", "Khanh", "Linh", "Mai", "Nam",
+               "Phuong", "Quan", "Son", "Tam", "Thao", "Trang", "Tuan", "Uyen", "Viet", "Yen"]
+PERIODS = ["07:00", "10:00", "13:00", "16:00", "19:00"]  # one teaching block each
+DAYS = 6  # Monday..Saturday
+TERMS_PER_STUDENT = 8  # 4 years, 2 semesters
+
+
+def load_app_module(app_file=APP_FILE):
+    spec = importlib.util.spec_from_file_location("sms_app", app_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_app_class(app_file=APP_FILE):
+    return load_app_module(app_file).StudentManagementSystem
+
+
+def _full_name(rnd):
+    return f"{rnd.choice(FAMILY_NAMES)} {rnd.choice(MIDDLE_NAMES)} {rnd.choice(GIVEN_NAMES)}"
+
+
+def _add_minutes(hhmm, minutes):
+    total = int(hhmm[:2]) * 60 + int(hhmm[3:]) + minutes
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def generate(db_path, students=50000, teachers=2000, subjects=800, years=10, start_year=None,
+             enrollments=5000000, class_size=60, seed=42, log=print):
+    """Create db_path and fill it. Returns a dict of row counts."""
+    rnd = random.Random(seed)
+    start_year = start_year or (2025 - years + 1)
+    terms = [(year, sem) for year in range(start_year, start_year + years) for sem in (1, 2)]
+    started = time.perf_counter()
+
+    sms = load_app_module()
+    app = sms.StudentManagementSystem(db_path)  # creates the schema (and the default admin)
+    conn = app.conn
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Parents are always loaded before their children; references are verified once at the end
+    conn.execute("PRAGMA foreign_keys=OFF")
+    counts = {}
+
+    def bulk(table, sql, rows):
+        t = time.perf_counter()
+        with conn:
+            cur = conn.executemany(sql, rows)
+        counts[table] = counts.get(table, 0) + cur.rowcount
+        log(f"  {table:<11} {cur.rowcount:>10,} rows  {time.perf_counter() - t:6.2f}s")
+
+    log(f"[Generate]: {db_path} seed={seed}")
+
+    # --- people ---
+    student_ids = [f"ST{n:07d}" for n in range(1, students + 1)]
+    teacher_ids = [f"GV{n:05d}" for n in range(1, teachers + 1)]
+    # Intake spread so that every term has students mid-programme
+    intake = [rnd.randrange(-TERMS_PER_STUDENT + 1, len(terms)) for _ in student_ids]
+
+    def user_rows():
+        for n, sid in enumerate(student_ids, 1):
+            yield (f"ACS{n:07d}", f"sv{n:07d}", "123456", _full_name(rnd), rnd.choice(("Male", "Female")),
+                   2000 + rnd.randrange(8), f"sv{n:07d}@st.uth.edu.vn", "student")
+        for n, tid in enumerate(teacher_ids, 1):
+            yield (f"ACT{n:05d}", f"gv{n:05d}", "123456", _full_name(rnd), rnd.choice(("Male", "Female")),
+                   1960 + rnd.randrange(30), f"gv{n:05d}@uth.edu.vn", "teacher")
+
+    bulk("User", "INSERT INTO User VALUES (?, ?, ?, ?, ?, ?, ?, ?)", user_rows())
+    bulk("Student", "INSERT INTO Student (StudentID, AccountID, Major) VALUES (?, ?, ?)",
+         ((sid, f"ACS{n:07d}", rnd.choice(MAJORS)) for n, sid in enumerate(student_ids, 1)))
+    bulk("Teacher", "INSERT INTO Teacher (TeacherID, AccountID, InstituteName) VALUES (?, ?, ?)",
+         ((tid, f"ACT{n:05d}", rnd.choice(INSTITUTES)) for n, tid in enumerate(teacher_ids, 1)))
+
+    # --- catalogue ---
+    subject_rows = [(f"SUB{n:04d}", f"{rnd.choice(LEVELS)} {rnd.choice(TOPICS)} {n}", rnd.choice((2, 3, 3, 4)))
+                    for n in range(1, subjects + 1)]
+    credits_of = {sid: cr for sid, _, cr in subject_rows}
+    bulk("Subject", "INSERT INTO Subject (SubjectID, SubjectName, Credits) VALUES (?, ?, ?)", subject_rows)
+
+    # Active students per term, and how many enrollments each term must carry
+    active = [[] for _ in terms]
+    for idx, first in enumerate(intake):
+        for t in range(max(first, 0), min(first + TERMS_PER_STUDENT, len(terms))):
+            active[t].append(idx)
+    student_terms = sum(len(a) for a in active) or 1
+    per_student = enrollments / student_terms
+
+    course_rows, schedule_rows, sections_by_term = [], [], []
+    rooms_needed = 1
+    for t, (year, sem) in enumerate(terms):
+        expected = int(len(active[t]) * per_student)
+        n_sections = max(math.ceil(expected / (class_size * 0.8)), 1) if active[t] else 0
+        slots_per_room = DAYS * len(PERIODS)
+        rooms = max(math.ceil(n_sections / slots_per_room), 1)
+        rooms_needed = max(rooms_needed, rooms)
+        term_sections = []
+        for j in range(n_sections):
+            subject_id = subject_rows[(j * 7 + t) % subjects][0]
+            course_id = f"C{year % 100:02d}{sem}-{j + 1:05d}"
+            # Consecutive sections share a (day, period) in different rooms, with different teachers
+            teacher_id = teacher_ids[j % teachers] if teachers else None
+            course_rows.append((course_id, subject_id, teacher_id, f"{subject_id}-{sem}{j % 100:02d}",
+                                year, sem, class_size, None))
+            room = f"R{(j % rooms) + 1:03d}"
+            period = PERIODS[(j // rooms) % len(PERIODS)]
+            day = (j // (rooms * len(PERIODS))) % DAYS + 1
+            duration = min(credits_of[subject_id] * 50, 170)
+            schedule_rows.append((course_id, day, period, _add_minutes(period, duration), room))
+            term_sections.append(course_id)
+        sections_by_term.append(term_sections)
+
+    bulk("Course", "INSERT INTO Course (CourseID, SubjectID, TeacherID, ClassName, Year, Semester, ClassSize, Description) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", course_rows)
+    bulk("Schedule", "INSERT INTO Schedule (CourseID, DayOfWeek, Start_Time, End_Time, Room) VALUES (?, ?, ?, ?, ?)",
+         schedule_rows)
+
+    # --- enrollments: the last term is in progress (no grades yet) ---
+    last_term = len(terms) - 1
+    whole, frac = int(per_student), per_student - int(per_student)
+
+    # Grades are drawn from a precomputed N(6.5, 1.8) pool: sampling per row dominated the run time
+    grade_pool = [round(min(max(rnd.gauss(6.5, 1.8), 0.0), 10.0), 1) for _ in range(4096)]
+    # Derived tables are collected while the rows are generated: rebuilding them from 5M stored
+    # enrollments afterwards took longer than the load itself. Grades are kept per term only, so
+    # the lists being appended to stay few and close together.
+    subject_index = {sid: n for n, (sid, _, _) in enumerate(subject_rows)}
+    subject_bit = {row[0]: 1 << subject_index[row[1]] for row in course_rows}
+    passed = [0] * len(student_ids)  # bit n set: student passed subject_rows[n]
+    grade_stats = []  # CourseGradeStats rows
+
+    def enrollment_rows():
+        randbelow, getrandbits, sample = rnd.random, rnd.getrandbits, rnd.sample
+        pass_grade = sms.PASS_GRADE
+        for t, (year, sem) in enumerate(terms):
+            sections = sections_by_term[t]
+            # Sampling positions picks the same sections as sampling the list itself
+            positions = range(len(sections))
+            register_date = f"{year}-{'08' if sem == 1 else '01'}-15"
+            graded = t != last_term
+            # A term's rows are emitted section by section, students in StudentID order: the
+            # UNIQUE(CourseID, StudentID) index is then filled by appending
+            rosters = [[] for _ in sections]
+            term_grades = [[] for _ in sections]
+            bits = [subject_bit[course_id] for course_id in sections]
+            for idx in active[t]:
+                student_id = student_ids[idx]
+                k = min(whole + (randbelow() < frac), len(sections))
+                if not graded:
+                    for j in sample(positions, k):
+                        rosters[j].append((student_id, None))
+                    continue
+                mask = 0
+                for j in sample(positions, k):
+                    grade = grade_pool[getrandbits(12)]
+                    rosters[j].append((student_id, grade))
+                    term_grades[j].append(grade)
+                    if grade >= pass_grade:
+                        mask |= bits[j]
+                passed[idx] |= mask
+            for course_id, roster, course_grades in zip(sections, rosters, term_grades):
+                for student_id, grade in roster:
+                    yield (course_id, student_id, grade, register_date)
+                if course_grades:
+                    n = len(course_grades)
+                    mean = sum(course_grades) / n
+                    grade_stats.append((course_id, n, mean,
+                                        max(sum(map(operator.mul, course_grades, course_grades)) - n * mean * mean, 0),
+                                        min(course_grades), max(course_grades),
+                                        sum(map(pass_grade.__le__, course_grades))))
+
+    def passed_rows():
+        # (StudentID, JSON array of SubjectIDs) in key order, so the rows append to the end of the
+        # WITHOUT ROWID table; one statement per student instead of one per row
+        for student_id, mask in zip(student_ids, passed):
+            bits = bin(mask)[:1:-1]  # bit n at position n
+            subject_ids, n = [], bits.find("1")
+            while n >= 0:
+                subject_ids.append(subject_rows[n][0])
+                n = bits.find("1", n + 1)
+            yield student_id, json.dumps(subject_ids)
+
+    # Building the indexes once after the load is much cheaper than maintaining them per row, and
+    # the per-row triggers (session identity stamps, timetable dirty marks, passed subjects) have
+    # nothing to invalidate in a new database; those tables are filled below instead
+    indexes = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name='Enrollment' "
+        "AND sql IS NOT NULL"
+    ).fetchall()
+    for index in indexes:
+        conn.execute(f"DROP {index['type'].upper()} {index['name']}")
+    bulk("Enrollment", "INSERT INTO Enrollment (CourseID, StudentID, Grade, RegisterDate) VALUES (?, ?, ?, ?)",
+         enrollment_rows())
+    t = time.perf_counter()
+    for index in indexes:
+        conn.execute(index['sql'])
+    conn.commit()
+    log(f"  Enrollment indexes/triggers rebuilt  {time.perf_counter() - t:6.2f}s")
+
+    t = time.perf_counter()
+    orphans = [o for o in app.find_orphans() if o[4]]
+    if orphans:
+        raise RuntimeError(f"generated rows reference missing parents: {orphans}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    log(f"  foreign keys checked  {time.perf_counter() - t:6.2f}s")
+
+    # Derived tables and planner statistics; timetables are built on first view
+    t = time.perf_counter()
+    with conn:
+        conn.execute("DELETE FROM CourseGradeStats")
+        conn.executemany("INSERT INTO CourseGradeStats (CourseID, Count, Mean, M2, MinGrade, MaxGrade, PassCount) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", grade_stats)
+        conn.execute("DELETE FROM PassedSubject")
+        conn.executemany("INSERT INTO PassedSubject (StudentID, SubjectID) SELECT ?, value FROM json_each(?)",
+                         passed_rows())
+    app.reset_student_timetables()
+    conn.execute("PRAGMA analysis_limit=1000")  # sampled statistics: a full ANALYZE reads every index
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.commit()
+    conn.close()
+    log(f"  derived tables + ANALYZE  {time.perf_counter() - t:6.2f}s")
+    log(f"[Completed]: {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s "
+        f"({rooms_needed} rooms, {len(terms)} terms)")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic database.")
+    parser.add_argument("--db", required=True, help="output SQLite file")
+    parser.add_argument("--force", action="store_true", help="overwrite an existing file")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--teachers", type=int, default=2000)
+    parser.add_argument("--subjects", type=int, default=800)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--start-year", type=int)
+    parser.add_argument("--enrollments", type=int, default=5000000)
+    parser.add_argument("--class-size", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        if not args.force:
+            print(f"[Error]: {args.db} already exists (use --force to overwrite)", file=sys.stderr)
+            return 1
+        os.remove(args.db)
+    generate(args.db, students=args.students, teachers=args.teachers, subjects=args.subjects,
+             years=args.years, start_year=args.start_year, enrollments=args.enrollments,
+             class_size=args.class_size, seed=args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
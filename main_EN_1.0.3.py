@@ -1,21 +1,783 @@
 import sqlite3
+import builtins
 import getpass
 import os
 import sys
-from datetime import datetime
+import argparse
+import csv
+import json
+import math
+import shutil
+import queue
+import threading
+import time
+import heapq
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+PASS_GRADE = 4.0  # 10-point scale, pass >= 4.0
+SLOW_QUERY_LOG = "slow_queries.log"
+# User columns shown as the profile and kept in the session identity (never PassWord)
+PROFILE_FIELDS = ("AccountID", "UserName", "FullName", "Email", "Sex", "YearOfBirth", "Role")
+
+# One student's timetable rows in StudentTimetable column order (see fetch_student_schedule)
+TIMETABLE_SOURCE = """
+    SELECT e.StudentID, c.Year, c.Semester, s.DayOfWeek, s.Start_Time, s.End_Time, s.ScheduleID,
+           c.CourseID, sub.SubjectName, c.ClassName, u.FullName AS TeacherName, s.Room
+    FROM Enrollment e
+    JOIN Course c ON e.CourseID = c.CourseID
+    JOIN Subject sub ON c.SubjectID = sub.SubjectID
+    JOIN Schedule s ON c.CourseID = s.CourseID
+    LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
+    LEFT JOIN User u ON t.AccountID = u.AccountID
+    WHERE e.StudentID = ?"""
+COURSE_ROSTER_SQL = """
+    SELECT e.EnrollID, s.StudentID, u.FullName, e.Grade
+    FROM Enrollment e
+    JOIN Student s ON e.StudentID = s.StudentID
+    JOIN User u ON s.AccountID = u.AccountID
+    WHERE e.CourseID = ?
+    ORDER BY s.StudentID"""
+SCHEMA_VERSION = 1  # PRAGMA user_version: 1 = Course/Schedule/Enrollment carry the constraints below
+
+# Tables whose rules are enforced by the schema, so bulk writes can rely on INSERT OR IGNORE /
+# IntegrityError instead of re-validating every row. Older databases are rebuilt into these
+# definitions by _migrate_constraints().
+CONSTRAINED_TABLES = {
+    "Course": """(
+        CourseID TEXT PRIMARY KEY,
+        SubjectID TEXT,
+        TeacherID TEXT,
+        ClassName TEXT,
+        Year INTEGER,
+        Semester INTEGER CHECK (Semester IN (1, 2)),
+        ClassSize INTEGER DEFAULT 50 CHECK (ClassSize > 0),
+        Description TEXT,
+        FOREIGN KEY(SubjectID) REFERENCES Subject(SubjectID),
+        FOREIGN KEY(TeacherID) REFERENCES Teacher(TeacherID)
+    )""",
+    "Schedule": """(
+        ScheduleID INTEGER PRIMARY KEY AUTOINCREMENT,
+        CourseID TEXT,
+        DayOfWeek INTEGER CHECK (DayOfWeek BETWEEN 1 AND 7),
+        Start_Time TEXT,
+        End_Time TEXT,
+        Room TEXT,
+        FOREIGN KEY(CourseID) REFERENCES Course(CourseID) ON DELETE CASCADE
+    )""",
+    "Enrollment": """(
+        EnrollID INTEGER PRIMARY KEY AUTOINCREMENT,
+        CourseID TEXT,
+        StudentID TEXT,
+        Grade REAL CHECK (Grade BETWEEN 0 AND 10),
+        RegisterDate TEXT,
+        Status TEXT DEFAULT 'registered',
+        UNIQUE(CourseID, StudentID),
+        FOREIGN KEY(CourseID) REFERENCES Course(CourseID),
+        FOREIGN KEY(StudentID) REFERENCES Student(StudentID)
+    )""",
+}
+# One row per student per class session. Keyed date first, so a week's roll calls append at the
+# end of the table; integer IDs and a one-letter Status keep rows small.
+ATTENDANCE_TABLE = """(
+        SessionDate TEXT NOT NULL,
+        ScheduleID INTEGER NOT NULL,
+        EnrollID INTEGER NOT NULL,
+        Status TEXT NOT NULL CHECK (Status IN ('P', 'L', 'A', 'E')),
+        PRIMARY KEY (SessionDate, ScheduleID, EnrollID),
+        FOREIGN KEY(ScheduleID) REFERENCES Schedule(ScheduleID) ON DELETE CASCADE,
+        FOREIGN KEY(EnrollID) REFERENCES Enrollment(EnrollID) ON DELETE CASCADE
+    )"""
+ATTENDANCE_STATUSES = {"P": "present", "L": "late", "A": "absent", "E": "excused"}
+ATTENDANCE_BATCH = 5000  # rows per transaction of a bulk attendance import
+# Attended share (%) of the sessions in an AttendanceSummary/AttendanceCourseSummary row a; excused ones don't count
+ATTENDANCE_RATE_SQL = "ROUND(100.0 * (a.Present + a.Late) / NULLIF(a.Sessions - a.Excused, 0), 1)"
+# (table, reason, rows that break the rule) checked in order by the migration; of duplicate
+# enrollments the graded (then newest) row is kept
+CONSTRAINT_VIOLATIONS = [
+    ("Course", "semester not 1 or 2", "Semester NOT IN (1, 2)"),
+    ("Course", "class size not positive", "ClassSize <= 0"),
+    ("Schedule", "day of week not 1-7", "DayOfWeek NOT BETWEEN 1 AND 7"),
+    ("Enrollment", "grade not 0-10", "Grade NOT BETWEEN 0 AND 10"),
+    ("Enrollment", "duplicate enrollment",
+     "EXISTS (SELECT 1 FROM Enrollment d WHERE d.CourseID = Enrollment.CourseID AND d.StudentID = Enrollment.StudentID "
+     "AND (d.Grade IS NOT NULL, d.EnrollID) > (Enrollment.Grade IS NOT NULL, Enrollment.EnrollID))"),
+]
+
+# References that may be cleared instead of deleting the row when their parent is gone
+OPTIONAL_REFERENCES = {("Course", "TeacherID")}
+PREFETCH_LIMIT = 8  # speculative reads queued per listed screen (the first entries are the likely picks)
+TIMETABLE_COLUMNS = "CourseID, SubjectName, ClassName, Year, Semester, DayOfWeek, Start_Time, End_Time, Room, TeacherName"
+
+# Weekly minutes of one Schedule row s (HH:MM times; invalid ones, reported by audit_schedules, count as 0)
+SCHEDULE_MINUTES = """MAX(
+    (CAST(substr(s.End_Time, 1, instr(s.End_Time, ':') - 1) AS INTEGER) * 60 + CAST(substr(s.End_Time, instr(s.End_Time, ':') + 1) AS INTEGER))
+  - (CAST(substr(s.Start_Time, 1, instr(s.Start_Time, ':') - 1) AS INTEGER) * 60 + CAST(substr(s.Start_Time, instr(s.Start_Time, ':') + 1) AS INTEGER)),
+  0)"""
+
+# Tables moved to the per-year archive files by archive_year(), parents first: the rows of one
+# Year (bound to ?). Everything else (users, subjects, derived tables) stays in the hot database.
+ARCHIVED_TABLES = {
+    "Course": "Year = ?",
+    "Schedule": "CourseID IN (SELECT CourseID FROM main.Course WHERE Year = ?)",
+    "Enrollment": "CourseID IN (SELECT CourseID FROM main.Course WHERE Year = ?)",
+    "Attendance": "EnrollID IN (SELECT EnrollID FROM main.Enrollment WHERE CourseID IN "
+                  "(SELECT CourseID FROM main.Course WHERE Year = ?))",
+}
+ARCHIVE_ATTACH_BATCH = 8  # SQLite attaches at most 10 databases to one connection by default
+
+
+def _use_case_caller():
+    """App methods on the stack that issued the current statement, outermost first"""
+    names = []
+    frame = sys._getframe(2)
+    while frame is not None and len(names) < 3:
+        name = frame.f_code.co_name
+        if name in _TRACED_METHODS:
+            names.append(name)
+        frame = frame.f_back
+    return " > ".join(reversed(names)) or "-"
+
+
+def _param_shape(params):
+    """Types of the bound parameters, never their values (they may be passwords)"""
+    if params is None:
+        return "-"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+
+
+def _archive_definition(table):
+    """CONSTRAINED_TABLES[table] (ATTENDANCE_TABLE for Attendance) without its foreign keys: in an
+    archive file the parent rows (students, subjects, teachers) live in another database"""
+    definition = ATTENDANCE_TABLE if table == "Attendance" else CONSTRAINED_TABLES[table]
+    lines = [line.strip().rstrip(",") for line in definition.strip()[1:-1].splitlines()]
+    return "(" + ", ".join(line for line in lines if line and not line.startswith("FOREIGN KEY")) + ")"
+
+
+class QueryTracer:
+    """Statement timings collected while the query trace is on; slow ones are logged with their plan"""
+
+    def __init__(self, conn, threshold_ms, log_path):
+        self.conn = conn
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self.stats = {}  # normalized SQL -> [calls, total ms, max ms, caller of the slowest call]
+        self.calls = 0
+        self.slow = 0
+        self.sqlite_statements = {}  # first keyword -> count, as executed by SQLite itself
+        self._explaining = False
+
+    def on_sqlite_statement(self, sql):
+        """sqlite3 trace callback: also sees implicit BEGIN/COMMIT and trigger steps"""
+        if not self._explaining:
+            kind = "TRIGGER" if sql.startswith("--") else sql.split(None, 1)[0].upper() if sql.strip() else "?"
+            self.sqlite_statements[kind] = self.sqlite_statements.get(kind, 0) + 1
+
+    def record(self, sql, params, caller, seconds):
+        ms = seconds * 1000
+        key = " ".join(sql.split())
+        entry = self.stats.get(key)
+        if entry is None:
+            entry = self.stats[key] = [0, 0.0, 0.0, caller]
+        entry[0] += 1
+        entry[1] += ms
+        if ms > entry[2]:
+            entry[2], entry[3] = ms, caller
+        self.calls += 1
+        if ms >= self.threshold_ms:
+            self.slow += 1
+            self._log_slow(key, sql, params, caller, ms)
+
+    def _log_slow(self, key, sql, params, caller, ms):
+        plan = []
+        if params is not None:
+            self._explaining = True
+            try:
+                depth = {0: -1}
+                # The plain Connection.execute: explaining must not be traced itself
+                for node_id, parent, _, detail in sqlite3.Connection.execute(
+                        self.conn, "EXPLAIN QUERY PLAN " + sql, params):
+                    depth[node_id] = depth.get(parent, -1) + 1
+                    plan.append("    " + "  " * depth[node_id] + detail)
+            except sqlite3.Error as e:
+                plan.append(f"    (no plan: {e})")
+            finally:
+                self._explaining = False
+        entry = (f"# {datetime.now():%Y-%m-%d %H:%M:%S}  {ms:.2f} ms  {caller}  params {_param_shape(params)}\n"
+                 f"{key}\n" + ("  plan:\n" + "\n".join(plan) + "\n" if plan else "") + "\n")
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as log:
+                log.write(entry)
+        except OSError:
+            pass  # diagnostics must never break the screen being traced
+
+    def top(self, limit=20):
+        """(sql, calls, total ms, max ms, caller) sorted by total time"""
+        ranked = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, calls, total, peak, caller) for sql, (calls, total, peak, caller) in ranked[:limit]]
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Installed as app.cursor, and made by TracingConnection.execute(), only while the query
+    trace is on.
+
+    A statement is timed from execute() until its rows have been fetched, or until the cursor
+    is dropped (conn.execute() callers rarely read to the end).
+    """
+
+    def __init__(self, conn, tracer):
+        super().__init__(conn)
+        self.tracer = tracer
+        self._pending = None
+
+    def _finish(self):
+        if self._pending:
+            pending, self._pending = self._pending, None
+            self.tracer.record(*pending)
+
+    def execute(self, sql, params=()):
+        self._finish()
+        caller = _use_case_caller()
+        started = time.perf_counter()
+        super().execute(sql, params)
+        self._pending = [sql, params, caller, time.perf_counter() - started]
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        caller = _use_case_caller()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        self.tracer.record(sql, None, caller, time.perf_counter() - started)
+        return self
+
+    def executescript(self, sql_script):
+        self._finish()
+        caller = _use_case_caller()
+        started = time.perf_counter()
+        super().executescript(sql_script)
+        self.tracer.record(sql_script, None, caller, time.perf_counter() - started)
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        result = fetch(*args)
+        if self._pending:
+            self._pending[3] += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed_fetch(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def __del__(self):
+        self._finish()
+
+
+class TracingConnection(sqlite3.Connection):
+    """The app's connection class: conn.execute() and friends go through the query trace when one
+    is on (see StudentManagementSystem.enable_query_trace); otherwise they are the plain calls."""
+
+    tracer = None
+
+    def execute(self, sql, params=()):
+        if self.tracer is None:
+            return super().execute(sql, params)
+        return TracingCursor(self, self.tracer).execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        if self.tracer is None:
+            return super().executemany(sql, seq_of_params)
+        return TracingCursor(self, self.tracer).executemany(sql, seq_of_params)
+
+    def executescript(self, sql_script):
+        if self.tracer is None:
+            return super().executescript(sql_script)
+        return TracingCursor(self, self.tracer).executescript(sql_script)
+
+
+class _CatalogRecord:
+    """Compact catalog row: attribute access, plus row['Column'] / row[i] like sqlite3.Row"""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        return getattr(self, self.__slots__[key] if isinstance(key, int) else key)
+
+    def keys(self):
+        return list(self.__slots__)
+
+
+class SubjectRecord(_CatalogRecord):
+    __slots__ = ("SubjectID", "SubjectName", "Credits")
+
+
+class CourseRecord(_CatalogRecord):
+    __slots__ = ("CourseID", "SubjectID", "TeacherID", "ClassName", "Year", "Semester", "ClassSize", "Description")
+
+
+class TeacherRecord(_CatalogRecord):
+    __slots__ = ("TeacherID", "AccountID", "FullName", "InstituteName")
+
+
+class CatalogCache:
+    """Read-through cache of the Subject and Teacher catalogs used by menu navigation; course
+    sections are looked up by key instead (there are too many, and they change all the time).
+
+    Triggers stamp CatalogVersion whenever one of those tables changes. The stamps are only
+    re-read after this connection wrote something (total_changes) or another connection
+    committed (PRAGMA data_version), and only the tables whose stamp moved are reloaded.
+    """
+
+    COURSE_COLUMNS = "CourseID, SubjectID, TeacherID, ClassName, Year, Semester, ClassSize, Description"
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.loads = 0
+        self._seen = None  # (data_version, total_changes) at the last check
+        self._stamps = {}
+        self._subjects = None  # (ordered list, by SubjectID)
+        self._teachers = None  # (ordered by name, by TeacherID)
+
+    def _check(self):
+        seen = (self.conn.execute("PRAGMA data_version").fetchone()[0], self.conn.total_changes)
+        if seen == self._seen:
+            return
+        self._seen = seen
+        for table, stamp in self.conn.execute("SELECT TableName, Version FROM CatalogVersion"):
+            if self._stamps.get(table) != stamp:
+                self._stamps[table] = stamp
+                self.invalidate(table)
+
+    def invalidate(self, table=None):
+        if table in (None, "Subject"):
+            self._subjects = None
+        if table in (None, "Teacher"):
+            self._teachers = None
+
+    def subjects(self):
+        """All subjects ordered by SubjectID"""
+        self._check()
+        if self._subjects is None:
+            rows = [SubjectRecord(*r) for r in
+                    self.conn.execute("SELECT SubjectID, SubjectName, Credits FROM Subject ORDER BY SubjectID")]
+            self._subjects = (rows, {s.SubjectID: s for s in rows})
+            self.loads += 1
+        return self._subjects[0]
+
+    def subject(self, subject_id):
+        self.subjects()
+        return self._subjects[1].get(subject_id)
+
+    def _courses(self, where, params, order="CourseID"):
+        return [CourseRecord(*r) for r in self.conn.execute(
+            f"SELECT {self.COURSE_COLUMNS} FROM Course WHERE {where} ORDER BY {order}", params)]
+
+    def course(self, course_id):
+        row = self.conn.execute(f"SELECT {self.COURSE_COLUMNS} FROM Course WHERE CourseID = ?", (course_id,)).fetchone()
+        return CourseRecord(*row) if row else None
+
+    def courses_for_subject(self, subject_id):
+        """Course sections of a subject, newest term first"""
+        return self._courses("SubjectID = ?", (subject_id,), "Year DESC, Semester DESC, CourseID")
+
+    def courses_for_teacher(self, teacher_id):
+        return self._courses("TeacherID = ?", (teacher_id,))
+
+    def current_term(self):
+        """(Year, Semester) of the newest term with enrollments, or None without any.
+
+        Sections created ahead of time (term rollover) only make their term current once the
+        first student is enrolled in one; until then the index walk steps over them.
+        """
+        row = self.conn.execute("""
+            SELECT c.Year, c.Semester FROM Course c
+            WHERE EXISTS (SELECT 1 FROM Enrollment e WHERE e.CourseID = c.CourseID)
+            ORDER BY c.Year DESC, c.Semester DESC LIMIT 1
+        """).fetchone()
+        return (row[0] or 0, row[1] or 0) if row else None
+
+    def stamp(self, table):
+        return self._stamps.get(table)
+
+    def teachers(self):
+        """All teachers with their names, ordered by FullName"""
+        self._check()
+        if self._teachers is None:
+            rows = [TeacherRecord(*r) for r in self.conn.execute("""
+                SELECT t.TeacherID, t.AccountID, u.FullName, t.InstituteName
+                FROM Teacher t JOIN User u ON t.AccountID = u.AccountID
+                ORDER BY u.FullName
+            """)]
+            self._teachers = (rows, {t.TeacherID: t for t in rows})
+            self.loads += 1
+        return self._teachers[0]
+
+    def teacher_name(self, teacher_id):
+        self.teachers()
+        teacher = self._teachers[1].get(teacher_id)
+        return teacher.FullName if teacher else None
+
+
+class Prefetcher:
+    """Speculative reads of the likely next screen, run on a background thread with its own connection.
+
+    request() queues a read tagged with the caller's validity mark (see
+    StudentManagementSystem._data_mark); get() only returns rows stored under the same
+    mark, i.e. when nothing has been committed since the read was requested. Results
+    are kept in a bounded LRU.
+    """
+
+    def __init__(self, db_name, capacity=64):
+        self.db_name = db_name
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()  # key -> (mark, rows)
+        self._queued = set()  # (key, mark) waiting for the worker
+        self._running = None  # (key, mark) being read right now
+        self._jobs = queue.Queue()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def request(self, key, mark, sql, params=()):
+        with self._cond:
+            entry = self._results.get(key)
+            if (entry and entry[0] == mark) or (key, mark) in self._queued or self._running == (key, mark):
+                return
+            self._queued.add((key, mark))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="sms-prefetch", daemon=True)
+                self._thread.start()
+        self._jobs.put((key, mark, sql, params))
+
+    def get(self, key, mark, wait=2.0):
+        """Prefetched rows for key, or None (the caller then runs the query itself)"""
+        if mark is None:
+            return None
+        with self._cond:
+            # Already being read: finishing that read is quicker than starting another
+            self._cond.wait_for(lambda: self._running != (key, mark), timeout=wait)
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == mark:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _worker(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                key, mark, sql, params = job
+                with self._cond:
+                    self._queued.discard((key, mark))
+                    self._running = (key, mark)
+                try:
+                    rows = conn.execute(sql, params).fetchall()
+                except sqlite3.Error:
+                    rows = None  # only speculative: the screen will run the query itself
+                with self._cond:
+                    self._running = None
+                    if rows is not None:
+                        self._results[key] = (mark, rows)
+                        self._results.move_to_end(key)
+                        while len(self._results) > self.capacity:
+                            self._results.popitem(last=False)
+                    self._cond.notify_all()
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class TimetableRefresher:
+    """Rebuilds stale StudentTimetable rows (see TimetableDirty) on a background thread with its own
+    connection, one student per short transaction.
+
+    Reads never write: fetch_student_schedule() serves a stale timetable from the base tables
+    and queues the student here, so the next view reads the materialized rows.
+    """
+
+    def __init__(self, db_name, timeout=30):
+        self.db_name = db_name
+        self.timeout = timeout
+        self.rebuilt = 0
+        self._queued = set()  # StudentIDs waiting for the worker
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def request(self, student_id):
+        with self._lock:
+            if student_id in self._queued:
+                return
+            self._queued.add(student_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="sms-timetable", daemon=True)
+                self._thread.start()
+        self._jobs.put(student_id)
+
+    def _worker(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout)
+        try:
+            while True:
+                student_id = self._jobs.get()
+                if student_id is None:
+                    break
+                with self._lock:
+                    self._queued.discard(student_id)
+                try:
+                    with conn:
+                        conn.execute("DELETE FROM StudentTimetable WHERE StudentID = ?", (student_id,))
+                        conn.execute(f"INSERT OR REPLACE INTO StudentTimetable {TIMETABLE_SOURCE}", (student_id,))
+                        conn.execute("DELETE FROM TimetableDirty WHERE StudentID = ?", (student_id,))
+                    self.rebuilt += 1
+                except sqlite3.Error:
+                    pass  # still marked dirty: the next view queues it again
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of durations: exact below 64 us, then 32 buckets per
+    power of two (about 3% relative error), so memory stays small whatever the sample count.
+    """
+    __slots__ = ("counts", "count", "total_us", "max_us", "_lock")
 
-class StudentManagementSystem:
     def __init__(self):
-        self.db_name = "management_system.db"
-        self.conn = sqlite3.connect(self.db_name)
+        self.counts = {}  # bucket lower bound (us) -> samples
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self._lock = threading.Lock()  # the API server records from every worker thread
+
+    def record(self, seconds):
+        us = max(int(seconds * 1000000), 0)
+        shift = max(us.bit_length() - 6, 0)
+        bucket = us >> shift << shift
+        with self._lock:
+            self.counts[bucket] = self.counts.get(bucket, 0) + 1
+            self.count += 1
+            self.total_us += us
+            if us > self.max_us:
+                self.max_us = us
+
+    def merge(self, other):
+        counts = dict(other.counts)
+        with self._lock:
+            for bucket, n in counts.items():
+                self.counts[bucket] = self.counts.get(bucket, 0) + n
+            self.count += other.count
+            self.total_us += other.total_us
+            self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q):
+        """Value at quantile q (0-1) in milliseconds (bucket midpoint, capped at the maximum)"""
+        if not self.count:
+            return 0.0
+        rank = max(q * self.count, 1)
+        seen = 0
+        # dict() copies under the GIL, so a metrics thread can read while the menus record
+        for bucket, n in sorted(dict(self.counts).items()):
+            seen += n
+            if seen >= rank:
+                width = 1 << max(bucket.bit_length() - 6, 0)
+                return min(bucket + (width - 1) / 2, self.max_us) / 1000
+        return self.max_us / 1000
+
+
+class LatencyRecorder:
+    """Latency histograms per use case, with optional p95 SLOs (ms) to check them against"""
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, slos=None):
+        self.histograms = {}
+        self.slos = dict(slos or {})
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:  # two threads must not both create the first histogram of a name
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def summary(self):
+        """(use case, count, p50, p95, p99, max ms, SLO ms or None, over SLO) rows sorted by name"""
+        rows = []
+        for name, h in sorted(dict(self.histograms).items()):
+            p50, p95, p99 = (h.percentile(q) for q in self.QUANTILES)
+            slo = self.slos.get(name)
+            rows.append((name, h.count, p50, p95, p99, h.max_us / 1000, slo, slo is not None and p95 > slo))
+        return rows
+
+    def report_lines(self):
+        lines = [f"{'use case':<34} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  SLO"]
+        for name, count, p50, p95, p99, peak, slo, over in self.summary():
+            slo_text = "" if slo is None else f"p95 <= {slo:g}" + ("  << OVER" if over else "")
+            lines.append(f"{name:<34} {count:>7} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f} {peak:>9.2f}  {slo_text}")
+        return lines
+
+    def prometheus(self, metric="sms_use_case_latency_seconds"):
+        """Prometheus text exposition: one summary per use case, plus the configured SLOs"""
+        lines = [f"# HELP {metric} Use-case latency, excluding time spent waiting for input.",
+                 f"# TYPE {metric} summary"]
+        for name, h in sorted(dict(self.histograms).items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for q in self.QUANTILES:
+                lines.append(f'{metric}{{use_case="{label}",quantile="{q}"}} {h.percentile(q) / 1000:.6f}')
+            lines.append(f'{metric}_sum{{use_case="{label}"}} {h.total_us / 1000000:.6f}')
+            lines.append(f'{metric}_count{{use_case="{label}"}} {h.count}')
+        if self.slos:
+            lines += [f"# HELP {metric}_slo p95 latency objective per use case.", f"# TYPE {metric}_slo gauge"]
+            for name, slo in sorted(self.slos.items()):
+                lines.append(f'{metric}_slo{{use_case="{name}",quantile="0.95"}} {slo / 1000:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+class ActionProfiler:
+    """--profile: a cProfile .pstats file per menu action and, optionally, a tracemalloc
+    report of the lines that allocated the most memory during it.
+    """
+
+    def __init__(self, out_dir, trace_memory=False, frames=8):
+        import cProfile  # only loaded when profiling
+        self._cProfile = cProfile
+        self.out_dir = out_dir
+        self.seq = 0
+        self.tracemalloc = None
+        os.makedirs(out_dir, exist_ok=True)
+        if trace_memory:
+            import tracemalloc
+            tracemalloc.start(frames)
+            self.tracemalloc = tracemalloc
+
+    def run(self, name, action):
+        self.seq += 1
+        base = os.path.join(self.out_dir, f"{self.seq:03d}_{name}")
+        before = None
+        if self.tracemalloc:
+            before = self.tracemalloc.take_snapshot()
+            self.tracemalloc.reset_peak()
+        profile = self._cProfile.Profile()
+        try:
+            return profile.runcall(action)
+        finally:
+            if before is not None:
+                self._write_allocations(base + ".alloc.txt", name, before)
+            profile.dump_stats(base + ".pstats")
+
+    def _write_allocations(self, path, name, before):
+        tm = self.tracemalloc
+        current, peak = tm.get_traced_memory()
+        after = tm.take_snapshot()
+        ignore = [tm.Filter(False, tm.__file__), tm.Filter(False, self._cProfile.__file__),
+                  tm.Filter(False, "<frozen importlib._bootstrap*>")]
+        stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        lines = [f"{name}: traced memory peaked at {peak / 1024:.1f} KiB during the action, {current / 1024:.1f} KiB after it",
+                 "", "Top allocating lines (memory still held at the end of the action):"]
+        lines += [f"  {stat}" for stat in stats[:25]]
+        largest = max(stats, key=lambda stat: stat.size_diff, default=None)
+        if largest is not None and largest.size_diff > 0:
+            lines += ["", "Traceback of the largest:"] + [f"  {line}" for line in largest.traceback.format()]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+_input_wait = 0.0  # seconds spent blocked in _timed_input()/getpass(); use-case latency leaves it out
+
+
+def _timed_input(prompt=""):
+    """builtins.input, keeping count of the time spent waiting for the user"""
+    global _input_wait
+    started = time.perf_counter()
+    try:
+        return builtins.input(prompt)
+    finally:
+        _input_wait += time.perf_counter() - started
+
+
+def _getpass(prompt="Password: "):
+    """getpass.getpass, keeping count of the time spent waiting for the user"""
+    global _input_wait
+    started = time.perf_counter()
+    try:
+        return getpass.getpass(prompt)
+    finally:
+        _input_wait += time.perf_counter() - started
+
+
+class StudentManagementSystem:
+    def __init__(self, db_name="management_system.db", check_same_thread=True):
+        self.db_name = db_name
+        self.conn = sqlite3.connect(self.db_name, check_same_thread=check_same_thread, factory=TracingConnection)
         self.conn.row_factory = sqlite3.Row
+        # Off by default in SQLite; without it none of the ON DELETE CASCADE clauses fire
+        self.conn.execute("PRAGMA foreign_keys = ON")
         self.cursor = self.conn.cursor()
         self.current_user = None
+        self.query_tracer = None
+        self.latency = LatencyRecorder()
+        self.latency_log = None  # latency report appended here on logout
+        self._subaction = None
+        self.profiler = None  # ActionProfiler when started with --profile
+        self.prefetcher = None  # Prefetcher for the interactive menus (see main)
+        self.timetable_refresher = None  # TimetableRefresher, see enable_timetable_refresh()
+        self._identities = {}  # AccountID -> (identity, validity marks), see session_identity()
+        self._request_serial = 0  # bumped per screen/request, see begin_request()
         self.setup_database()
+        self.catalog = CatalogCache(self.conn)
 
     def setup_database(self):
         """Initialize DB structure if not exists (Based on Design_Database)"""
-        self.cursor.executescript('''
+        fresh = not self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='Enrollment'"
+        ).fetchone()
+        self.cursor.executescript(f'''
             CREATE TABLE IF NOT EXISTS User (
                 AccountID TEXT PRIMARY KEY,
                 UserName TEXT UNIQUE,
@@ -48,45 +810,568 @@ class StudentManagementSystem:
                 SubjectName TEXT,
                 Credits INTEGER
             );
-            CREATE TABLE IF NOT EXISTS Course (
+            CREATE TABLE IF NOT EXISTS Course {CONSTRAINED_TABLES["Course"]};
+            CREATE TABLE IF NOT EXISTS Schedule {CONSTRAINED_TABLES["Schedule"]};
+            CREATE TABLE IF NOT EXISTS Enrollment {CONSTRAINED_TABLES["Enrollment"]};
+            CREATE INDEX IF NOT EXISTS idx_enrollment_student ON Enrollment(StudentID, CourseID);
+            -- Child-side foreign key indexes: every parent delete/update looks its children up
+            CREATE INDEX IF NOT EXISTS idx_student_account ON Student(AccountID);
+            CREATE INDEX IF NOT EXISTS idx_teacher_account ON Teacher(AccountID);
+            CREATE INDEX IF NOT EXISTS idx_admin_account ON Admin(AccountID);
+            CREATE INDEX IF NOT EXISTS idx_course_subject ON Course(SubjectID);
+            CREATE INDEX IF NOT EXISTS idx_course_teacher ON Course(TeacherID);
+            CREATE INDEX IF NOT EXISTS idx_course_term ON Course(Year, Semester);
+            CREATE INDEX IF NOT EXISTS idx_schedule_course ON Schedule(CourseID);
+        ''')
+        # Older databases were created before Enrollment.RegisterDate/Status existed
+        enrollment_columns = {r['name'] for r in self.cursor.execute("PRAGMA table_info(Enrollment)")}
+        if 'Status' not in enrollment_columns:
+            self.cursor.execute("ALTER TABLE Enrollment ADD COLUMN RegisterDate TEXT")
+            self.cursor.execute("ALTER TABLE Enrollment ADD COLUMN Status TEXT DEFAULT 'registered'")
+            self.conn.commit()
+        rejected = {}
+        if self.cursor.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            if fresh:
+                self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            else:
+                rejected = self._migrate_constraints()
+        self._setup_course_grade_stats()
+        self._setup_catalog_versions()
+        self._setup_account_versions()
+        self._setup_student_timetable()
+        self._setup_prerequisites()
+        self._setup_curriculum()
+        self._setup_exam_schedule()
+        self._setup_attendance()
+        if any(table == "Enrollment" for table, _ in rejected):
+            self.rebuild_course_grade_stats()
+            self.reset_student_timetables()
+            self.rebuild_passed_subjects()
+        # Create default admin account if DB is empty
+        self.cursor.execute("SELECT COUNT(*) FROM User")
+        if self.cursor.fetchone()[0] == 0:
+            self.cursor.execute("INSERT INTO User VALUES ('ACC001','admin','admin123','System Admin','Male','1990','admin@uth.edu.vn','admin')")
+            self.cursor.execute("INSERT INTO Admin VALUES ('ADM001','ACC001')")
+            self.conn.commit()
+
+    def _migrate_constraints(self):
+        """Rebuild Course/Schedule/Enrollment of an older database into CONSTRAINED_TABLES.
+
+        Rows that would break a new constraint are moved to SchemaRejects (as JSON, with the
+        reason) and reported on stderr; everything else is copied as is. One transaction.
+        """
+        self.conn.commit()
+        # DROP TABLE would cascade with foreign keys on; the legacy rename leaves triggers of
+        # other tables that name the table being rebuilt alone
+        self.conn.execute("PRAGMA foreign_keys = OFF")
+        self.conn.execute("PRAGMA legacy_alter_table = ON")
+        rejected = {}
+        try:
+            self.conn.execute("BEGIN")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS SchemaRejects (
+                    RejectID INTEGER PRIMARY KEY,
+                    TableName TEXT,
+                    Reason TEXT,
+                    RowData TEXT,
+                    RejectedAt TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            for table, definition in CONSTRAINED_TABLES.items():
+                columns = [r['name'] for r in self.conn.execute(f"PRAGMA table_info({table})")]
+                row_data = "json_object(" + ", ".join(f"'{c}', {c}" for c in columns) + ")"
+                for check_table, reason, where in CONSTRAINT_VIOLATIONS:
+                    if check_table != table:
+                        continue
+                    cur = self.conn.execute(f"INSERT INTO SchemaRejects (TableName, Reason, RowData) "
+                                            f"SELECT ?, ?, {row_data} FROM {table} WHERE {where}", (table, reason))
+                    if cur.rowcount:
+                        rejected[(table, reason)] = cur.rowcount
+                        self.conn.execute(f"DELETE FROM {table} WHERE {where}")
+                dependents = self.conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+                    (table,)
+                ).fetchall()
+                column_list = ", ".join(columns)
+                self.conn.execute(f"CREATE TABLE {table}_new {definition}")
+                self.conn.execute(f"INSERT INTO {table}_new ({column_list}) SELECT {column_list} FROM {table}")
+                self.conn.execute(f"DROP TABLE {table}")
+                self.conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+                for (sql,) in dependents:
+                    self.conn.execute(sql)
+            # A prefix of the new UNIQUE(CourseID, StudentID) index
+            self.conn.execute("DROP INDEX IF EXISTS idx_enrollment_course")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.execute("PRAGMA legacy_alter_table = OFF")
+            self.conn.execute("PRAGMA foreign_keys = ON")
+        for (table, reason), count in rejected.items():
+            print(f"[Warning]: Schema upgrade moved {count} {table} row(s) to SchemaRejects: {reason}", file=sys.stderr)
+        if rejected:
+            print("[Warning]: Review SchemaRejects, then run 'sms db check' for rows left without a parent",
+                  file=sys.stderr)
+        return rejected
+
+    def _setup_course_grade_stats(self):
+        """Per-course grade statistics kept up to date online (Welford) by the grade-writing path"""
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='CourseGradeStats'"
+        ).fetchone()
+        if exists:
+            return
+        self.cursor.execute('''
+            CREATE TABLE CourseGradeStats (
                 CourseID TEXT PRIMARY KEY,
-                SubjectID TEXT,
-                TeacherID TEXT,
-                ClassName TEXT,
+                Count INTEGER NOT NULL DEFAULT 0,
+                Mean REAL NOT NULL DEFAULT 0,
+                M2 REAL NOT NULL DEFAULT 0,
+                MinGrade REAL,
+                MaxGrade REAL,
+                PassCount INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY(CourseID) REFERENCES Course(CourseID) ON DELETE CASCADE
+            )
+        ''')
+        self.rebuild_course_grade_stats()
+
+    def _setup_catalog_versions(self):
+        """CatalogVersion stamps, changed by triggers on every catalog write (see CatalogCache)"""
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='CatalogVersion'"
+        ).fetchone()
+        if exists:
+            return
+        script = ["CREATE TABLE CatalogVersion (TableName TEXT PRIMARY KEY, Version INTEGER NOT NULL DEFAULT 0)",
+                  "INSERT INTO CatalogVersion (TableName) VALUES ('Subject'), ('Course'), ('Teacher')"]
+        watched = [("Subject", "Subject", ("INSERT", "UPDATE", "DELETE")),
+                   ("Course", "Course", ("INSERT", "UPDATE", "DELETE")),
+                   ("Teacher", "Teacher", ("INSERT", "UPDATE", "DELETE")),
+                   ("User", "Teacher", ("UPDATE OF FullName", "DELETE"))]  # teacher names live in User
+        for table, stamp, events in watched:
+            for event in events:
+                script.append(f"CREATE TRIGGER trg_catalog_{table.lower()}_{event.split()[0].lower()} "
+                              f"AFTER {event} ON {table} BEGIN "
+                              f"UPDATE CatalogVersion SET Version = random() WHERE TableName = '{stamp}'; END")
+        self.cursor.executescript(";\n".join(script) + ";")
+
+    def _setup_account_versions(self):
+        """AccountVersion stamps, changed by triggers whenever anything in an account's session
+        identity changes: the User row, its Student/Teacher/Admin row or a student's enrollments"""
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='AccountVersion'"
+        ).fetchone()
+        if exists:
+            return
+        script = ["CREATE TABLE AccountVersion (AccountID TEXT PRIMARY KEY, Version INTEGER NOT NULL)"]
+        stamp = "INSERT OR REPLACE INTO AccountVersion (AccountID, Version) VALUES ({}.AccountID, random());"
+        triggers = {
+            "user_update": ("AFTER UPDATE ON User", stamp.format("OLD") + stamp.format("NEW")),
+            "user_delete": ("AFTER DELETE ON User", stamp.format("OLD")),
+        }
+        for table in ("Student", "Teacher", "Admin"):
+            triggers[f"{table.lower()}_insert"] = (f"AFTER INSERT ON {table}", stamp.format("NEW"))
+            triggers[f"{table.lower()}_update"] = (f"AFTER UPDATE ON {table}", stamp.format("OLD") + stamp.format("NEW"))
+            triggers[f"{table.lower()}_delete"] = (f"AFTER DELETE ON {table}", stamp.format("OLD"))
+        enrolled = ("INSERT OR REPLACE INTO AccountVersion (AccountID, Version) "
+                    "SELECT AccountID, random() FROM Student WHERE StudentID = {}.StudentID;")
+        triggers["enrollment_insert"] = ("AFTER INSERT ON Enrollment", enrolled.format("NEW"))
+        triggers["enrollment_update"] = ("AFTER UPDATE OF CourseID, StudentID ON Enrollment",
+                                         enrolled.format("OLD") + enrolled.format("NEW"))
+        triggers["enrollment_delete"] = ("AFTER DELETE ON Enrollment", enrolled.format("OLD"))
+        for name, (event, body) in triggers.items():
+            script.append(f"CREATE TRIGGER trg_account_{name} {event} BEGIN {body} END")
+        self.cursor.executescript(";\n".join(script) + ";")
+
+    def _setup_student_timetable(self):
+        """StudentTimetable: each student's weekly timetable, materialized in display order.
+
+        Triggers only record which students are stale (TimetableDirty); a stale timetable
+        is read from the base tables and rebuilt in the background, see fetch_student_schedule().
+        """
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='StudentTimetable'"
+        ).fetchone()
+        if exists:
+            return
+        script = ['''CREATE TABLE StudentTimetable (
+                StudentID TEXT NOT NULL,
                 Year INTEGER,
                 Semester INTEGER,
-                ClassSize INTEGER DEFAULT 50,
-                Description TEXT,
-                FOREIGN KEY(SubjectID) REFERENCES Subject(SubjectID),
-                FOREIGN KEY(TeacherID) REFERENCES Teacher(TeacherID)
-            );
-            CREATE TABLE IF NOT EXISTS Schedule (
-                ScheduleID INTEGER PRIMARY KEY AUTOINCREMENT,
-                CourseID TEXT,
                 DayOfWeek INTEGER,
                 Start_Time TEXT,
                 End_Time TEXT,
+                ScheduleID INTEGER NOT NULL,
+                CourseID TEXT,
+                SubjectName TEXT,
+                ClassName TEXT,
+                TeacherName TEXT,
                 Room TEXT,
-                FOREIGN KEY(CourseID) REFERENCES Course(CourseID) ON DELETE CASCADE
+                PRIMARY KEY (StudentID, Year DESC, Semester DESC, DayOfWeek, Start_Time, ScheduleID)
+            ) WITHOUT ROWID''',
+                  "CREATE TABLE TimetableDirty (StudentID TEXT PRIMARY KEY) WITHOUT ROWID"]
+        mark = "INSERT OR IGNORE INTO TimetableDirty (StudentID) "
+        course_students = mark + "SELECT StudentID FROM Enrollment WHERE CourseID = {}.CourseID;"
+        subject_students = (mark + "SELECT e.StudentID FROM Course c JOIN Enrollment e ON e.CourseID = c.CourseID "
+                                   "WHERE c.SubjectID = {}.SubjectID;")
+        teacher_students = (mark + "SELECT e.StudentID FROM Teacher t JOIN Course c ON c.TeacherID = t.TeacherID "
+                                   "JOIN Enrollment e ON e.CourseID = c.CourseID WHERE t.AccountID = {}.AccountID;")
+        triggers = {
+            "enrollment_insert": ("AFTER INSERT ON Enrollment", mark + "VALUES (NEW.StudentID);"),
+            "enrollment_update": ("AFTER UPDATE OF CourseID, StudentID ON Enrollment",
+                                  mark + "VALUES (OLD.StudentID);" + mark + "VALUES (NEW.StudentID);"),
+            "enrollment_delete": ("AFTER DELETE ON Enrollment", mark + "VALUES (OLD.StudentID);"),
+            "schedule_insert": ("AFTER INSERT ON Schedule", course_students.format("NEW")),
+            "schedule_update": ("AFTER UPDATE ON Schedule", course_students.format("OLD") + course_students.format("NEW")),
+            "schedule_delete": ("AFTER DELETE ON Schedule", course_students.format("OLD")),
+            "course_update": ("AFTER UPDATE OF SubjectID, TeacherID, ClassName, Year, Semester ON Course",
+                              course_students.format("NEW")),
+            "course_delete": ("AFTER DELETE ON Course", course_students.format("OLD")),
+            "subject_update": ("AFTER UPDATE OF SubjectName ON Subject", subject_students.format("NEW")),
+            "teacher_update": ("AFTER UPDATE OF AccountID ON Teacher",
+                               teacher_students.format("OLD") + teacher_students.format("NEW")),
+            "teacher_delete": ("AFTER DELETE ON Teacher",
+                               mark + "SELECT e.StudentID FROM Course c JOIN Enrollment e ON e.CourseID = c.CourseID "
+                                      "WHERE c.TeacherID = OLD.TeacherID;"),
+            "user_update": ("AFTER UPDATE OF FullName ON User", teacher_students.format("NEW")),
+        }
+        for name, (event, body) in triggers.items():
+            script.append(f"CREATE TRIGGER trg_timetable_{name} {event} BEGIN {body} END")
+        self.cursor.executescript(";\n".join(script) + ";")
+        self.reset_student_timetables()
+
+    def _setup_prerequisites(self):
+        """Prerequisite edges between subjects, their transitive closure and each student's passed subjects.
+
+        PrerequisiteClosure holds every (subject, required subject) pair reachable through
+        Prerequisite and is kept current by add_prerequisite()/remove_prerequisite().
+        PassedSubject is kept by triggers on Enrollment grades; deleting an enrollment (or
+        archiving it) leaves the pass in place, see rebuild_passed_subjects().
+        """
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='PrerequisiteClosure'"
+        ).fetchone()
+        if exists:
+            return
+        script = ['''CREATE TABLE Prerequisite (
+                SubjectID TEXT NOT NULL,
+                RequiredID TEXT NOT NULL,
+                PRIMARY KEY (SubjectID, RequiredID),
+                FOREIGN KEY(SubjectID) REFERENCES Subject(SubjectID) ON DELETE CASCADE,
+                FOREIGN KEY(RequiredID) REFERENCES Subject(SubjectID) ON DELETE CASCADE
+            ) WITHOUT ROWID''',
+                  "CREATE INDEX idx_prerequisite_required ON Prerequisite(RequiredID)",
+                  "CREATE TABLE PrerequisiteClosure (SubjectID TEXT NOT NULL, RequiredID TEXT NOT NULL, "
+                  "PRIMARY KEY (SubjectID, RequiredID)) WITHOUT ROWID",
+                  "CREATE INDEX idx_closure_required ON PrerequisiteClosure(RequiredID)",
+                  "CREATE TABLE PassedSubject (StudentID TEXT NOT NULL, SubjectID TEXT NOT NULL, "
+                  "PRIMARY KEY (StudentID, SubjectID)) WITHOUT ROWID"]
+        passed = ("INSERT OR IGNORE INTO PassedSubject (StudentID, SubjectID) "
+                  "SELECT NEW.StudentID, SubjectID FROM Course WHERE CourseID = NEW.CourseID;")
+        # A pass taken back (regrade, moved enrollment) stays if another enrollment of the subject passed
+        withdrawn = (f"DELETE FROM PassedSubject WHERE StudentID = OLD.StudentID "
+                     f"AND SubjectID = (SELECT SubjectID FROM Course WHERE CourseID = OLD.CourseID) "
+                     f"AND NOT EXISTS (SELECT 1 FROM Enrollment e JOIN Course c ON c.CourseID = e.CourseID "
+                     f"WHERE e.StudentID = OLD.StudentID AND c.SubjectID = PassedSubject.SubjectID "
+                     f"AND e.Grade >= {PASS_GRADE});")
+        triggers = {
+            "enrollment_insert": (f"AFTER INSERT ON Enrollment WHEN NEW.Grade >= {PASS_GRADE}", passed),
+            "enrollment_pass": (f"AFTER UPDATE OF Grade, CourseID, StudentID ON Enrollment "
+                                f"WHEN NEW.Grade >= {PASS_GRADE}", passed),
+            "enrollment_fail": (f"AFTER UPDATE OF Grade, CourseID, StudentID ON Enrollment "
+                                f"WHEN OLD.Grade >= {PASS_GRADE} AND NOT (NEW.Grade >= {PASS_GRADE} "
+                                f"AND NEW.CourseID = OLD.CourseID AND NEW.StudentID = OLD.StudentID)", withdrawn),
+        }
+        for name, (event, body) in triggers.items():
+            script.append(f"CREATE TRIGGER trg_passed_{name} {event} BEGIN {body} END")
+        self.cursor.executescript(";\n".join(script) + ";")
+        self.rebuild_prerequisite_closure()
+        self.rebuild_passed_subjects()
+
+    def _setup_curriculum(self):
+        """Degree requirements per Major and the latest batch audit (see degree_audit.py)"""
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS Curriculum (
+                Major TEXT PRIMARY KEY,
+                TotalCredits INTEGER NOT NULL CHECK (TotalCredits >= 0)
             );
-            CREATE TABLE IF NOT EXISTS Enrollment (
-                EnrollID INTEGER PRIMARY KEY AUTOINCREMENT,
-                CourseID TEXT,
-                StudentID TEXT,
-                Grade REAL,
-                FOREIGN KEY(CourseID) REFERENCES Course(CourseID),
-                FOREIGN KEY(StudentID) REFERENCES Student(StudentID)
+            CREATE TABLE IF NOT EXISTS CurriculumGroup (
+                GroupID INTEGER PRIMARY KEY,
+                Major TEXT NOT NULL,
+                GroupName TEXT NOT NULL,
+                Kind TEXT NOT NULL CHECK (Kind IN ('required', 'elective')),
+                MinCredits INTEGER,
+                UNIQUE(Major, GroupName),
+                FOREIGN KEY(Major) REFERENCES Curriculum(Major) ON DELETE CASCADE
             );
+            CREATE TABLE IF NOT EXISTS CurriculumSubject (
+                GroupID INTEGER NOT NULL,
+                SubjectID TEXT NOT NULL,
+                PRIMARY KEY (GroupID, SubjectID),
+                FOREIGN KEY(GroupID) REFERENCES CurriculumGroup(GroupID) ON DELETE CASCADE,
+                FOREIGN KEY(SubjectID) REFERENCES Subject(SubjectID)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_curriculum_subject ON CurriculumSubject(SubjectID);
+            CREATE TABLE IF NOT EXISTS DegreeAudit (
+                StudentID TEXT NOT NULL,
+                Requirement TEXT NOT NULL,
+                Needed INTEGER,
+                Earned INTEGER,
+                Remaining INTEGER,
+                Missing TEXT,
+                AuditedAt TEXT,
+                PRIMARY KEY (StudentID, Requirement)
+            ) WITHOUT ROWID;
         ''')
-        # Create default admin account if DB is empty
-        self.cursor.execute("SELECT COUNT(*) FROM User")
-        if self.cursor.fetchone()[0] == 0:
-            self.cursor.execute("INSERT INTO User VALUES ('ACC001','admin','admin123','System Admin','Male','1990','admin@uth.edu.vn','admin')")
-            self.cursor.execute("INSERT INTO Admin VALUES ('ADM001','ACC001')")
-            self.conn.commit()
+
+    def _setup_exam_schedule(self):
+        """Exam slot and room per course section (see exam_timetable.py)"""
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS ExamSchedule (
+                CourseID TEXT PRIMARY KEY,
+                Year INTEGER NOT NULL,
+                Semester INTEGER NOT NULL,
+                Slot INTEGER NOT NULL CHECK (Slot >= 0),
+                ExamDay INTEGER NOT NULL,
+                Period INTEGER NOT NULL,
+                Room TEXT,
+                FOREIGN KEY(CourseID) REFERENCES Course(CourseID) ON DELETE CASCADE
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_exam_term_slot ON ExamSchedule(Year, Semester, Slot);
+        ''')
+
+    def _setup_attendance(self):
+        """Attendance per class session and its rollups per enrollment and per course.
+
+        AttendanceSummary (one student in one course) and AttendanceCourseSummary count
+        sessions by Status and are kept current by triggers on Attendance, so a rate is
+        (Present + Late) / (Sessions - Excused) read from one row.
+        """
+        exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='Attendance'"
+        ).fetchone()
+        if exists:
+            return
+        counters = "Sessions INTEGER NOT NULL DEFAULT 0, " + ", ".join(
+            f"{name.capitalize()} INTEGER NOT NULL DEFAULT 0" for name in ATTENDANCE_STATUSES.values())
+        script = [f"CREATE TABLE Attendance {ATTENDANCE_TABLE} WITHOUT ROWID",
+                  # Foreign key lookups when an enrollment or a schedule slot is deleted
+                  "CREATE INDEX idx_attendance_enroll ON Attendance(EnrollID)",
+                  "CREATE INDEX idx_attendance_schedule ON Attendance(ScheduleID)",
+                  f"CREATE TABLE AttendanceSummary (EnrollID INTEGER PRIMARY KEY, {counters}, "
+                  f"FOREIGN KEY(EnrollID) REFERENCES Enrollment(EnrollID) ON DELETE CASCADE)",
+                  f"CREATE TABLE AttendanceCourseSummary (CourseID TEXT PRIMARY KEY, {counters}, "
+                  f"FOREIGN KEY(CourseID) REFERENCES Course(CourseID) ON DELETE CASCADE)"]
+        columns = ", ".join(name.capitalize() for name in ATTENDANCE_STATUSES.values())
+        flags = ", ".join(f"{{0}}.Status = '{code}'" for code in ATTENDANCE_STATUSES)
+        added = ", ".join(f"{name.capitalize()} = {name.capitalize()} + excluded.{name.capitalize()}"
+                          for name in ATTENDANCE_STATUSES.values())
+        removed = ", ".join(f"{name.capitalize()} = {name.capitalize()} - ({{0}}.Status = '{code}')"
+                            for code, name in ATTENDANCE_STATUSES.items())
+        add = (f"INSERT INTO AttendanceSummary (EnrollID, Sessions, {columns}) VALUES ({{0}}.EnrollID, 1, {flags}) "
+               f"ON CONFLICT(EnrollID) DO UPDATE SET Sessions = Sessions + 1, {added};"
+               f"INSERT INTO AttendanceCourseSummary (CourseID, Sessions, {columns}) "
+               f"SELECT CourseID, 1, {flags} FROM Schedule WHERE ScheduleID = {{0}}.ScheduleID "
+               f"ON CONFLICT(CourseID) DO UPDATE SET Sessions = Sessions + 1, {added};")
+        # A cascade from Schedule or Enrollment may already have removed one of the two parents
+        remove = (f"UPDATE AttendanceSummary SET Sessions = Sessions - 1, {removed} WHERE EnrollID = {{0}}.EnrollID;"
+                  f"UPDATE AttendanceCourseSummary SET Sessions = Sessions - 1, {removed} "
+                  f"WHERE CourseID = COALESCE((SELECT CourseID FROM Schedule WHERE ScheduleID = {{0}}.ScheduleID), "
+                  f"(SELECT CourseID FROM Enrollment WHERE EnrollID = {{0}}.EnrollID));")
+        triggers = {
+            "insert": ("AFTER INSERT ON Attendance", add.format("NEW")),
+            "update": ("AFTER UPDATE ON Attendance", remove.format("OLD") + add.format("NEW")),
+            "delete": ("AFTER DELETE ON Attendance", remove.format("OLD")),
+        }
+        for name, (event, body) in triggers.items():
+            script.append(f"CREATE TRIGGER trg_attendance_{name} {event} BEGIN {body} END")
+        self.cursor.executescript(";\n".join(script) + ";")
+
+    def rebuild_attendance_summaries(self):
+        """Recompute AttendanceSummary and AttendanceCourseSummary from Attendance (repair only)"""
+        counts = ", ".join(f"SUM(a.Status = '{code}')" for code in ATTENDANCE_STATUSES)
+        columns = ", ".join(name.capitalize() for name in ATTENDANCE_STATUSES.values())
+        self.cursor.execute("DELETE FROM AttendanceSummary")
+        self.cursor.execute(f"INSERT INTO AttendanceSummary (EnrollID, Sessions, {columns}) "
+                            f"SELECT a.EnrollID, COUNT(*), {counts} FROM Attendance a GROUP BY a.EnrollID")
+        self.cursor.execute("DELETE FROM AttendanceCourseSummary")
+        self.cursor.execute(f"INSERT INTO AttendanceCourseSummary (CourseID, Sessions, {columns}) "
+                            f"SELECT s.CourseID, COUNT(*), {counts} FROM Attendance a "
+                            f"JOIN Schedule s ON s.ScheduleID = a.ScheduleID GROUP BY s.CourseID")
+        self.conn.commit()
+
+    def rebuild_prerequisite_closure(self):
+        """Recompute PrerequisiteClosure from Prerequisite (after a removal, or repair)"""
+        self.cursor.execute("DELETE FROM PrerequisiteClosure")
+        self.cursor.execute("""
+            INSERT INTO PrerequisiteClosure (SubjectID, RequiredID)
+            WITH RECURSIVE reach(SubjectID, RequiredID) AS (
+                SELECT SubjectID, RequiredID FROM Prerequisite
+                UNION
+                SELECT r.SubjectID, p.RequiredID FROM reach r JOIN Prerequisite p ON p.SubjectID = r.RequiredID
+            )
+            SELECT SubjectID, RequiredID FROM reach
+        """)
+        self.conn.commit()
+
+    def rebuild_passed_subjects(self):
+        """Recompute PassedSubject from every passed enrollment, archived years included (first run / repair only)"""
+        sql = """SELECT e.StudentID, c.SubjectID FROM {db}.Enrollment e JOIN {db}.Course c ON c.CourseID = e.CourseID
+                 WHERE e.Grade >= ?"""
+        self.cursor.execute("DELETE FROM PassedSubject")
+        if self.archived_years():
+            self.cursor.executemany("INSERT OR IGNORE INTO PassedSubject (StudentID, SubjectID) VALUES (?, ?)",
+                                    self.union_archives(sql, (PASS_GRADE,)))
+        else:
+            self.cursor.execute("INSERT OR IGNORE INTO PassedSubject (StudentID, SubjectID) " + sql.format(db="main"),
+                                (PASS_GRADE,))
+        self.conn.commit()
+
+    def reset_student_timetables(self):
+        """Drop every materialized timetable; each is rebuilt after its next view (first run / repair only)"""
+        self.cursor.execute("DELETE FROM StudentTimetable")
+        self.cursor.execute("DELETE FROM TimetableDirty")
+        self.cursor.execute("INSERT INTO TimetableDirty (StudentID) SELECT DISTINCT StudentID FROM Enrollment")
+        self.conn.commit()
+
+    def rebuild_course_grade_stats(self):
+        """Recompute CourseGradeStats from Enrollment in one pass (first run / repair only)"""
+        self.cursor.execute("DELETE FROM CourseGradeStats")
+        self.cursor.execute("""
+            INSERT INTO CourseGradeStats (CourseID, Count, Mean, M2, MinGrade, MaxGrade, PassCount)
+            SELECT CourseID, COUNT(Grade), AVG(Grade),
+                   MAX(SUM(Grade * Grade) - COUNT(Grade) * AVG(Grade) * AVG(Grade), 0),
+                   MIN(Grade), MAX(Grade),
+                   SUM(CASE WHEN Grade >= ? THEN 1 ELSE 0 END)
+            FROM Enrollment
+            WHERE Grade IS NOT NULL
+            GROUP BY CourseID
+        """, (PASS_GRADE,))
+        self.conn.commit()
+
+    def _apply_grade_change(self, course_id, old_grade, new_grade):
+        """O(1) Welford update of CourseGradeStats for one Enrollment grade change.
+
+        old_grade is None for a first-time grade; otherwise the old value is removed
+        before the new one is added. Must run after the Enrollment row is written,
+        because removing the current min/max falls back to an indexed MIN/MAX lookup.
+        """
+        row = self.cursor.execute(
+            "SELECT Count, Mean, M2, MinGrade, MaxGrade, PassCount FROM CourseGradeStats WHERE CourseID = ?",
+            (course_id,)
+        ).fetchone()
+        if row:
+            count, mean, m2, min_grade, max_grade, passed = tuple(row)
+        else:
+            count, mean, m2, min_grade, max_grade, passed = 0, 0.0, 0.0, None, None, 0
+        rescan_extremes = False
+
+        if old_grade is not None and count > 0:
+            if count == 1:
+                count, mean, m2, min_grade, max_grade, passed = 0, 0.0, 0.0, None, None, 0
+            else:
+                old_mean = (count * mean - old_grade) / (count - 1)
+                m2 -= (old_grade - old_mean) * (old_grade - mean)
+                count -= 1
+                mean = old_mean
+                if old_grade >= PASS_GRADE:
+                    passed -= 1
+                rescan_extremes = old_grade in (min_grade, max_grade)
+
+        if new_grade is not None:
+            count += 1
+            delta = new_grade - mean
+            mean += delta / count
+            m2 += delta * (new_grade - mean)
+            if new_grade >= PASS_GRADE:
+                passed += 1
+            if not rescan_extremes:
+                min_grade = new_grade if min_grade is None else min(min_grade, new_grade)
+                max_grade = new_grade if max_grade is None else max(max_grade, new_grade)
+
+        if rescan_extremes:
+            min_grade, max_grade = self.cursor.execute(
+                "SELECT MIN(Grade), MAX(Grade) FROM Enrollment WHERE CourseID = ?",
+                (course_id,)
+            ).fetchone()
+
+        self.cursor.execute("""
+            INSERT INTO CourseGradeStats (CourseID, Count, Mean, M2, MinGrade, MaxGrade, PassCount)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(CourseID) DO UPDATE SET
+                Count = excluded.Count, Mean = excluded.Mean, M2 = excluded.M2,
+                MinGrade = excluded.MinGrade, MaxGrade = excluded.MaxGrade,
+                PassCount = excluded.PassCount
+        """, (course_id, count, mean, max(m2, 0.0), min_grade, max_grade, passed))
+
+    def get_course_grade_stats(self, course_id):
+        """Precomputed grade statistics of one course (None if nothing graded yet)"""
+        row = self.cursor.execute(
+            "SELECT Count, Mean, M2, MinGrade, MaxGrade, PassCount FROM CourseGradeStats WHERE CourseID = ?",
+            (course_id,)
+        ).fetchone()
+        if not row or row['Count'] == 0:
+            return None
+        count = row['Count']
+        return {
+            'count': count,
+            'mean': row['Mean'],
+            'stddev': (row['M2'] / (count - 1)) ** 0.5 if count > 1 else 0.0,
+            'min': row['MinGrade'],
+            'max': row['MaxGrade'],
+            'passed': row['PassCount'],
+            'pass_rate': row['PassCount'] / count,
+        }
+
+    _ansi_enabled = False
 
     def clear_screen(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+        """Clear with ANSI escapes instead of spawning cls/clear"""
+        if os.name == 'nt' and not StudentManagementSystem._ansi_enabled:
+            os.system('')  # once: turns on VT escape processing in the Windows console
+            StudentManagementSystem._ansi_enabled = True
+        sys.stdout.write("\033[2J\033[H")
+        sys.stdout.flush()
+
+    def render_table(self, columns, rows, empty_message=None):
+        """Print rows as a table, one buffered write per page.
+
+        columns: (header, key, max_width) tuples; key is a column name or a callable(row).
+        Column widths are computed once over all rows. On a terminal, long listings are
+        split into screen-sized pages.
+        """
+        if not rows:
+            if empty_message:
+                print(empty_message)
+            return
+        names = list(rows[0].keys()) if hasattr(rows[0], 'keys') else []
+        getters = [key if callable(key) else (lambda row, i=names.index(key): row[i]) for _, key, _ in columns]
+        cells = [["" if v is None else str(v) for v in [get(row) for get in getters]] for row in rows]
+        widths = []
+        for header, column in zip(columns, zip(*cells)):
+            widest = max(len(header[0]), max(map(len, column)))
+            widths.append(min(widest, header[2]) if header[2] else widest)
+        # One format string for every line; the precision truncates over-long cells
+        line_format = " " + "  ".join(f"{{:<{w}.{w}}}" for w in widths)
+
+        def fmt(values):
+            return line_format.format(*values).rstrip()
+
+        header = [fmt([c[0] for c in columns]), "-" * (sum(widths) + 2 * len(widths))]
+        body = [fmt(r) for r in cells]
+        if sys.stdout.isatty():
+            page_size = max(shutil.get_terminal_size().lines - 6, 5)
+        else:
+            page_size = len(body)
+        for start in range(0, len(body), page_size):
+            sys.stdout.write("\n".join(header + body[start:start + page_size]) + "\n")
+            sys.stdout.flush()
+            if start + page_size < len(body):
+                more = _timed_input(f"-- {start + page_size}/{len(body)} rows, Enter for more, Q to stop -- ").strip().upper()
+                if more == 'Q':
+                    break
     
     def _is_valid_time_format(self, time_str: str) -> bool:
         """Check valid HH:MM format (24h)"""
@@ -98,6 +1383,11 @@ class StudentManagementSystem:
         except:
             return False
 
+    def _time_to_minutes(self, time_str: str) -> int:
+        """HH:MM -> minutes since midnight (assumes a valid time)"""
+        hh, mm = map(int, time_str.split(':'))
+        return hh * 60 + mm
+
     def _is_end_after_start(self, start: str, end: str) -> bool:
         """Compare end time > start time"""
         try:
@@ -120,33 +1410,126 @@ class StudentManagementSystem:
             print("====================================")
             print("1. Login")
             print("2. Exit")
-            choice = input("\nChoose: ")
+            choice = _timed_input("\nChoose: ")
             
             if choice == '2': sys.exit()
             if choice == '1':
-                username = input("Username: ")
-                password = getpass.getpass("Password: ") # Requirement 2.3: Hide password
+                username = _timed_input("Username: ")
+                password = _getpass("Password: ") # Requirement 2.3: Hide password
                 
-                query = "SELECT * FROM User WHERE UserName = ? AND PassWord = ?"
-                user = self.cursor.execute(query, (username, password)).fetchone()
+                user = self.authenticate(username, password)
                 
                 if user:
-                    self.current_user = dict(user)
+                    self.begin_request(user)
+                    self.session_identity()
                     print(f"\n[OK]: Welcome {self.current_user['FullName']}!")
-                    input("Press Enter to enter the system..."); return True
+                    _timed_input("Press Enter to enter the system..."); return True
                 else:
                     print("\n[Error]: Incorrect username or password!")
                     # Skip choice 2, always try again
-                    input("Press Enter to try again...")
+                    _timed_input("Press Enter to try again...")
+
+    def authenticate(self, username, password):
+        """Return the User row (as dict) matching the credentials, or None"""
+        query = "SELECT * FROM User WHERE UserName = ? AND PassWord = ?"
+        user = self.cursor.execute(query, (username, password)).fetchone()
+        return dict(user) if user else None
+
+    def begin_request(self, user):
+        """Serve one API request as user. Cached session identities are checked against other
+        connections' commits once per request (once per screen in the menus)."""
+        self.current_user = user
+        self._request_serial += 1
+
+    def session_identity(self):
+        """Role identity of the logged-in user, resolved once (at login) and reused by every screen.
+
+        Keys: AccountID, Role, EntityID (StudentID/TeacherID/AdminID), Major, InstituteName,
+        Term (current Year, Semester), CourseIDs (the user's courses in that term) and Profile
+        (the PROFILE_FIELDS of the User row). None once the account has been deleted.
+        Within one screen or request, and without a write on this connection, the cached identity
+        is returned without any query. Otherwise the validity stamps are re-read if another
+        connection committed (PRAGMA data_version), and the identity is re-resolved only when the
+        account's AccountVersion stamp (admin edits, enrollment changes), the current term or,
+        for teachers, the course assignments moved.
+        """
+        user = self.current_user
+        if user is None:
+            return None
+        cached = self._identities.get(user['AccountID'])
+        if cached is not None:
+            identity, (serial, changes, data_version, stamps) = cached
+            if serial == self._request_serial and changes == self.conn.total_changes:
+                return identity
+            marks = (self._request_serial, self.conn.total_changes,
+                     self.cursor.execute("PRAGMA data_version").fetchone()[0])
+            if marks[1:] == (changes, data_version) or self._identity_stamps(identity) == stamps:
+                self._identities[user['AccountID']] = (identity, marks + (stamps,))
+                return identity
+        return self._resolve_identity(user)
+
+    def _identity_stamps(self, identity):
+        course_stamp = self.cursor.execute("SELECT Version FROM CatalogVersion WHERE TableName = 'Course'").fetchone()
+        account_stamp = self.cursor.execute("SELECT Version FROM AccountVersion WHERE AccountID = ?",
+                                            (identity['AccountID'],)).fetchone()
+        return (account_stamp[0] if account_stamp else None,
+                course_stamp[0] if identity['Role'] == 'teacher' and course_stamp else None,
+                self.catalog.current_term() if identity['Role'] in ('student', 'teacher') else None)
+
+    def _resolve_identity(self, user):
+        marks = (self._request_serial, self.conn.total_changes,
+                 self.cursor.execute("PRAGMA data_version").fetchone()[0])
+        account = self.cursor.execute(f"SELECT {', '.join(PROFILE_FIELDS)} FROM User WHERE AccountID = ?",
+                                      (user['AccountID'],)).fetchone()
+        if account is None:  # deleted since the login
+            self._identities.pop(user['AccountID'], None)
+            return None
+        # A renamed account shows its new name (the password is never part of the identity)
+        user.update(dict(account))
+        identity = {'AccountID': user['AccountID'], 'Role': user['Role'].lower(), 'EntityID': None,
+                    'Major': None, 'InstituteName': None, 'Term': None, 'CourseIDs': (),
+                    'Profile': dict(account)}
+        stamps = self._identity_stamps(identity)
+        identity['Term'] = stamps[2]
+        if identity['Role'] == 'student':
+            row = self.cursor.execute("SELECT StudentID, Major FROM Student WHERE AccountID = ?",
+                                      (user['AccountID'],)).fetchone()
+            if row:
+                identity['EntityID'], identity['Major'] = row['StudentID'], row['Major']
+                if identity['Term']:
+                    identity['CourseIDs'] = tuple(r[0] for r in self.cursor.execute("""
+                        SELECT e.CourseID FROM Enrollment e JOIN Course c ON c.CourseID = e.CourseID
+                        WHERE e.StudentID = ? AND c.Year = ? AND c.Semester = ?
+                        ORDER BY e.CourseID
+                    """, (row['StudentID'], *identity['Term'])).fetchall())
+        elif identity['Role'] == 'teacher':
+            row = self.cursor.execute("SELECT TeacherID, InstituteName FROM Teacher WHERE AccountID = ?",
+                                      (user['AccountID'],)).fetchone()
+            if row:
+                identity['EntityID'], identity['InstituteName'] = row['TeacherID'], row['InstituteName']
+                if identity['Term']:
+                    identity['CourseIDs'] = tuple(r[0] for r in self.cursor.execute(
+                        "SELECT CourseID FROM Course WHERE TeacherID = ? AND Year = ? AND Semester = ? ORDER BY CourseID",
+                        (row['TeacherID'], *identity['Term'])).fetchall())
+        elif identity['Role'] == 'admin':
+            row = self.cursor.execute("SELECT AdminID FROM Admin WHERE AccountID = ?", (user['AccountID'],)).fetchone()
+            identity['EntityID'] = row['AdminID'] if row else None
+        if len(self._identities) >= 256:  # pooled API apps serve many accounts
+            self._identities.clear()
+        self._identities[user['AccountID']] = (identity, marks + (stamps,))
+        return identity
 
     # ==========================================
     # 3. USE-CASE: LOGOUT
     # ==========================================
     def logout(self):
-        confirm = input("\nAre you sure you want to log out? (Y/N): ").upper()
+        confirm = _timed_input("\nAre you sure you want to log out? (Y/N): ").upper()
         if confirm == 'Y':
+            if self.latency_log:
+                self.dump_latency()
+            self._identities.pop(self.current_user['AccountID'], None)
             self.current_user = None
-            print("[Notification]: Logged out."); input()
+            print("[Notification]: Logged out."); _timed_input()
             return True
         return False
 
@@ -154,32 +1537,40 @@ class StudentManagementSystem:
     # 4. USE-CASE: CHANGE PASSWORD
     # ==========================================
     def change_password(self):
-        old_pw = getpass.getpass("Current password: ")
+        old_pw = _getpass("Current password: ")
         if old_pw != self.current_user['PassWord']:
-            print("[Error]: Incorrect old password!"); input(); return
+            print("[Error]: Incorrect old password!"); _timed_input(); return
         
-        new_pw = getpass.getpass("New password (min 6 characters): ")
+        new_pw = _getpass("New password (min 6 characters): ")
         if len(new_pw) < 6:
-            print("[Error]: Password too short!"); input(); return
+            print("[Error]: Password too short!"); _timed_input(); return
             
-        confirm = getpass.getpass("Confirm new password: ")
+        confirm = _getpass("Confirm new password: ")
         if new_pw == confirm:
             self.cursor.execute("UPDATE User SET PassWord=? WHERE AccountID=?", (new_pw, self.current_user['AccountID']))
             self.conn.commit()
             self.current_user['PassWord'] = new_pw
-            print("[Success]: Password changed."); input()
+            print("[Success]: Password changed."); _timed_input()
         else:
-            print("[Error]: Passwords do not match!"); input()
+            print("[Error]: Passwords do not match!"); _timed_input()
 
     # ==========================================
     # 5. USE-CASE: VIEW PROFILE
     # ==========================================
     def view_profile(self):
         self.clear_screen()
+        identity = self.session_identity()
         u = self.current_user
         print(f"--- PERSONAL INFORMATION ---")
         print(f"Username: {u['UserName']}\nFull Name: {u['FullName']}\nEmail: {u['Email']}\nRole: {u['Role']}")
-        input("\nPress Enter to return...")
+        if identity['Role'] == 'student':
+            print(f"Student ID: {identity['EntityID']}\nMajor: {identity['Major']}")
+        elif identity['Role'] == 'teacher':
+            print(f"Teacher ID: {identity['EntityID']}\nInstitute: {identity['InstituteName']}")
+        if identity['Role'] in ('student', 'teacher') and identity['Term']:
+            year, semester = identity['Term']
+            print(f"Courses in {year} Sem{semester}: {', '.join(identity['CourseIDs']) or 'none'}")
+        _timed_input("\nPress Enter to return...")
 
     # ==========================================
     # ADMIN USE-CASES (11, 12, 13, 14, 15)
@@ -187,6 +1578,7 @@ class StudentManagementSystem:
     def manage_users(self):
         """Manage users (Admin): View, Add, Edit, Delete Student/Teacher/Admin accounts"""
         while True:
+            self._end_subaction()
             self.clear_screen()
             print("====================================")
             print("   USER MANAGEMENT")
@@ -196,21 +1588,22 @@ class StudentManagementSystem:
             print("3. Update user information")
             print("4. Delete user")
             print("5. Return to Admin menu")
-            choice = input("\nChoose function: ").strip()
+            choice = _timed_input("\nChoose function: ").strip()
 
             if choice == '5':
                 break
+            self._begin_subaction("manage_users", choice, ("list", "add", "update", "delete"))
 
             # Select user type
             print("\nAccount type:")
             print("  1. Student")
             print("  2. Teacher")
             print("  3. Admin")
-            role_choice = input("Choose type (1-3): ").strip()
+            role_choice = _timed_input("Choose type (1-3): ").strip()
             role_map = {'1': 'student', '2': 'teacher', '3': 'admin'}
             if role_choice not in role_map:
                 print("[Error]: Invalid choice!")
-                input("Press Enter to continue...")
+                _timed_input("Press Enter to continue...")
                 continue
             selected_role = role_map[role_choice]
 
@@ -224,18 +1617,19 @@ class StudentManagementSystem:
                 """, (selected_role,)).fetchall()
 
                 print(f"\n--- {selected_role.upper()} LIST ---")
-                if not users:
-                    print(f"No {selected_role} in the system yet.")
-                else:
-                    for u in users:
-                        print(f"  • {u['AccountID']} | {u['UserName']} | {u['FullName']} | {u['Email']}")
-                input("\nPress Enter to continue...")
+                self.render_table([
+                    ("AccountID", 'AccountID', 12),
+                    ("Username", 'UserName', 20),
+                    ("Full Name", 'FullName', 30),
+                    ("Email", 'Email', 35),
+                ], users, empty_message=f"No {selected_role} in the system yet.")
+                _timed_input("\nPress Enter to continue...")
 
             elif choice == '2':
                 # Add new user
                 print(f"\n--- ADD NEW {selected_role.upper()} ---")
                 while True:
-                    account_id = input("AccountID (e.g., ACCxxx): ").strip()
+                    account_id = _timed_input("AccountID (e.g., ACCxxx): ").strip()
                     if not account_id:
                         print("[Error]: AccountID cannot be empty!")
                         continue
@@ -244,22 +1638,22 @@ class StudentManagementSystem:
                         continue
                     break
 
-                username = input("Username: ").strip()
+                username = _timed_input("Username: ").strip()
                 if self.cursor.execute("SELECT 1 FROM User WHERE UserName = ?", (username,)).fetchone():
                     print("[Error]: Username already exists!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
-                full_name = input("Full name: ").strip()
-                password = input("Default password (will be encrypted later): ") or "123456"
-                sex = input("Gender (Male/Female/Other): ").strip() or "Male"
-                yob = input("Year of birth (YYYY): ").strip() or "2000"
-                email = input("Email: ").strip() or f"{username}@uth.edu.vn"
+                full_name = _timed_input("Full name: ").strip()
+                password = _timed_input("Default password (will be encrypted later): ") or "123456"
+                sex = _timed_input("Gender (Male/Female/Other): ").strip() or "Male"
+                yob = _timed_input("Year of birth (YYYY): ").strip() or "2000"
+                email = _timed_input("Email: ").strip() or f"{username}@uth.edu.vn"
 
-                confirm = input("\nConfirm adding user? (Y/N): ").upper()
+                confirm = _timed_input("\nConfirm adding user? (Y/N): ").upper()
                 if confirm != 'Y':
                     print("Operation canceled.")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 try:
@@ -269,17 +1663,17 @@ class StudentManagementSystem:
                     """, (account_id, username, password, full_name, sex, yob, email, selected_role))
 
                     if selected_role == 'student':
-                        student_id = input("StudentID (e.g., 221xxxx): ").strip()
-                        major = input("Major (default IT): ").strip() or "IT"
+                        student_id = _timed_input("StudentID (e.g., 221xxxx): ").strip()
+                        major = _timed_input("Major (default IT): ").strip() or "IT"
                         self.cursor.execute("INSERT INTO Student (StudentID, AccountID, Major) VALUES (?, ?, ?)",
                                             (student_id, account_id, major))
                     elif selected_role == 'teacher':
-                        teacher_id = input("TeacherID (e.g., GVxxx): ").strip()
-                        institute = input("Institute/Department: ").strip() or "Information Technology"
+                        teacher_id = _timed_input("TeacherID (e.g., GVxxx): ").strip()
+                        institute = _timed_input("Institute/Department: ").strip() or "Information Technology"
                         self.cursor.execute("INSERT INTO Teacher (TeacherID, AccountID, InstituteName) VALUES (?, ?, ?)",
                                             (teacher_id, account_id, institute))
                     elif selected_role == 'admin':
-                        admin_id = input("AdminID (e.g., ADMxxx): ").strip()
+                        admin_id = _timed_input("AdminID (e.g., ADMxxx): ").strip()
                         self.cursor.execute("INSERT INTO Admin (AdminID, AccountID) VALUES (?, ?)",
                                             (admin_id, account_id))
 
@@ -287,18 +1681,18 @@ class StudentManagementSystem:
                     print("[Success]: New user added.")
                 except sqlite3.Error as e:
                     print(f"[Database error]: {e}")
-                input("Press Enter to continue...")
+                _timed_input("Press Enter to continue...")
 
             elif choice == '3':
                 # Update information
                 print(f"\n--- UPDATE {selected_role.upper()} ---")
-                account_id = input("Enter AccountID to edit: ").strip()
+                account_id = _timed_input("Enter AccountID to edit: ").strip()
                 user = self.cursor.execute("SELECT * FROM User WHERE AccountID = ? AND Role = ?",
                                            (account_id, selected_role)).fetchone()
 
                 if not user:
                     print("[Error]: User with this AccountID not found!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 print("\nCurrent information:")
@@ -308,13 +1702,13 @@ class StudentManagementSystem:
                 print(f"  Gender      : {user['Sex']}")
                 print(f"  Year of birth: {user['YearOfBirth']}")
 
-                new_username = input(f"New Username (Enter to keep): ").strip() or user['UserName']
-                new_fullname = input(f"New full name (Enter to keep): ").strip() or user['FullName']
-                new_email = input(f"New Email (Enter to keep): ").strip() or user['Email']
-                new_sex = input(f"New Gender (Enter to keep): ").strip() or user['Sex']
-                new_yob = input(f"New year of birth (Enter to keep): ").strip() or user['YearOfBirth']
+                new_username = _timed_input(f"New Username (Enter to keep): ").strip() or user['UserName']
+                new_fullname = _timed_input(f"New full name (Enter to keep): ").strip() or user['FullName']
+                new_email = _timed_input(f"New Email (Enter to keep): ").strip() or user['Email']
+                new_sex = _timed_input(f"New Gender (Enter to keep): ").strip() or user['Sex']
+                new_yob = _timed_input(f"New year of birth (Enter to keep): ").strip() or user['YearOfBirth']
 
-                confirm = input("\nConfirm update? (Y/N): ").upper()
+                confirm = _timed_input("\nConfirm update? (Y/N): ").upper()
                 if confirm == 'Y':
                     self.cursor.execute("""
                         UPDATE User SET 
@@ -325,18 +1719,18 @@ class StudentManagementSystem:
                     print("[Success]: Information updated.")
                 else:
                     print("Operation canceled.")
-                input("Press Enter...")
+                _timed_input("Press Enter...")
 
             elif choice == '4':
                 # Delete user
                 print(f"\n--- DELETE {selected_role.upper()} ---")
-                account_id = input("Enter AccountID to delete: ").strip()
+                account_id = _timed_input("Enter AccountID to delete: ").strip()
                 user = self.cursor.execute("SELECT FullName FROM User WHERE AccountID = ? AND Role = ?",
                                            (account_id, selected_role)).fetchone()
 
                 if not user:
                     print("[Error]: User not found!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 # Check constraints (e.g., teacher teaching classes, student with grades...)
@@ -345,33 +1739,38 @@ class StudentManagementSystem:
                                                 (account_id,)).fetchone()[0]
                     if count > 0:
                         print(f"[Error]: Cannot delete! This teacher is teaching {count} course sections.")
-                        input("Press Enter...")
+                        _timed_input("Press Enter...")
                         continue
                 elif selected_role == 'student':
                     count = self.cursor.execute("SELECT COUNT(*) FROM Enrollment WHERE StudentID IN (SELECT StudentID FROM Student WHERE AccountID=?)",
                                                 (account_id,)).fetchone()[0]
                     if count > 0:
                         print(f"[Error]: Cannot delete! This student has registered for {count} courses.")
-                        input("Press Enter...")
+                        _timed_input("Press Enter...")
                         continue
 
-                confirm = input(f"Confirm DELETE user '{user['FullName']}' (AccountID: {account_id})? (Y/N): ").upper()
+                confirm = _timed_input(f"Confirm DELETE user '{user['FullName']}' (AccountID: {account_id})? (Y/N): ").upper()
                 if confirm == 'Y':
-                    # ON DELETE CASCADE will automatically delete related records in Student/Teacher/Admin
-                    self.cursor.execute("DELETE FROM User WHERE AccountID = ?", (account_id,))
-                    self.conn.commit()
-                    print("[Success]: User deleted.")
+                    try:
+                        # ON DELETE CASCADE will automatically delete related records in Student/Teacher/Admin
+                        self.cursor.execute("DELETE FROM User WHERE AccountID = ?", (account_id,))
+                        self.conn.commit()
+                        print("[Success]: User deleted.")
+                    except sqlite3.Error as e:
+                        self.conn.rollback()
+                        print(f"[Database error]: {e}")
                 else:
                     print("Delete operation canceled.")
-                input("Press Enter...")
+                _timed_input("Press Enter...")
 
             else:
                 print("[Error]: Invalid function!")
-                input("Press Enter...")
+                _timed_input("Press Enter...")
 
     def manage_subjects(self):
         """Use-case 12: Manage Subjects - Admin view, add, edit, delete subjects in the system"""
         while True:
+            self._end_subaction()
             self.clear_screen()
             print("====================================")
             print("   SUBJECT MANAGEMENT")
@@ -381,50 +1780,45 @@ class StudentManagementSystem:
             print("3. Update subject information")
             print("4. Delete subject")
             print("5. Return to Admin menu")
-            choice = input("\nChoose function: ").strip()
+            choice = _timed_input("\nChoose function: ").strip()
 
             if choice == '5':
                 break
+            self._begin_subaction("manage_subjects", choice, ("list", "add", "update", "delete"))
 
             if choice == '1':
                 # View subject list
-                subjects = self.cursor.execute("""
-                    SELECT SubjectID, SubjectName, Credits 
-                    FROM Subject 
-                    ORDER BY SubjectID
-                """).fetchall()
+                subjects = self.catalog.subjects()
 
                 print("\n--- SUBJECT LIST ---")
-                if not subjects:
-                    print("No subjects in the system yet.")
-                else:
-                    print(" SubjectID  Subject Name                         Credits")
-                    print("-" * 60)
-                    for s in subjects:
-                        print(f" {s['SubjectID']:<10} {s['SubjectName']:<35} {s['Credits']}")
-                input("\nPress Enter to continue...")
+                self.render_table([
+                    ("SubjectID", 'SubjectID', 10),
+                    ("Subject Name", 'SubjectName', 35),
+                    ("Credits", 'Credits', 7),
+                ], subjects, empty_message="No subjects in the system yet.")
+                _timed_input("\nPress Enter to continue...")
 
             elif choice == '2':
                 # Add new subject
                 print("\n--- ADD NEW SUBJECT ---")
                 while True:
-                    sid = input("Enter subject code (SubjectID): ").strip()
+                    sid = _timed_input("Enter subject code (SubjectID): ").strip()
                     if not sid:
                         print("[Error]: Subject code cannot be empty!")
                         continue
-                    if self.cursor.execute("SELECT 1 FROM Subject WHERE SubjectID = ?", (sid,)).fetchone():
+                    if self.catalog.subject(sid):
                         print("[Error]: Subject code already exists! Please enter a different code.")
                         continue
                     break
 
-                name = input("Enter subject name: ").strip()
+                name = _timed_input("Enter subject name: ").strip()
                 if not name:
                     print("[Error]: Subject name cannot be empty!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 while True:
-                    cr_input = input("Enter credits: ").strip()
+                    cr_input = _timed_input("Enter credits: ").strip()
                     try:
                         credits = int(cr_input)
                         if credits <= 0 or credits > 10:  # reasonable limit
@@ -434,7 +1828,7 @@ class StudentManagementSystem:
                     except ValueError:
                         print("[Error]: Please enter a valid integer!")
 
-                confirm = input(f"\nConfirm adding subject: {sid} - {name} ({credits} credits)? (Y/N): ").upper()
+                confirm = _timed_input(f"\nConfirm adding subject: {sid} - {name} ({credits} credits)? (Y/N): ").upper()
                 if confirm == 'Y':
                     try:
                         self.cursor.execute(
@@ -447,20 +1841,17 @@ class StudentManagementSystem:
                         print(f"[Database error]: {e}")
                 else:
                     print("Add operation canceled.")
-                input("Press Enter to continue...")
+                _timed_input("Press Enter to continue...")
 
             elif choice == '3':
                 # Update subject
                 print("\n--- UPDATE SUBJECT ---")
-                sid = input("Enter subject code to edit: ").strip()
-                subject = self.cursor.execute(
-                    "SELECT SubjectName, Credits FROM Subject WHERE SubjectID = ?",
-                    (sid,)
-                ).fetchone()
+                sid = _timed_input("Enter subject code to edit: ").strip()
+                subject = self.catalog.subject(sid)
 
                 if not subject:
                     print("[Error]: Subject with this code not found!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 print("\nCurrent information:")
@@ -468,11 +1859,11 @@ class StudentManagementSystem:
                 print(f"  Subject name: {subject['SubjectName']}")
                 print(f"  Credits     : {subject['Credits']}")
 
-                new_name = input(f"New subject name (Enter to keep '{subject['SubjectName']}'): ").strip()
+                new_name = _timed_input(f"New subject name (Enter to keep '{subject['SubjectName']}'): ").strip()
                 new_name = new_name if new_name else subject['SubjectName']
 
                 while True:
-                    cr_input = input(f"New credits (Enter to keep {subject['Credits']}): ").strip()
+                    cr_input = _timed_input(f"New credits (Enter to keep {subject['Credits']}): ").strip()
                     if cr_input == "":
                         new_credits = subject['Credits']
                         break
@@ -485,7 +1876,7 @@ class StudentManagementSystem:
                     except ValueError:
                         print("[Error]: Please enter a valid integer.")
 
-                confirm = input("\nConfirm updating subject? (Y/N): ").upper()
+                confirm = _timed_input("\nConfirm updating subject? (Y/N): ").upper()
                 if confirm == 'Y':
                     try:
                         self.cursor.execute(
@@ -498,52 +1889,59 @@ class StudentManagementSystem:
                         print(f"[Database error]: {e}")
                 else:
                     print("Update operation canceled.")
-                input("Press Enter to continue...")
+                _timed_input("Press Enter to continue...")
 
             elif choice == '4':
                 # Delete subject
                 print("\n--- DELETE SUBJECT ---")
-                sid = input("Enter subject code to delete: ").strip()
-                subject = self.cursor.execute(
-                    "SELECT SubjectName FROM Subject WHERE SubjectID = ?",
-                    (sid,)
-                ).fetchone()
+                sid = _timed_input("Enter subject code to delete: ").strip()
+                subject = self.catalog.subject(sid)
 
                 if not subject:
                     print("[Error]: Subject with this code not found!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 # Check constraint: cannot delete if there are course sections
-                course_count = self.cursor.execute(
-                    "SELECT COUNT(*) FROM Course WHERE SubjectID = ?",
-                    (sid,)
-                ).fetchone()[0]
+                course_count = len(self.catalog.courses_for_subject(sid))
 
                 if course_count > 0:
                     print(f"[Error]: Cannot delete! This subject has {course_count} course sections.")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
-                confirm = input(f"Confirm DELETE subject '{subject['SubjectName']}' (code {sid})? (Y/N): ").upper()
+                confirm = _timed_input(f"Confirm DELETE subject '{subject['SubjectName']}' (code {sid})? (Y/N): ").upper()
                 if confirm == 'Y':
                     try:
                         self.cursor.execute("DELETE FROM Subject WHERE SubjectID = ?", (sid,))
-                        self.conn.commit()
+                        # Its prerequisite edges went with it (ON DELETE CASCADE); so do paths through it
+                        self.rebuild_prerequisite_closure()
                         print("[Success]: Subject deleted.")
                     except sqlite3.Error as e:
                         print(f"[Database error]: {e}")
                 else:
                     print("Delete operation canceled.")
-                input("Press Enter to continue...")
+                _timed_input("Press Enter to continue...")
 
             else:
                 print("[Error]: Invalid function!")
-                input("Press Enter...")
+                _timed_input("Press Enter...")
+
+    def fetch_course_sections(self):
+        return self.cursor.execute("""
+            SELECT c.CourseID, c.ClassName, c.Year, c.Semester,
+                   s.SubjectID, s.SubjectName, t.TeacherID, u.FullName AS TeacherName
+            FROM Course c
+            JOIN Subject s ON c.SubjectID = s.SubjectID
+            LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
+            LEFT JOIN User u ON t.AccountID = u.AccountID
+            ORDER BY c.Year DESC, c.Semester DESC, c.CourseID
+        """).fetchall()
 
     def manage_course_sections(self):
         """Use-case 13: Manage Course Sections - Admin organizes open classes for subjects"""
         while True:
+            self._end_subaction()
             self.clear_screen()
             print("====================================")
             print("   COURSE SECTION MANAGEMENT")
@@ -554,77 +1952,70 @@ class StudentManagementSystem:
             print("4. Delete course section")
             print("5. Add student to class")
             print("6. Return to Admin menu")
-            choice = input("\nChoose function: ").strip()
+            choice = _timed_input("\nChoose function: ").strip()
 
             if choice == '6':
                 break
+            self._begin_subaction("manage_course_sections", choice, ("list", "add", "update", "delete", "add_student"))
 
             if choice == '1':
                 # View course section list
-                courses = self.cursor.execute("""
-                    SELECT c.CourseID, c.ClassName, c.Year, c.Semester,
-                           s.SubjectID, s.SubjectName, t.TeacherID, u.FullName AS TeacherName
-                    FROM Course c
-                    JOIN Subject s ON c.SubjectID = s.SubjectID
-                    LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
-                    LEFT JOIN User u ON t.AccountID = u.AccountID
-                    ORDER BY c.Year DESC, c.Semester DESC, c.CourseID
-                """).fetchall()
+                courses = self.fetch_course_sections()
 
                 print("\n--- COURSE SECTION LIST ---")
-                if not courses:
-                    print("No course sections in the system yet.")
-                else:
-                    print(" CourseID    Class     Subject                  Year  Sem  Teacher")
-                    print("-" * 80)
-                    for c in courses:
-                        teacher = f"{c['TeacherName'] or 'Not assigned'}"[:25]
-                        print(f" {c['CourseID']:<11} {c['ClassName']:<9} {c['SubjectName'][:20]:<20} {c['Year']}  {c['Semester']}  {teacher}")
-                input("\nPress Enter to continue...")
+                self.render_table([
+                    ("CourseID", 'CourseID', 11),
+                    ("Class", 'ClassName', 20),
+                    ("Subject", 'SubjectName', 20),
+                    ("Year", 'Year', 4),
+                    ("Sem", 'Semester', 3),
+                    ("Teacher", lambda c: c['TeacherName'] or 'Not assigned', 25),
+                ], courses, empty_message="No course sections in the system yet.")
+                _timed_input("\nPress Enter to continue...")
 
             elif choice in ('2', '3', '4'):
                 # Operations require selecting subject first (per sub-event flow)
                 print("\n--- Select subject first ---")
-                subjects = self.cursor.execute("SELECT SubjectID, SubjectName FROM Subject ORDER BY SubjectID").fetchall()
+                subjects = self.catalog.subjects()
                 if not subjects:
                     print("[Error]: No subjects in the system yet. Please add subjects first!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 print("Subject list:")
                 for i, sub in enumerate(subjects, 1):
                     print(f" {i}. {sub['SubjectID']} - {sub['SubjectName']}")
                 try:
-                    idx = int(input("\nChoose subject sequence number: ")) - 1
+                    idx = int(_timed_input("\nChoose subject sequence number: ")) - 1
                     if idx < 0 or idx >= len(subjects):
                         raise ValueError
                     selected_subject_id = subjects[idx]['SubjectID']
                 except:
                     print("[Error]: Invalid choice!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 if choice == '2':
                     # Add new course section
                     print(f"\n--- ADD NEW COURSE SECTION for subject {selected_subject_id} ---")
                     while True:
-                        course_id = input("Course section code (CourseID): ").strip()
+                        course_id = _timed_input("Course section code (CourseID): ").strip()
                         if not course_id:
                             print("[Error]: Class code cannot be empty!")
                             continue
-                        if self.cursor.execute("SELECT 1 FROM Course WHERE CourseID = ?", (course_id,)).fetchone():
+                        if self.catalog.course(course_id):
                             print("[Error]: Course section code already exists!")
                             continue
                         break
 
-                    class_name = input("Class name (e.g., CNTT K20A): ").strip()
+                    class_name = _timed_input("Class name (e.g., CNTT K20A): ").strip()
                     if not class_name:
                         print("[Error]: Class name cannot be empty!")
                         continue
 
                     while True:
                         try:
-                            year = int(input("Academic year (e.g., 2025): ").strip())
+                            year = int(_timed_input("Academic year (e.g., 2025): ").strip())
                             if year < 2000 or year > 2100:
                                 print("[Error]: Invalid academic year!")
                                 continue
@@ -634,7 +2025,7 @@ class StudentManagementSystem:
 
                     while True:
                         try:
-                            semester = int(input("Semester (1 or 2): ").strip())
+                            semester = int(_timed_input("Semester (1 or 2): ").strip())
                             if semester not in (1, 2):
                                 print("[Error]: Semester can only be 1 or 2!")
                                 continue
@@ -644,7 +2035,7 @@ class StudentManagementSystem:
 
                     # Add ClassSize
                     while True:
-                        class_size_input = input("Class capacity (ClassSize, default 50): ").strip()
+                        class_size_input = _timed_input("Class capacity (ClassSize, default 50): ").strip()
                         if not class_size_input:
                             class_size = 50
                             break
@@ -658,22 +2049,21 @@ class StudentManagementSystem:
                             print("[Error]: Please enter an integer!")
 
                     # Add Description
-                    description = input("Class description (Description, Enter to skip): ").strip() or None
+                    description = _timed_input("Class description (Description, Enter to skip): ").strip() or None
 
                     # Select teacher (optional)
-                    teachers = self.cursor.execute("""
-                        SELECT t.TeacherID, u.FullName 
-                        FROM Teacher t JOIN User u ON t.AccountID = u.AccountID 
-                        ORDER BY u.FullName
-                    """).fetchall()
+                    teachers = self.catalog.teachers()
                     if not teachers:
                         print("[Notification]: No teachers in the system yet. Cannot assign teacher.")
                         teacher_id = None
                     else:
-                        print("\nTeacher list:")
+                        workload = {w['TeacherID']: w for w in self.teacher_workload((year, semester))}
+                        print(f"\nTeacher list (load in {year} semester {semester}):")
                         for i, t in enumerate(teachers, 1):
-                            print(f" {i}. {t['TeacherID']} - {t['FullName']}")
-                        teacher_choice = input("\nEnter teacher sequence number (Enter to skip): ").strip()
+                            w = workload.get(t['TeacherID'])
+                            load = f"  [{w['Sections']} sections, {w['Minutes'] / 60:.1f} h/week]" if w else ""
+                            print(f" {i}. {t['TeacherID']} - {t['FullName']}{load}")
+                        teacher_choice = _timed_input("\nEnter teacher sequence number (Enter to skip): ").strip()
                         if teacher_choice:
                             try:
                                 idx = int(teacher_choice) - 1
@@ -688,7 +2078,7 @@ class StudentManagementSystem:
                         else:
                             teacher_id = None
 
-                    confirm = input(f"\nConfirm adding course section {course_id} - {class_name} for subject {selected_subject_id}? (Y/N): ").upper()
+                    confirm = _timed_input(f"\nConfirm adding course section {course_id} - {class_name} for subject {selected_subject_id}? (Y/N): ").upper()
                     if confirm == 'Y':
                         try:
                             self.cursor.execute("""
@@ -701,67 +2091,59 @@ class StudentManagementSystem:
                             print(f"[Database error]: {e}")
                     else:
                         print("Operation canceled.")
-                    input("Press Enter to continue...")
+                    _timed_input("Press Enter to continue...")
 
                 elif choice == '3':
                     # Update course section information
                     print("\n--- Select course section to update ---")
-                    courses = self.cursor.execute("""
-                        SELECT c.CourseID, c.ClassName, c.Year, c.Semester, t.TeacherID, u.FullName AS TeacherName
-                        FROM Course c
-                        LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
-                        LEFT JOIN User u ON t.AccountID = u.AccountID
-                        WHERE c.SubjectID = ?
-                        ORDER BY c.Year DESC, c.Semester DESC
-                    """, (selected_subject_id,)).fetchall()
+                    courses = self.catalog.courses_for_subject(selected_subject_id)
 
                     if not courses:
                         print("[Error]: No course sections for this subject yet.")
-                        input("Press Enter...")
+                        _timed_input("Press Enter...")
                         continue
 
                     print("\nCourse section list:")
                     for i, c in enumerate(courses, 1):
-                        teacher = c['TeacherName'] or 'Not assigned'
+                        teacher = self.catalog.teacher_name(c['TeacherID']) or 'Not assigned'
                         print(f" {i}. {c['CourseID']} - {c['ClassName']} ({c['Year']} Sem{c['Semester']}) - Teacher: {teacher}")
 
                     try:
-                        idx = int(input("\nChoose course sequence number: ")) - 1
+                        idx = int(_timed_input("\nChoose course sequence number: ")) - 1
                         if idx < 0 or idx >= len(courses):
                             raise ValueError
                         selected_course = courses[idx]
                         course_id = selected_course['CourseID']
                     except:
                         print("[Error]: Invalid choice!")
-                        input("Press Enter...")
+                        _timed_input("Press Enter...")
                         continue
 
                     print(f"\n--- UPDATE COURSE SECTION {course_id} ---")
                     print(f"Current class name: {selected_course['ClassName']}")
-                    new_class_name = input("New class name (Enter to keep): ").strip() or selected_course['ClassName']
+                    new_class_name = _timed_input("New class name (Enter to keep): ").strip() or selected_course['ClassName']
 
                     print(f"Current year: {selected_course['Year']}")
-                    new_year_input = input("New year (Enter to keep): ").strip()
+                    new_year_input = _timed_input("New year (Enter to keep): ").strip()
                     new_year = int(new_year_input) if new_year_input else selected_course['Year']
 
                     print(f"Current semester: {selected_course['Semester']}")
-                    new_sem_input = input("New semester (1/2, Enter to keep): ").strip()
+                    new_sem_input = _timed_input("New semester (1/2, Enter to keep): ").strip()
                     new_sem = int(new_sem_input) if new_sem_input else selected_course['Semester']
 
                     # Update teacher
-                    current_teacher = selected_course['TeacherName'] or 'None'
+                    current_teacher = self.catalog.teacher_name(selected_course['TeacherID']) or 'None'
                     print(f"Current teacher: {current_teacher}")
-                    teachers = self.cursor.execute("""
-                        SELECT t.TeacherID, u.FullName 
-                        FROM Teacher t JOIN User u ON t.AccountID = u.AccountID 
-                        ORDER BY u.FullName
-                    """).fetchall()
+                    teachers = self.catalog.teachers()
 
                     if teachers:
-                        print("\nAvailable teachers:")
+                        workload = {w['TeacherID']: w for w in self.teacher_workload((new_year, new_sem))}
+                        print(f"\nAvailable teachers (load in {new_year} semester {new_sem}):")
                         for i, t in enumerate(teachers, 1):
-                            print(f" {i}. {t['TeacherID']} - {t['FullName']}")
-                        teacher_choice = input("\nEnter new teacher sequence number (Enter to keep): ").strip()
+                            w = workload.get(t['TeacherID'])
+                            load = f"  [{w['Sections']} sections, {w['Minutes'] / 60:.1f} h/week]" if w else ""
+                            print(f" {i}. {t['TeacherID']} - {t['FullName']}{load}")
+                        teacher_choice = _timed_input("\nEnter new teacher sequence number (Enter to keep): ").strip()
                         if teacher_choice:
                             try:
                                 idx = int(teacher_choice) - 1
@@ -778,7 +2160,7 @@ class StudentManagementSystem:
                     else:
                         new_teacher_id = None
 
-                    confirm = input("\nConfirm update? (Y/N): ").upper()
+                    confirm = _timed_input("\nConfirm update? (Y/N): ").upper()
                     if confirm == 'Y':
                         try:
                             self.cursor.execute("""
@@ -791,21 +2173,16 @@ class StudentManagementSystem:
                             print(f"[Database error]: {e}")
                     else:
                         print("Operation canceled.")
-                    input("Press Enter to continue...")
+                    _timed_input("Press Enter to continue...")
 
                 elif choice == '4':
                     # Delete course section
                     print("\n--- Select course section to delete ---")
-                    courses = self.cursor.execute("""
-                        SELECT c.CourseID, c.ClassName, c.Year, c.Semester
-                        FROM Course c
-                        WHERE c.SubjectID = ?
-                        ORDER BY c.Year DESC, c.Semester DESC
-                    """, (selected_subject_id,)).fetchall()
+                    courses = self.catalog.courses_for_subject(selected_subject_id)
 
                     if not courses:
                         print("[Error]: No course sections for this subject yet.")
-                        input("Press Enter...")
+                        _timed_input("Press Enter...")
                         continue
 
                     print("\nCourse section list:")
@@ -813,7 +2190,7 @@ class StudentManagementSystem:
                         print(f" {i}. {c['CourseID']} - {c['ClassName']} ({c['Year']} Sem{c['Semester']})")
 
                     try:
-                        idx = int(input("\nChoose course sequence number: ")) - 1
+                        idx = int(_timed_input("\nChoose course sequence number: ")) - 1
                         if idx < 0 or idx >= len(courses):
                             raise ValueError
                         selected_course = courses[idx]
@@ -821,7 +2198,7 @@ class StudentManagementSystem:
                         class_name = selected_course['ClassName']
                     except:
                         print("[Error]: Invalid choice!")
-                        input("Press Enter...")
+                        _timed_input("Press Enter...")
                         continue
 
                     # Check constraints: cannot delete if there are enrollments or schedules
@@ -830,10 +2207,10 @@ class StudentManagementSystem:
 
                     if enroll_count > 0 or sched_count > 0:
                         print(f"[Error]: Cannot delete! This course has {enroll_count} enrollments and {sched_count} schedules.")
-                        input("Press Enter...")
+                        _timed_input("Press Enter...")
                         continue
 
-                    confirm = input(f"Confirm DELETE course section {course_id} - {class_name}? (Y/N): ").upper()
+                    confirm = _timed_input(f"Confirm DELETE course section {course_id} - {class_name}? (Y/N): ").upper()
                     if confirm == 'Y':
                         try:
                             self.cursor.execute("DELETE FROM Course WHERE CourseID = ?", (course_id,))
@@ -843,50 +2220,46 @@ class StudentManagementSystem:
                             print(f"[Database error]: {e}")
                     else:
                         print("Operation canceled.")
-                    input("Press Enter to continue...")
+                    _timed_input("Press Enter to continue...")
 
             elif choice == '5':
                 # Add student to class
                 print("\n--- ADD STUDENT TO CLASS ---")
                 # Step 1: Select subject first
-                subjects = self.cursor.execute("SELECT SubjectID, SubjectName FROM Subject ORDER BY SubjectID").fetchall()
+                subjects = self.catalog.subjects()
                 if not subjects:
                     print("[Error]: No subjects in the system yet. Please add subjects first!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 print("Subject list:")
                 for i, sub in enumerate(subjects, 1):
                     print(f" {i}. {sub['SubjectID']} - {sub['SubjectName']}")
                 try:
-                    idx = int(input("\nChoose subject sequence number: ")) - 1
+                    idx = int(_timed_input("\nChoose subject sequence number: ")) - 1
                     if idx < 0 or idx >= len(subjects):
                         raise ValueError
                     selected_subject_id = subjects[idx]['SubjectID']
                     selected_subject_name = subjects[idx]['SubjectName']
                 except:
                     print("[Error]: Invalid choice!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 # Step 2: Select course section
-                courses = self.cursor.execute("""
-                    SELECT c.CourseID, c.ClassName, c.Year, c.Semester
-                    FROM Course c
-                    WHERE c.SubjectID = ?
-                    ORDER BY c.Year DESC, c.Semester DESC
-                """, (selected_subject_id,)).fetchall()
+                courses = self.catalog.courses_for_subject(selected_subject_id)
 
                 if not courses:
                     print(f"[Error]: No course sections for subject {selected_subject_name} yet.")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 print("\nCourse section list:")
                 for i, c in enumerate(courses, 1):
                     print(f" {i}. {c['CourseID']} - {c['ClassName']} ({c['Year']} Sem{c['Semester']})")
+                self.prefetch_rosters(courses)
 
-                idx_input = input("\nEnter class sequence number (Enter to return): ").strip()
+                idx_input = _timed_input("\nEnter class sequence number (Enter to return): ").strip()
                 if not idx_input:
                     print("Returned to menu.")
                     continue
@@ -899,18 +2272,11 @@ class StudentManagementSystem:
                     class_name = selected_course['ClassName']
                 except:
                     print("[Error]: Invalid choice!")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     continue
 
                 # Step 3: Display current students
-                current = self.cursor.execute("""
-                    SELECT s.StudentID, u.FullName
-                    FROM Enrollment e
-                    JOIN Student s ON e.StudentID = s.StudentID
-                    JOIN User u ON s.AccountID = u.AccountID
-                    WHERE e.CourseID = ?
-                    ORDER BY s.StudentID
-                """, (course_id,)).fetchall()
+                current = self.fetch_course_roster(course_id)
 
                 print(f"\nCurrent students in class {course_id} - {class_name}:")
                 if not current:
@@ -921,7 +2287,7 @@ class StudentManagementSystem:
 
                 # Step 4: Enter StudentID
                 while True:
-                    student_id = input("\nEnter StudentID to add (Enter to return): ").strip()
+                    student_id = _timed_input("\nEnter StudentID to add (Enter to return): ").strip()
                     if not student_id:
                         print("Returned to menu.")
                         break
@@ -942,6 +2308,11 @@ class StudentManagementSystem:
                         print("[Error]: This student is already registered for this class! Enter again or Enter to return.")
                         continue
 
+                    missing = self.missing_prerequisites(student_id, self.catalog.course(course_id).SubjectID)
+                    if missing:
+                        print(f"[Error]: Prerequisites not passed: {', '.join(missing)}. Enter again or Enter to return.")
+                        continue
+
                     # Get student name
                     student_info = self.cursor.execute("""
                         SELECT u.FullName FROM Student s
@@ -955,7 +2326,7 @@ class StudentManagementSystem:
 
                     student_name = student_info['FullName']
 
-                    confirm = input(f"\nConfirm ADD {student_id} - {student_name} to class {course_id} ({class_name})? (Y/N): ").upper()
+                    confirm = _timed_input(f"\nConfirm ADD {student_id} - {student_name} to class {course_id} ({class_name})? (Y/N): ").upper()
                     if confirm == 'Y':
                         try:
                             self.cursor.execute(
@@ -971,15 +2342,16 @@ class StudentManagementSystem:
 
                     break  # Exit after processing one student
 
-                input("Press Enter to continue...")
+                _timed_input("Press Enter to continue...")
 
             else:
                 print("[Error]: Invalid function!")
-                input("Press Enter...")
+                _timed_input("Press Enter...")
 
     def manage_schedules(self):
         """Use-case 14: Manage Class Schedules (Classroom Schedule Management) - Per exact specification"""
         while True:
+            self._end_subaction()
             self.clear_screen()
             print("====================================")
             print("   SCHEDULE MANAGEMENT")
@@ -988,10 +2360,11 @@ class StudentManagementSystem:
             print("2. Add a new class schedule")
             print("3. Update the class schedule")
             print("4. Return to Admin menu")
-            choice = input("\nChoose function: ").strip()
+            choice = _timed_input("\nChoose function: ").strip()
 
             if choice == '4':
                 break
+            self._begin_subaction("manage_schedules", choice, ("list", "add", "update"))
 
             # 3. The system displays the class list of sections
             print("\n--- COURSE SECTION LIST ---")
@@ -1004,17 +2377,20 @@ class StudentManagementSystem:
 
             if not courses:
                 print("No course sections in the system yet.")
-                input("Press Enter to continue...")
+                _timed_input("Press Enter to continue...")
                 continue
 
-            print(" CourseID    Class     Subject                  Year  Sem")
-            print("-" * 70)
-            for c in courses:
-                print(f" {c['CourseID']:<10} {c['ClassName']:<9} {c['SubjectName'][:25]:<25} {c['Year']}  {c['Semester']}")
+            self.render_table([
+                ("CourseID", 'CourseID', 10),
+                ("Class", 'ClassName', 20),
+                ("Subject", 'SubjectName', 25),
+                ("Year", 'Year', 4),
+                ("Sem", 'Semester', 3),
+            ], courses)
 
             if choice not in ('1', '2', '3'):
                 print("[Error]: Invalid function!")
-                input("Press Enter...")
+                _timed_input("Press Enter...")
                 continue
 
             if choice == '1':
@@ -1029,29 +2405,30 @@ class StudentManagementSystem:
                 """).fetchall()
 
                 print("\n--- SCHEDULE LIST ---")
-                if not schedules:
-                    print("No schedules set yet.")
-                else:
-                    print(" SchID  CourseID   Class     Subject              Day  Start     End        Room")
-                    print("-" * 90)
-                    for sch in schedules:
-                        print(f" {sch['ScheduleID']:<6} {sch['CourseID']:<10} {sch['ClassName']:<9} "
-                              f"{sch['SubjectName'][:18]:<18} {sch['DayOfWeek']}    "
-                              f"{sch['Start_Time']:<8} {sch['End_Time']:<9} {sch['Room'] or 'None'}")
-                input("\nPress Enter to continue...")
+                self.render_table([
+                    ("SchID", 'ScheduleID', 6),
+                    ("CourseID", 'CourseID', 10),
+                    ("Class", 'ClassName', 20),
+                    ("Subject", 'SubjectName', 18),
+                    ("Day", 'DayOfWeek', 3),
+                    ("Start", 'Start_Time', 5),
+                    ("End", 'End_Time', 5),
+                    ("Room", lambda sch: sch['Room'] or 'None', 12),
+                ], schedules, empty_message="No schedules set yet.")
+                _timed_input("\nPress Enter to continue...")
                 continue
 
             # 4-6. Admin selects add or update → enter section class code (CourseID) from keyboard
             action = "add" if choice == '2' else "update"
             while True:
-                course_id = input(f"\nEnter course section code (CourseID) to {action} schedule: ").strip()
+                course_id = _timed_input(f"\nEnter course section code (CourseID) to {action} schedule: ").strip()
                 if not course_id:
                     print("[Error]: Class code cannot be empty!")
                     continue
-                course = self.cursor.execute("SELECT ClassName FROM Course WHERE CourseID = ?", (course_id,)).fetchone()
+                course = self.catalog.course(course_id)
                 if not course:
                     print("[Error]: Course not found")
-                    retry = input("1. Try again | 2. Return to previous menu: ").strip()
+                    retry = _timed_input("1. Try again | 2. Return to previous menu: ").strip()
                     if retry == '2':
                         break
                     continue
@@ -1064,7 +2441,7 @@ class StudentManagementSystem:
             while True:
                 # Enter DayOfWeek
                 try:
-                    day_str = input("Day of the Week (1=Monday ... 7=Sunday): ").strip()
+                    day_str = _timed_input("Day of the Week (1=Monday ... 7=Sunday): ").strip()
                     day = int(day_str)
                     if day < 1 or day > 7:
                         print("[Error]: Day must be from 1 to 7!")
@@ -1074,13 +2451,13 @@ class StudentManagementSystem:
                     continue
 
                 # Enter Start Time
-                start_time = input("Start Time (HH:MM): ").strip()
+                start_time = _timed_input("Start Time (HH:MM): ").strip()
                 if not self._is_valid_time_format(start_time):
                     print("[Error]: Invalid time format! (HH:MM)")
                     continue
 
                 # Enter End Time
-                end_time = input("End Time (HH:MM): ").strip()
+                end_time = _timed_input("End Time (HH:MM): ").strip()
                 if not self._is_valid_time_format(end_time):
                     print("[Error]: Invalid time format!")
                     continue
@@ -1089,14 +2466,14 @@ class StudentManagementSystem:
                     continue
 
                 # Enter Room
-                room = input("Classroom or Study Location: ").strip() or None
+                room = _timed_input("Classroom or Study Location: ").strip() or None
 
                 # Confirm
-                confirm = input(f"\nConfirm {action} schedule for class {course_id}?\n"
+                confirm = _timed_input(f"\nConfirm {action} schedule for class {course_id}?\n"
                                 f"  Day: {day}\n  Time: {start_time} - {end_time}\n  Room: {room or 'None'}\n(Y/N): ").upper()
                 if confirm != 'Y':
                     print("Operation canceled.")
-                    input("Press Enter...")
+                    _timed_input("Press Enter...")
                     break  # Exit input loop if canceled
 
                 # Perform INSERT or UPDATE
@@ -1124,7 +2501,7 @@ class StudentManagementSystem:
                             print(f" {i}. Day {s['DayOfWeek']} | {s['Start_Time']} - {s['End_Time']} | {s['Room'] or 'None'} (ID: {s['ScheduleID']})")
 
                         try:
-                            idx = int(input("\nChoose schedule sequence number to update: ")) - 1
+                            idx = int(_timed_input("\nChoose schedule sequence number to update: ")) - 1
                             if idx < 0 or idx >= len(scheds):
                                 raise ValueError
                             sched_id = scheds[idx]['ScheduleID']
@@ -1145,10 +2522,138 @@ class StudentManagementSystem:
                     print(f"[Database error]: {e}")
                     continue  # back to ask again if DB error
 
-            input("Press Enter to continue...")
+            _timed_input("Press Enter to continue...")
+
+    def build_report(self, choice):
+        """Build one statistical report (choice '1'-'5').
+
+        Returns (report_lines, rows): the printable text report and the same figures as
+        (metric, value) pairs for CSV/JSON export. Returns None for an unknown choice.
+        """
+        report_lines = []
+        report_lines.append("UTH STUDENT MANAGEMENT SYSTEM STATISTICAL REPORT")
+        report_lines.append("=" * 60)
+        report_lines.append(f"Report creation date: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+        report_lines.append("")
+        rows = []
+
+        if choice == '1':
+            # 1. User statistics by Role
+            users_by_role = self.cursor.execute("""
+                SELECT Role, COUNT(*) as count 
+                FROM User 
+                GROUP BY Role
+                ORDER BY count DESC
+            """).fetchall()
+
+            report_lines.append("1. USER STATISTICS")
+            report_lines.append("-" * 40)
+            total_users = 0
+            if not users_by_role:
+                report_lines.append("  No users in the system yet.")
+            else:
+                for row in users_by_role:
+                    report_lines.append(f"  {row['Role'].upper():<10}: {row['count']:,} people")
+                    rows.append((f"users_{row['Role'].lower()}", row['count']))
+                    total_users += row['count']
+                report_lines.append(f"  Total: {total_users:,} users")
+            rows.append(("users_total", total_users))
+            report_lines.append("")
+
+        elif choice == '2':
+            # 2. Subject statistics
+            subject_count = self.cursor.execute("SELECT COUNT(*) FROM Subject").fetchone()[0]
+            report_lines.append("2. SUBJECT STATISTICS")
+            report_lines.append("-" * 40)
+            if subject_count == 0:
+                report_lines.append("  No subjects in the system yet.")
+            else:
+                report_lines.append(f"  Total subjects: {subject_count:,} subjects")
+            rows.append(("subjects_total", subject_count))
+            report_lines.append("")
+
+        elif choice == '3':
+            # 3. Course section statistics (Course)
+            total_courses = self.cursor.execute("SELECT COUNT(*) FROM Course").fetchone()[0]
+            courses_per_subject = self.cursor.execute("SELECT COUNT(DISTINCT CourseID) FROM Course GROUP BY SubjectID").fetchall()
+            avg_courses_per_subject = total_courses / len(courses_per_subject) if courses_per_subject else 0
+
+            report_lines.append("3. COURSE SECTION STATISTICS")
+            report_lines.append("-" * 40)
+            if total_courses == 0:
+                report_lines.append("  No course sections in the system yet.")
+            else:
+                report_lines.append(f"  Total course sections: {total_courses:,} classes")
+                report_lines.append(f"  Subjects with open classes: {len(courses_per_subject):,} subjects")
+                report_lines.append(f"  Average classes/subject: {avg_courses_per_subject:.1f} classes")
+            rows.append(("courses_total", total_courses))
+            rows.append(("subjects_with_courses", len(courses_per_subject)))
+            rows.append(("avg_courses_per_subject", round(avg_courses_per_subject, 1)))
+            report_lines.append("")
+
+        elif choice == '4':
+            # 4. Registration & grade statistics (ADDED PASS / FAIL SUBJECTS)
+            enroll_stats = dict(self.cursor.execute("""
+                SELECT 
+                    COUNT(*) as total_enroll,
+                    COUNT(DISTINCT StudentID) as unique_students,
+                    COUNT(DISTINCT CourseID) as courses_with_enroll
+                FROM Enrollment
+            """).fetchone())
+            # Grade figures come from the precomputed per-course statistics
+            grade_stats = self.cursor.execute("""
+                SELECT 
+                    COALESCE(SUM(Count), 0) as graded_count,
+                    SUM(Count * Mean) / NULLIF(SUM(Count), 0) as avg_grade,
+                    COALESCE(SUM(PassCount), 0) as passed
+                FROM CourseGradeStats
+            """).fetchone()
+            enroll_stats.update(grade_stats)
+            enroll_stats['failed'] = enroll_stats['graded_count'] - enroll_stats['passed']
+
+            report_lines.append("4. REGISTRATION & GRADE STATISTICS (10-point scale, pass >= 4.0)")
+            report_lines.append("-" * 60)
+            if enroll_stats['total_enroll'] == 0:
+                report_lines.append("  No registrations in the system yet.")
+            else:
+                report_lines.append(f"  Total course registrations: {enroll_stats['total_enroll']:,}")
+                report_lines.append(f"  Students registered for at least 1 course: {enroll_stats['unique_students']:,}")
+                report_lines.append(f"  Classes with registrations: {enroll_stats['courses_with_enroll']:,}")
+                report_lines.append(f"  Graded courses: {enroll_stats['graded_count']:,}")
+                if enroll_stats['graded_count'] > 0:
+                    report_lines.append(f"  System-wide average grade: {enroll_stats['avg_grade']:.2f}")
+                report_lines.append("")
+                report_lines.append("  LEARNING OUTCOMES:")
+                report_lines.append(f"    - Passed (>= 4.0): {enroll_stats['passed']:,} instances")
+                report_lines.append(f"    - Failed (< 4.0): {enroll_stats['failed']:,} instances")
+                report_lines.append(f"    - No grade yet: {enroll_stats['total_enroll'] - enroll_stats['graded_count']:,} instances")
+            for key in ('total_enroll', 'unique_students', 'courses_with_enroll', 'graded_count', 'passed', 'failed'):
+                rows.append((key, enroll_stats[key]))
+            avg_grade = enroll_stats['avg_grade']
+            rows.append(("avg_grade", round(avg_grade, 2) if avg_grade is not None else None))
+            rows.append(("ungraded", enroll_stats['total_enroll'] - enroll_stats['graded_count']))
+            report_lines.append("")
+
+        elif choice == '5':
+            # 5. Schedule statistics
+            schedule_count = self.cursor.execute("SELECT COUNT(*) FROM Schedule").fetchone()[0]
+            report_lines.append("5. SCHEDULE STATISTICS")
+            report_lines.append("-" * 40)
+            if schedule_count == 0:
+                report_lines.append("  No schedules in the system yet.")
+            else:
+                report_lines.append(f"  Total scheduled sessions: {schedule_count:,}")
+            rows.append(("schedules_total", schedule_count))
+            report_lines.append("")
+
+        else:
+            return None
+
+        return report_lines, rows
 
     def view_reports(self):
             while True:
+                self._end_subaction()
                 self.clear_screen()
                 print("====================================")
                 print("   STATISTICAL REPORTS")
@@ -1159,118 +2664,24 @@ class StudentManagementSystem:
                 print("4. Registration & Grade Statistics")
                 print("5. Schedule Statistics")
                 print("6. Return to Admin menu")
-                choice = input("\nChoose report type: ").strip()
+                choice = _timed_input("\nChoose report type: ").strip()
 
                 if choice == '6':
                     break
+                self._begin_subaction("view_reports", choice, ("report_1", "report_2", "report_3", "report_4", "report_5"))
 
-                report_lines = []
-                report_lines.append("UTH STUDENT MANAGEMENT SYSTEM STATISTICAL REPORT")
-                report_lines.append("=" * 60)
-                report_lines.append(f"Report creation date: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-                report_lines.append("")
-
-                if choice == '1':
-                    # 1. User statistics by Role
-                    users_by_role = self.cursor.execute("""
-                        SELECT Role, COUNT(*) as count 
-                        FROM User 
-                        GROUP BY Role
-                        ORDER BY count DESC
-                    """).fetchall()
-
-                    report_lines.append("1. USER STATISTICS")
-                    report_lines.append("-" * 40)
-                    total_users = 0
-                    if not users_by_role:
-                        report_lines.append("  No users in the system yet.")
-                    else:
-                        for row in users_by_role:
-                            report_lines.append(f"  {row['Role'].upper():<10}: {row['count']:,} people")
-                            total_users += row['count']
-                        report_lines.append(f"  Total: {total_users:,} users")
-                    report_lines.append("")
-
-                elif choice == '2':
-                    # 2. Subject statistics
-                    subject_count = self.cursor.execute("SELECT COUNT(*) FROM Subject").fetchone()[0]
-                    report_lines.append("2. SUBJECT STATISTICS")
-                    report_lines.append("-" * 40)
-                    if subject_count == 0:
-                        report_lines.append("  No subjects in the system yet.")
-                    else:
-                        report_lines.append(f"  Total subjects: {subject_count:,} subjects")
-                    report_lines.append("")
-
-                elif choice == '3':
-                    # 3. Course section statistics (Course)
-                    total_courses = self.cursor.execute("SELECT COUNT(*) FROM Course").fetchone()[0]
-                    courses_per_subject = self.cursor.execute("SELECT COUNT(DISTINCT CourseID) FROM Course GROUP BY SubjectID").fetchall()
-                    avg_courses_per_subject = total_courses / len(courses_per_subject) if courses_per_subject else 0
-
-                    report_lines.append("3. COURSE SECTION STATISTICS")
-                    report_lines.append("-" * 40)
-                    if total_courses == 0:
-                        report_lines.append("  No course sections in the system yet.")
-                    else:
-                        report_lines.append(f"  Total course sections: {total_courses:,} classes")
-                        report_lines.append(f"  Subjects with open classes: {len(courses_per_subject):,} subjects")
-                        report_lines.append(f"  Average classes/subject: {avg_courses_per_subject:.1f} classes")
-                    report_lines.append("")
-
-                elif choice == '4':
-                    # 4. Registration & grade statistics (ADDED PASS / FAIL SUBJECTS)
-                    enroll_stats = self.cursor.execute("""
-                        SELECT 
-                            COUNT(*) as total_enroll,
-                            COUNT(DISTINCT StudentID) as unique_students,
-                            COUNT(DISTINCT CourseID) as courses_with_enroll,
-                            COUNT(Grade) as graded_count,
-                            AVG(Grade) as avg_grade,
-                            SUM(CASE WHEN Grade >= 4.0 THEN 1 ELSE 0 END) as passed,
-                            SUM(CASE WHEN Grade < 4.0 AND Grade IS NOT NULL THEN 1 ELSE 0 END) as failed
-                        FROM Enrollment
-                    """).fetchone()
-
-                    report_lines.append("4. REGISTRATION & GRADE STATISTICS (10-point scale, pass >= 4.0)")
-                    report_lines.append("-" * 60)
-                    if enroll_stats['total_enroll'] == 0:
-                        report_lines.append("  No registrations in the system yet.")
-                    else:
-                        report_lines.append(f"  Total course registrations: {enroll_stats['total_enroll']:,}")
-                        report_lines.append(f"  Students registered for at least 1 course: {enroll_stats['unique_students']:,}")
-                        report_lines.append(f"  Classes with registrations: {enroll_stats['courses_with_enroll']:,}")
-                        report_lines.append(f"  Graded courses: {enroll_stats['graded_count']:,}")
-                        if enroll_stats['graded_count'] > 0:
-                            report_lines.append(f"  System-wide average grade: {enroll_stats['avg_grade']:.2f}")
-                        report_lines.append("")
-                        report_lines.append("  LEARNING OUTCOMES:")
-                        report_lines.append(f"    - Passed (>= 4.0): {enroll_stats['passed']:,} instances")
-                        report_lines.append(f"    - Failed (< 4.0): {enroll_stats['failed']:,} instances")
-                        report_lines.append(f"    - No grade yet: {enroll_stats['total_enroll'] - enroll_stats['graded_count']:,} instances")
-                    report_lines.append("")
-
-                elif choice == '5':
-                    # 5. Schedule statistics
-                    schedule_count = self.cursor.execute("SELECT COUNT(*) FROM Schedule").fetchone()[0]
-                    report_lines.append("5. SCHEDULE STATISTICS")
-                    report_lines.append("-" * 40)
-                    if schedule_count == 0:
-                        report_lines.append("  No schedules in the system yet.")
-                    else:
-                        report_lines.append(f"  Total scheduled sessions: {schedule_count:,}")
-                    report_lines.append("")
-
-                else:
+                report = self.build_report(choice)
+                if report is None:
                     print("[Error]: Invalid choice!")
-                    input("Press Enter to continue...")
+                    _timed_input("Press Enter to continue...")
                     continue
+                report_lines, _ = report
 
                 # Display report in console
                 print("\n".join(report_lines))
 
                 # Export to txt file
-                export = input("\nDo you want to export the report to txt file? (Y/N): ").upper()
+                export = _timed_input("\nDo you want to export the report to txt file? (Y/N): ").upper()
                 if export == 'Y':
                     filename = f"report_{choice}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
                     try:
@@ -1280,21 +2691,83 @@ class StudentManagementSystem:
                     except Exception as e:
                         print(f"[Error saving file]: {e}")
 
-                input("\nPress Enter to continue...")
+                _timed_input("\nPress Enter to continue...")
 
     # ==========================================
     # STUDENT USE-CASES (6, 7)
     # ==========================================
+    def get_student_id(self):
+        """StudentID of the logged-in user (None if not a student)"""
+        identity = self.session_identity()
+        return identity['EntityID'] if identity and identity['Role'] == 'student' else None
+
+    def fetch_student_schedule(self, student_id):
+        """Weekly timetable, newest term first, by day and time: one read of StudentTimetable.
+
+        Read-only: a stale timetable is read from the base tables instead, and queued for the
+        timetable refresher when one is running (see enable_timetable_refresh()).
+        """
+        source = "StudentTimetable WHERE StudentID = ?"
+        if self.conn.execute("SELECT 1 FROM TimetableDirty WHERE StudentID = ?", (student_id,)).fetchone():
+            source = f"({TIMETABLE_SOURCE})"
+            if self.timetable_refresher is not None:
+                self.timetable_refresher.request(student_id)
+        # The ORDER BY is the StudentTimetable primary key order, so the read needs no sort
+        return self.cursor.execute(f"SELECT {TIMETABLE_COLUMNS} FROM {source} "
+                                   f"ORDER BY Year DESC, Semester DESC, DayOfWeek, Start_Time, ScheduleID",
+                                   (student_id,)).fetchall()
+
+    def enable_timetable_refresh(self, refresher=None):
+        """Have stale timetables rebuilt in the background after they are viewed; pass another app's
+        refresher to share its thread. Returns the refresher."""
+        self.timetable_refresher = refresher or TimetableRefresher(self.db_name)
+        return self.timetable_refresher
+
+    def fetch_student_courses(self, student_id, include_archives=False):
+        """A student's courses and grades, newest term first; with include_archives also the
+        archived years (the full transcript)"""
+        sql = """
+            SELECT c.CourseID, sub.SubjectName, c.ClassName, c.Year, c.Semester, u.FullName AS TeacherName, sub.Credits, e.Grade
+            FROM {db}.Enrollment e
+            JOIN {db}.Course c ON e.CourseID = c.CourseID
+            JOIN main.Subject sub ON c.SubjectID = sub.SubjectID
+            LEFT JOIN main.Teacher t ON c.TeacherID = t.TeacherID
+            LEFT JOIN main.User u ON t.AccountID = u.AccountID
+            WHERE e.StudentID = ?"""
+        if not include_archives:
+            return self.cursor.execute(sql.format(db="main") + " ORDER BY c.Year DESC, c.Semester DESC",
+                                       (student_id,)).fetchall()
+        rows = self.union_archives(sql, (student_id,))
+        rows.sort(key=lambda c: (-(c['Year'] or 0), -(c['Semester'] or 0)))
+        return rows
+
     def student_view_schedule(self):
-        res = self.cursor.execute("SELECT StudentID FROM Student WHERE AccountID=?", (self.current_user['AccountID'],)).fetchone()
-        query = """SELECT sub.SubjectName, s.DayOfWeek, s.Start_Time, s.Room 
-                   FROM Enrollment e JOIN Course c ON e.CourseID=c.CourseID 
-                   JOIN Subject sub ON c.SubjectID=sub.SubjectID
-                   JOIN Schedule s ON c.CourseID=s.CourseID WHERE e.StudentID=?"""
-        data = self.cursor.execute(query, (res[0],)).fetchall()
-        if not data: print("No timetable yet.")
-        for r in data: print(f"{r[0]} | Day {r[1]} | {r[2]} | {r[3]}")
-        input()
+        """Use-case 6: View Schedule - For students to view their weekly timetable"""
+        self.clear_screen()
+        print("====================================")
+        print("   TIMETABLE")
+        print("====================================")
+        student_id = self.get_student_id()
+        if not student_id:
+            print("[Error]: Student information not found!")
+            _timed_input("Press Enter...")
+            return
+
+        schedules = self.fetch_student_schedule(student_id)
+
+        print("\n--- YOUR WEEKLY TIMETABLE ---")
+        self.render_table([
+            ("Year", 'Year', 4),
+            ("Sem", 'Semester', 3),
+            ("Day", 'DayOfWeek', 3),
+            ("Start", 'Start_Time', 5),
+            ("End", lambda sch: sch['End_Time'] or '', 5),
+            ("Subject", 'SubjectName', 25),
+            ("Class", 'ClassName', 20),
+            ("Teacher", lambda sch: sch['TeacherName'] or 'Not assigned', 20),
+            ("Room", lambda sch: sch['Room'] or 'None', 8),
+        ], schedules, empty_message="No timetable yet.")
+        _timed_input("\nPress Enter to return...")
 
     def student_view_courses(self):
         """Use-case 7 & 8: View Course information / View Course's information - For students to view registered course information"""
@@ -1302,39 +2775,120 @@ class StudentManagementSystem:
         print("====================================")
         print("   COURSE INFORMATION")
         print("====================================")
-        student_id_res = self.cursor.execute("SELECT StudentID FROM Student WHERE AccountID=?", (self.current_user['AccountID'],)).fetchone()
-        if not student_id_res:
+        student_id = self.get_student_id()
+        if not student_id:
             print("[Error]: Student information not found!")
-            input("Press Enter...")
+            _timed_input("Press Enter...")
             return
 
-        student_id = student_id_res['StudentID']
-        courses = self.cursor.execute("""
-            SELECT c.CourseID, sub.SubjectName, c.ClassName, c.Year, c.Semester, u.FullName AS TeacherName, sub.Credits, e.Grade
-            FROM Enrollment e
-            JOIN Course c ON e.CourseID = c.CourseID
-            JOIN Subject sub ON c.SubjectID = sub.SubjectID
-            LEFT JOIN Teacher t ON c.TeacherID = t.TeacherID
-            LEFT JOIN User u ON t.AccountID = u.AccountID
-            WHERE e.StudentID = ?
-            ORDER BY c.Year DESC, c.Semester DESC
-        """, (student_id,)).fetchall()
+        courses = self.fetch_student_courses(student_id)
+        columns = [
+            ("CourseID", 'CourseID', 10),
+            ("Subject", 'SubjectName', 25),
+            ("Class", 'ClassName', 20),
+            ("Year", 'Year', 4),
+            ("Sem", 'Semester', 3),
+            ("Teacher", lambda c: c['TeacherName'] or 'Not assigned', 20),
+            ("Credits", 'Credits', 7),
+            ("Grade", lambda c: c['Grade'] if c['Grade'] is not None else 'No grade', 8),
+        ]
 
         print("\n--- LIST OF REGISTERED COURSES ---")
-        if not courses:
-            print("You have not registered for any courses.")
-        else:
-            print(" CourseID    Subject                      Class     Year  Sem  Teacher                 Credits   Grade")
-            print("-" * 100)
-            for course in courses:
-                teacher = course['TeacherName'] or 'Not assigned'
-                grade = course['Grade'] if course['Grade'] is not None else 'No grade'
-                print(f" {course['CourseID']:<10} {course['SubjectName'][:25]:<25} {course['ClassName']:<9} {course['Year']}  {course['Semester']}  {teacher[:20]:<20} {course['Credits']}        {grade}")
-        input("\nPress Enter to return...")
+        self.render_table(columns, courses, empty_message="You have not registered for any courses.")
+        if not self.archived_years():
+            _timed_input("\nPress Enter to return...")
+            return
+        # Past years are only read from the archive files when asked for
+        if _timed_input("\nEnter A to include archived years, or press Enter to return: ").strip().upper() != 'A':
+            return
+        try:
+            courses = self.fetch_student_courses(student_id, include_archives=True)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[Error]: Cannot read the archives: {e}")
+            _timed_input("Press Enter to return...")
+            return
+        print("\n--- FULL TRANSCRIPT ---")
+        self.render_table(columns, courses, empty_message="You have not registered for any courses.")
+        _timed_input("\nPress Enter to return...")
+
+    def student_degree_audit(self):
+        """Remaining degree requirements of the logged-in student, computed live"""
+        import degree_audit
+        self.clear_screen()
+        print("====================================")
+        print("   DEGREE AUDIT")
+        print("====================================")
+        student_id = self.get_student_id()
+        if not student_id:
+            print("[Error]: Student information not found!")
+            _timed_input("Press Enter...")
+            return
+        major, rows = degree_audit.audit_student(self, student_id)
+        if rows is None:
+            print(f"[Notification]: No curriculum has been set up for your major ({major}) yet.")
+            _timed_input("\nPress Enter to return...")
+            return
+        print(f"\n--- REQUIREMENTS OF {str(major).upper()} ---")
+        self.render_table([(header, lambda r, i=i: r[i], width) for header, i, width in degree_audit.AUDIT_COLUMNS],
+                          rows)
+        outstanding = sum(1 for r in rows if r[3])
+        print("\nAll requirements met!" if not outstanding else f"\n{outstanding} requirement(s) outstanding.")
+        _timed_input("\nPress Enter to return...")
 
     # ==========================================
     # LECTURER USE-CASES (8, 9, 10)
     # ==========================================
+    def get_teacher_id(self):
+        """TeacherID of the logged-in user (None if not a teacher)"""
+        identity = self.session_identity()
+        return identity['EntityID'] if identity and identity['Role'] == 'teacher' else None
+
+    def fetch_course_roster(self, course_id):
+        if self.prefetcher:
+            rows = self.prefetcher.get(("roster", course_id), self._data_mark())
+            if rows is not None:
+                return rows
+        return self.cursor.execute(COURSE_ROSTER_SQL, (course_id,)).fetchall()
+
+    def prefetch_rosters(self, courses):
+        """Start loading the rosters of the first listed courses while the user picks one"""
+        mark = self._data_mark() if self.prefetcher else None
+        if mark is None:
+            return
+        for course in courses[:PREFETCH_LIMIT]:
+            self.prefetcher.request(("roster", course['CourseID']), mark, COURSE_ROSTER_SQL, (course['CourseID'],))
+
+    def _data_mark(self):
+        """Changes whenever anything is committed (by any connection); None inside a write transaction,
+        whose uncommitted rows a prefetch on another connection cannot see"""
+        if self.conn.in_transaction:
+            return None
+        return self.conn.execute("PRAGMA data_version").fetchone()[0], self.conn.total_changes
+
+    def fetch_teacher_schedule(self, teacher_id):
+        return self.cursor.execute("""
+            SELECT c.CourseID, c.ClassName, sub.SubjectName,
+                   s.DayOfWeek, s.Start_Time, s.End_Time, s.Room
+            FROM Course c
+            JOIN Subject sub ON c.SubjectID = sub.SubjectID
+            JOIN Schedule s ON c.CourseID = s.CourseID
+            WHERE c.TeacherID = ?
+            ORDER BY c.Year DESC, c.Semester DESC, s.DayOfWeek, s.Start_Time
+        """, (teacher_id,)).fetchall()
+
+    def fetch_teacher_courses(self, teacher_id):
+        return self.cursor.execute("""
+            SELECT c.CourseID, sub.SubjectName, c.ClassName, c.Year, c.Semester, sub.Credits, c.ClassSize, COUNT(e.StudentID) as Enrolled,
+                   gs.Mean AS AvgGrade, gs.Count AS Graded
+            FROM Course c
+            JOIN Subject sub ON c.SubjectID = sub.SubjectID
+            LEFT JOIN Enrollment e ON c.CourseID = e.CourseID AND e.Status = 'registered'
+            LEFT JOIN CourseGradeStats gs ON c.CourseID = gs.CourseID
+            WHERE c.TeacherID = ?
+            GROUP BY c.CourseID
+            ORDER BY c.Year DESC, c.Semester DESC
+        """, (teacher_id,)).fetchall()
+
     def teacher_enter_grades(self):
         """Use-case 9: Enter Grades - Enter grades for students, support Enter to skip"""
         self.clear_screen()
@@ -1343,13 +2897,12 @@ class StudentManagementSystem:
         print("====================================")
 
         # Get list of classes teaching
-        teacher_res = self.cursor.execute("SELECT TeacherID FROM Teacher WHERE AccountID=?", (self.current_user['AccountID'],)).fetchone()
-        if not teacher_res:
+        teacher_id = self.get_teacher_id()
+        if not teacher_id:
             print("[Error]: Teacher information not found!")
-            input("Press Enter to return...")
+            _timed_input("Press Enter to return...")
             return
 
-        teacher_id = teacher_res['TeacherID']
         courses = self.cursor.execute("""
             SELECT CourseID, ClassName, Year, Semester
             FROM Course 
@@ -1359,15 +2912,16 @@ class StudentManagementSystem:
 
         if not courses:
             print("[Notification]: You have not been assigned any classes to enter grades.")
-            input("Press Enter to return...")
+            _timed_input("Press Enter to return...")
             return
 
         print("\nList of classes you are teaching:")
         for i, c in enumerate(courses, 1):
             print(f" {i}. {c['CourseID']} - {c['ClassName']} ({c['Year']} Sem{c['Semester']})")
+        self.prefetch_rosters(courses)
 
         try:
-            idx = int(input("\nChoose class sequence number to enter grades: ").strip()) - 1
+            idx = int(_timed_input("\nChoose class sequence number to enter grades: ").strip()) - 1
             if idx < 0 or idx >= len(courses):
                 raise ValueError
             selected_course = courses[idx]
@@ -1375,22 +2929,15 @@ class StudentManagementSystem:
             class_name = selected_course['ClassName']
         except:
             print("[Error]: Invalid choice!")
-            input("Press Enter to return...")
+            _timed_input("Press Enter to return...")
             return
 
         # Get list of students in class
-        students = self.cursor.execute("""
-            SELECT e.EnrollID, s.StudentID, u.FullName, e.Grade
-            FROM Enrollment e
-            JOIN Student s ON e.StudentID = s.StudentID
-            JOIN User u ON s.AccountID = u.AccountID
-            WHERE e.CourseID = ?
-            ORDER BY s.StudentID
-        """, (course_id,)).fetchall()
+        students = self.fetch_course_roster(course_id)
 
         if not students:
             print(f"[Notification]: Class {course_id} - {class_name} has no registered students yet.")
-            input("Press Enter to return...")
+            _timed_input("Press Enter to return...")
             return
 
         print(f"\nEnter grades for class {course_id} - {class_name}")
@@ -1404,7 +2951,7 @@ class StudentManagementSystem:
             print(f"  Current grade: {current_grade}")
 
             while True:
-                grade_input = input("  Enter new grade (0-10, Enter to skip): ").strip()
+                grade_input = _timed_input("  Enter new grade (0-10, Enter to skip): ").strip()
                 
                 # Press Enter → skip
                 if not grade_input:
@@ -1417,6 +2964,7 @@ class StudentManagementSystem:
                         # Update grade
                         self.cursor.execute("UPDATE Enrollment SET Grade = ? WHERE EnrollID = ?",
                                             (grade, student['EnrollID']))
+                        self._apply_grade_change(course_id, student['Grade'], grade)
                         updated_count += 1
                         print(f"  → Grade updated: {grade}")
                         break
@@ -1429,7 +2977,97 @@ class StudentManagementSystem:
         print("\n" + "=" * 60)
         print(f"[Completed]: Updated grades for {updated_count} students in class.")
         print(f"  Total students in class: {len(students)}")
-        input("\nPress Enter to return to menu...")
+        stats = self.get_course_grade_stats(course_id)
+        if stats:
+            print(f"  Class statistics: {stats['count']} graded | average {stats['mean']:.2f} "
+                  f"(std {stats['stddev']:.2f}) | min {stats['min']} | max {stats['max']} | "
+                  f"passed {stats['passed']} ({stats['pass_rate']:.0%})")
+        _timed_input("\nPress Enter to return to menu...")
+
+    def teacher_take_attendance(self):
+        """Take Attendance - one roll call of a class session, saved in one transaction"""
+        self.clear_screen()
+        print("====================================")
+        print("   TAKE ATTENDANCE")
+        print("====================================")
+        teacher_id = self.get_teacher_id()
+        if not teacher_id:
+            print("[Error]: Teacher information not found!")
+            _timed_input("Press Enter to return...")
+            return
+
+        slots = self.cursor.execute("""
+            SELECT s.ScheduleID, s.DayOfWeek, s.Start_Time, s.End_Time, s.Room, c.CourseID, c.ClassName, c.Year, c.Semester
+            FROM Course c JOIN Schedule s ON s.CourseID = c.CourseID
+            WHERE c.TeacherID = ?
+            ORDER BY c.Year DESC, c.Semester DESC, c.CourseID, s.DayOfWeek, s.Start_Time
+        """, (teacher_id,)).fetchall()
+        if not slots:
+            print("[Notification]: You have no scheduled class sessions.")
+            _timed_input("Press Enter to return...")
+            return
+
+        print("\nYour class sessions:")
+        for i, s in enumerate(slots, 1):
+            print(f" {i}. {s['CourseID']} - {s['ClassName']} ({s['Year']} Sem{s['Semester']}) | "
+                  f"Day {s['DayOfWeek']} {s['Start_Time']}-{s['End_Time']} | {s['Room'] or 'None'}")
+        try:
+            idx = int(_timed_input("\nChoose session sequence number: ").strip()) - 1
+            if idx < 0 or idx >= len(slots):
+                raise ValueError
+            slot = slots[idx]
+        except ValueError:
+            print("[Error]: Invalid choice!")
+            _timed_input("Press Enter to return...")
+            return
+
+        # Default: the latest date (today included) that falls on the slot's weekday
+        today = datetime.now().date()
+        default_date = (today - timedelta(days=(today.isoweekday() - slot['DayOfWeek']) % 7)).isoformat()
+        session_date = _timed_input(f"Session date (YYYY-MM-DD, Enter for {default_date}): ").strip() or default_date
+        try:
+            day = datetime.strptime(session_date, "%Y-%m-%d").date()
+        except ValueError:
+            day = None
+        if day is None or day.isoweekday() != slot['DayOfWeek'] or day > today:
+            print(f"[Error]: {session_date} is not a past session date of this class (day {slot['DayOfWeek']})!")
+            _timed_input("Press Enter to return...")
+            return
+        session_date = day.isoformat()
+
+        students = self.fetch_course_roster(slot['CourseID'])
+        if not students:
+            print(f"[Notification]: Class {slot['CourseID']} has no registered students yet.")
+            _timed_input("Press Enter to return...")
+            return
+        marked = dict(self.cursor.execute("SELECT EnrollID, Status FROM Attendance WHERE SessionDate = ? AND ScheduleID = ?",
+                                          (session_date, slot['ScheduleID'])))
+
+        print(f"\nRoll call {slot['CourseID']} on {session_date}")
+        print(" (P = present, L = late, A = absent, E = excused; Enter keeps the shown mark)")
+        print("-" * 60)
+        rows = []
+        for student in students:
+            current = marked.get(student['EnrollID'], 'P')
+            while True:
+                status = _timed_input(f" {student['StudentID']} - {student['FullName']} [{current}]: ").strip().upper() or current
+                if status in ATTENDANCE_STATUSES:
+                    break
+                print("[Error]: Enter P, L, A or E!")
+            rows.append({'ScheduleID': slot['ScheduleID'], 'Date': session_date,
+                         'StudentID': student['StudentID'], 'Status': status})
+
+        recorded, skipped = self.batch_import_attendance(rows, batch_size=None)
+        print("\n" + "=" * 60)
+        if skipped:
+            print(f"[Error]: Attendance not saved: {skipped[0][1]}")
+        else:
+            absent = sum(1 for r in rows if r['Status'] == 'A')
+            print(f"[Completed]: Recorded attendance for {recorded} students ({absent} absent).")
+            summary = self.course_attendance_rate(slot['CourseID'])
+            if summary and summary['Rate'] is not None:
+                print(f"  Course attendance rate: {summary['Rate']}% over {summary['Sessions']} student-sessions")
+        _timed_input("\nPress Enter to return to menu...")
 
     def teacher_view_schedule(self):
         """Use-case 10: View teaching Schedule - For teachers to view their teaching schedule"""
@@ -1437,32 +3075,25 @@ class StudentManagementSystem:
         print("====================================")
         print("   TEACHING SCHEDULE")
         print("====================================")
-        teacher_id_res = self.cursor.execute("SELECT TeacherID FROM Teacher WHERE AccountID=?", (self.current_user['AccountID'],)).fetchone()
-        if not teacher_id_res:
+        teacher_id = self.get_teacher_id()
+        if not teacher_id:
             print("[Error]: Teacher information not found!")
-            input("Press Enter...")
+            _timed_input("Press Enter...")
             return
 
-        teacher_id = teacher_id_res['TeacherID']
-        schedules = self.cursor.execute("""
-            SELECT c.CourseID, c.ClassName, sub.SubjectName,
-                   s.DayOfWeek, s.Start_Time, s.End_Time, s.Room
-            FROM Course c
-            JOIN Subject sub ON c.SubjectID = sub.SubjectID
-            JOIN Schedule s ON c.CourseID = s.CourseID
-            WHERE c.TeacherID = ?
-            ORDER BY c.Year DESC, c.Semester DESC, s.DayOfWeek, s.Start_Time
-        """, (teacher_id,)).fetchall()
+        schedules = self.fetch_teacher_schedule(teacher_id)
 
         print("\n--- YOUR TEACHING SCHEDULE ---")
-        if not schedules:
-            print("You have not been assigned any classes or no teaching schedule yet.")
-        else:
-            print(" CourseID   Class     Subject              Day  Start     End        Room")
-            print("-" * 80)
-            for sch in schedules:
-                print(f" {sch['CourseID']:<10} {sch['ClassName']:<9} {sch['SubjectName'][:18]:<18} {sch['DayOfWeek']}    {sch['Start_Time']:<8} {sch['End_Time']:<9} {sch['Room'] or 'None'}")
-        input("\nPress Enter to return...")
+        self.render_table([
+            ("CourseID", 'CourseID', 10),
+            ("Class", 'ClassName', 20),
+            ("Subject", 'SubjectName', 18),
+            ("Day", 'DayOfWeek', 3),
+            ("Start", 'Start_Time', 5),
+            ("End", 'End_Time', 5),
+            ("Room", lambda sch: sch['Room'] or 'None', 12),
+        ], schedules, empty_message="You have not been assigned any classes or no teaching schedule yet.")
+        _timed_input("\nPress Enter to return...")
 
     def teacher_view_courses(self):
         """View Course information - For teachers to view information of courses they are teaching"""
@@ -1471,33 +3102,161 @@ class StudentManagementSystem:
         print("   COURSE INFORMATION (Teacher)")
         print("====================================")
         
-        teacher_id_res = self.cursor.execute("SELECT TeacherID FROM Teacher WHERE AccountID=?", (self.current_user['AccountID'],)).fetchone()
-        if not teacher_id_res:
+        teacher_id = self.get_teacher_id()
+        if not teacher_id:
             print("[Error]: Teacher information not found!")
-            input("Press Enter...")
+            _timed_input("Press Enter...")
             return
 
-        teacher_id = teacher_id_res['TeacherID']
-        courses = self.cursor.execute("""
-            SELECT c.CourseID, sub.SubjectName, c.ClassName, c.Year, c.Semester, sub.Credits, c.ClassSize, COUNT(e.StudentID) as Enrolled
-            FROM Course c
-            JOIN Subject sub ON c.SubjectID = sub.SubjectID
-            LEFT JOIN Enrollment e ON c.CourseID = e.CourseID AND e.Status = 'registered'
-            WHERE c.TeacherID = ?
-            GROUP BY c.CourseID
-            ORDER BY c.Year DESC, c.Semester DESC
-        """, (teacher_id,)).fetchall()
+        courses = self.fetch_teacher_courses(teacher_id)
 
         print("\n--- LIST OF COURSES TEACHING ---")
-        if not courses:
-            print("You have not been assigned to teach any courses.")
+        self.render_table([
+            ("CourseID", 'CourseID', 10),
+            ("Subject", 'SubjectName', 25),
+            ("Class", 'ClassName', 20),
+            ("Year", 'Year', 4),
+            ("Sem", 'Semester', 3),
+            ("Credits", 'Credits', 7),
+            ("Enrollment", lambda c: f"{c['Enrolled'] or 0}/{c['ClassSize']}", 10),
+            ("Avg grade", lambda c: f"{c['AvgGrade']:.2f}" if c['Graded'] else "-", 9),
+        ], courses, empty_message="You have not been assigned to teach any courses.")
+        _timed_input("\nPress Enter to return...")
+
+    # ==========================================
+    # USE-CASE LATENCY
+    # ==========================================
+    def _run_action(self, action):
+        """Run one menu action, timing it into self.latency (input wait left out); profiled under --profile"""
+        started, waited = time.perf_counter(), _input_wait
+        self._request_serial += 1
+        try:
+            if self.profiler:
+                return self.profiler.run(action.__name__, action)
+            return action()
+        finally:
+            self._end_subaction()
+            self.latency.record(action.__name__, time.perf_counter() - started - (_input_wait - waited))
+
+    def _begin_subaction(self, screen, choice, names):
+        """Time the function chosen in a management screen as '<screen>.<name>' until the next choice"""
+        self._end_subaction()
+        self._request_serial += 1
+        index = int(choice) - 1 if choice.isdigit() else -1
+        name = names[index] if 0 <= index < len(names) else "invalid"
+        self._subaction = (f"{screen}.{name}", time.perf_counter(), _input_wait)
+
+    def _end_subaction(self):
+        if self._subaction:
+            name, started, waited = self._subaction
+            self._subaction = None
+            self.latency.record(name, time.perf_counter() - started - (_input_wait - waited))
+
+    def dump_latency(self, path=None):
+        """Append the p50/p95/p99 report to path (default self.latency_log); returns the lines"""
+        lines = self.latency.report_lines()
+        path = path or self.latency_log
+        if path:
+            user = self.current_user['UserName'] if self.current_user else "-"
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"# {datetime.now():%Y-%m-%d %H:%M:%S} {user}\n" + "\n".join(lines) + "\n\n")
+        return lines
+
+    # ==========================================
+    # DIAGNOSTICS: QUERY TRACE / SLOW-QUERY LOG
+    # ==========================================
+    def enable_query_trace(self, threshold_ms=100, log_path=SLOW_QUERY_LOG):
+        """Time every statement; statements slower than threshold_ms go to log_path with their query plan"""
+        if self.query_tracer is None:
+            self.query_tracer = QueryTracer(self.conn, threshold_ms, log_path)
+            self.cursor = self.conn.cursor(lambda conn: TracingCursor(conn, self.query_tracer))
+            self.conn.tracer = self.query_tracer
+            self.conn.set_trace_callback(self.query_tracer.on_sqlite_statement)
         else:
-            print(" CourseID    Subject                      Class     Year  Sem  Credits   Enrollment")
-            print("-" * 90)
-            for course in courses:
-                enrolled = course['Enrolled'] or 0
-                print(f" {course['CourseID']:<10} {course['SubjectName'][:25]:<25} {course['ClassName']:<9} {course['Year']}  {course['Semester']}  {course['Credits']:<9} {enrolled}/{course['ClassSize']}")
-        input("\nPress Enter to return...")
+            self.query_tracer.threshold_ms = threshold_ms
+            self.query_tracer.log_path = log_path
+        return self.query_tracer
+
+    def disable_query_trace(self):
+        """Put the plain cursor back; returns the tracer with what it collected"""
+        tracer = self.query_tracer
+        if tracer is not None:
+            self.cursor._finish()
+            self.conn.tracer = None
+            self.conn.set_trace_callback(None)
+            self.cursor = self.conn.cursor()
+            self.query_tracer = None
+        return tracer
+
+    def diagnostics(self):
+        """Admin: switch the query trace on/off at runtime and inspect statement timings"""
+        while True:
+            self.clear_screen()
+            print("====================================")
+            print("   DIAGNOSTICS")
+            print("====================================")
+            tracer = self.query_tracer
+            if tracer:
+                print(f"Query trace: ON | slow >= {tracer.threshold_ms:g} ms -> {tracer.log_path} | "
+                      f"{tracer.calls} statements, {tracer.slow} slow")
+            else:
+                print("Query trace: OFF")
+            print("1. Turn query trace on/off")
+            print("2. Set slow-query threshold")
+            print("3. Top statements by total time")
+            print("4. Use-case latency (p50/p95/p99)")
+            print("5. Return to Admin menu")
+            choice = _timed_input("\nChoose function: ").strip()
+
+            if choice == '5':
+                break
+            elif choice == '1':
+                if tracer:
+                    self.disable_query_trace()
+                    print("[Notification]: Query trace turned off.")
+                else:
+                    tracer = self.enable_query_trace()
+                    print(f"[Notification]: Query trace on, slow statements are written to {tracer.log_path}.")
+                _timed_input("Press Enter to continue...")
+            elif choice == '2':
+                try:
+                    threshold = float(_timed_input("Slow-query threshold in ms: ").strip())
+                    if threshold < 0:
+                        raise ValueError
+                except ValueError:
+                    print("[Error]: Please enter a number of milliseconds!")
+                    _timed_input("Press Enter to continue...")
+                    continue
+                self.enable_query_trace(threshold, tracer.log_path if tracer else SLOW_QUERY_LOG)
+                print(f"[Success]: Query trace on, threshold {threshold:g} ms.")
+                _timed_input("Press Enter to continue...")
+            elif choice == '3':
+                if not tracer:
+                    print("[Notification]: Turn the query trace on first.")
+                    _timed_input("Press Enter to continue...")
+                    continue
+                self.cursor._finish()
+                print("\n--- TOP STATEMENTS ---")
+                self.render_table([
+                    ("Calls", lambda r: r[1], 7),
+                    ("Total ms", lambda r: f"{r[2]:.1f}", 10),
+                    ("Max ms", lambda r: f"{r[3]:.1f}", 9),
+                    ("Slowest from", lambda r: r[4], 40),
+                    ("Statement", lambda r: r[0], 70),
+                ], tracer.top(), empty_message="No statements recorded yet.")
+                if tracer.sqlite_statements:
+                    executed = ", ".join(f"{kind} {n}" for kind, n in sorted(tracer.sqlite_statements.items()))
+                    print(f"\nExecuted by SQLite: {executed}")
+                _timed_input("\nPress Enter to continue...")
+            elif choice == '4':
+                print("\n--- USE-CASE LATENCY (input wait excluded) ---")
+                print("\n".join(self.dump_latency()))
+                if self.latency_log:
+                    print(f"[Success]: Also appended to {self.latency_log}")
+                _timed_input("\nPress Enter to continue...")
+            else:
+                print("[Error]: Invalid choice!")
+                _timed_input("Press Enter to continue...")
 
     # ==========================================
     # MAIN MENUS
@@ -1506,53 +3265,1210 @@ class StudentManagementSystem:
         while True:
             self.clear_screen()
             print(f"--- ADMIN DASHBOARD ---")
-            print("1. Profile | 2. Users | 3. Subjects | 4. Course Sections | 5. Schedules | 6. Reports | 7. PW | 8. Logout")
-            c = input("Choose: ")
-            if c == '1': self.view_profile()
-            elif c == '2': self.manage_users()
-            elif c == '3': self.manage_subjects()
-            elif c == '4': self.manage_course_sections()
-            elif c == '5': self.manage_schedules()
-            elif c == '6': self.view_reports()
-            elif c == '7': self.change_password()
+            print("1. Profile | 2. Users | 3. Subjects | 4. Course Sections | 5. Schedules | 6. Reports | 7. PW | 8. Logout | 9. Diagnostics")
+            c = _timed_input("Choose: ")
+            if c == '1': self._run_action(self.view_profile)
+            elif c == '2': self._run_action(self.manage_users)
+            elif c == '3': self._run_action(self.manage_subjects)
+            elif c == '4': self._run_action(self.manage_course_sections)
+            elif c == '5': self._run_action(self.manage_schedules)
+            elif c == '6': self._run_action(self.view_reports)
+            elif c == '7': self._run_action(self.change_password)
             elif c == '8': 
-                if self.logout(): break
+                if self._run_action(self.logout): break
+            elif c == '9': self._run_action(self.diagnostics)
 
     def student_menu(self):
         while True:
             self.clear_screen()
             print(f"--- STUDENT MENU ---")
-            print("1. Profile | 2. Schedule | 3. Courses | 4. PW | 5. Logout")
-            c = input("Choose: ")
-            if c == '1': self.view_profile()
-            elif c == '2': self.student_view_schedule()
-            elif c == '3': self.student_view_courses()
-            elif c == '4': self.change_password()
+            print("1. Profile | 2. Schedule | 3. Courses | 4. PW | 5. Logout | 6. Degree audit")
+            c = _timed_input("Choose: ")
+            if c == '1': self._run_action(self.view_profile)
+            elif c == '2': self._run_action(self.student_view_schedule)
+            elif c == '3': self._run_action(self.student_view_courses)
+            elif c == '4': self._run_action(self.change_password)
             elif c == '5':
-                if self.logout(): break
+                if self._run_action(self.logout): break
+            elif c == '6': self._run_action(self.student_degree_audit)
 
     def teacher_menu(self):
         while True:
             self.clear_screen()
             print(f"--- TEACHER MENU ---")
-            print("1. Profile | 2. Teaching Course | 3. Teaching Schedule | 4. Enter Grades | 5. PW | 6. Logout")
-            c = input("Choose: ")
-            if c == '1': self.view_profile()
-            elif c == '2': self.teacher_view_courses()
-            elif c == '3': self.teacher_view_schedule()
-            elif c == '4': self.teacher_enter_grades()
-            elif c == '5': self.change_password()
+            print("1. Profile | 2. Teaching Course | 3. Teaching Schedule | 4. Enter Grades | 5. PW | 6. Logout | "
+                  "7. Take Attendance")
+            c = _timed_input("Choose: ")
+            if c == '1': self._run_action(self.view_profile)
+            elif c == '2': self._run_action(self.teacher_view_courses)
+            elif c == '3': self._run_action(self.teacher_view_schedule)
+            elif c == '4': self._run_action(self.teacher_enter_grades)
+            elif c == '5': self._run_action(self.change_password)
             elif c == '6':
-                if self.logout(): break
+                if self._run_action(self.logout): break
+            elif c == '7': self._run_action(self.teacher_take_attendance)
 
     def run(self):
         while True:
-            if self.login():
+            if self._run_action(self.login):
                 role = self.current_user['Role'].lower()
                 if role == 'admin': self.admin_menu()
                 elif role == 'student': self.student_menu()
                 elif role == 'teacher': self.teacher_menu()
 
+    # ==========================================
+    # BATCH (NON-INTERACTIVE) COMMANDS
+    # ==========================================
+    def batch_import_users(self, rows):
+        """Insert User + Student/Teacher/Admin rows from CSV dicts in one transaction.
+
+        Columns: AccountID, UserName, PassWord, FullName, Sex, YearOfBirth, Email, Role,
+        RoleID (StudentID/TeacherID/AdminID), Major, InstituteName.
+        Returns the number of users added; raises ValueError (nothing written) on a bad row.
+        """
+        added = 0
+        # Rows may arrive in any order; references are checked once, at commit
+        self._begin_deferred()
+        try:
+            for line_no, row in enumerate(rows, 2):
+                account_id = (row.get('AccountID') or '').strip()
+                username = (row.get('UserName') or '').strip()
+                role = (row.get('Role') or '').strip().lower()
+                role_id = (row.get('RoleID') or '').strip()
+                if not account_id or not username or not role_id:
+                    raise ValueError(f"line {line_no}: AccountID, UserName and RoleID are required")
+                if role not in ('student', 'teacher', 'admin'):
+                    raise ValueError(f"line {line_no}: invalid Role '{role}'")
+                try:
+                    self.cursor.execute("""
+                        INSERT INTO User (AccountID, UserName, PassWord, FullName, Sex, YearOfBirth, Email, Role)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (account_id, username, row.get('PassWord') or "123456", (row.get('FullName') or '').strip(),
+                          row.get('Sex') or "Male", row.get('YearOfBirth') or "2000",
+                          row.get('Email') or f"{username}@uth.edu.vn", role))
+                    if role == 'student':
+                        self.cursor.execute("INSERT INTO Student (StudentID, AccountID, Major) VALUES (?, ?, ?)",
+                                            (role_id, account_id, row.get('Major') or "IT"))
+                    elif role == 'teacher':
+                        self.cursor.execute("INSERT INTO Teacher (TeacherID, AccountID, InstituteName) VALUES (?, ?, ?)",
+                                            (role_id, account_id, row.get('InstituteName') or "Information Technology"))
+                    else:
+                        self.cursor.execute("INSERT INTO Admin (AdminID, AccountID) VALUES (?, ?)",
+                                            (role_id, account_id))
+                except sqlite3.IntegrityError as e:
+                    raise ValueError(f"line {line_no}: {e}")
+                added += 1
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return added
+
+    def batch_enroll(self, pairs, check_prerequisites=True):
+        """Enroll (CourseID, StudentID) pairs in one transaction.
+
+        With check_prerequisites, students missing a (transitive) prerequisite of the
+        course's subject are skipped. Returns (added, skipped) where skipped lists
+        (course_id, student_id, reason).
+        """
+        added, skipped = 0, []
+        known_courses = {}  # CourseID -> (SubjectID, has prerequisites) or None
+        self._begin_deferred()
+        try:
+            for course_id, student_id in pairs:
+                if course_id not in known_courses:
+                    row = self.cursor.execute("""
+                        SELECT c.SubjectID, EXISTS (SELECT 1 FROM PrerequisiteClosure pc WHERE pc.SubjectID = c.SubjectID)
+                        FROM Course c WHERE c.CourseID = ?
+                    """, (course_id,)).fetchone()
+                    known_courses[course_id] = tuple(row) if row else None
+                if not known_courses[course_id]:
+                    skipped.append((course_id, student_id, "course not found"))
+                    continue
+                if not self.cursor.execute("SELECT 1 FROM Student WHERE StudentID = ?", (student_id,)).fetchone():
+                    skipped.append((course_id, student_id, "student not found"))
+                    continue
+                subject_id, has_prerequisites = known_courses[course_id]
+                if check_prerequisites and has_prerequisites:
+                    missing = self.missing_prerequisites(student_id, subject_id)
+                    if missing:
+                        skipped.append((course_id, student_id, f"missing prerequisites: {', '.join(missing)}"))
+                        continue
+                # UNIQUE(CourseID, StudentID) rejects a second registration
+                self.cursor.execute("INSERT OR IGNORE INTO Enrollment (CourseID, StudentID) VALUES (?, ?)",
+                                    (course_id, student_id))
+                if not self.cursor.rowcount:
+                    skipped.append((course_id, student_id, "already registered"))
+                    continue
+                added += 1
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return added, skipped
+
+    def batch_import_grades(self, rows):
+        """Write grades from CSV dicts (CourseID, StudentID, Grade) in one transaction.
+
+        Teachers may only grade their own courses. Returns (updated, skipped).
+        """
+        teacher_id = None
+        if self.current_user['Role'].lower() == 'teacher':
+            teacher_id = self.get_teacher_id()
+            if not teacher_id:
+                raise ValueError("teacher information not found")
+
+        updated, skipped = 0, []
+        allowed_courses = {}
+        try:
+            for line_no, row in enumerate(rows, 2):
+                course_id = (row.get('CourseID') or '').strip()
+                student_id = (row.get('StudentID') or '').strip()
+                try:
+                    grade = float(row.get('Grade'))
+                    if math.isnan(grade):  # SQLite would store it as NULL
+                        raise ValueError
+                except (TypeError, ValueError):
+                    skipped.append((line_no, "invalid grade"))
+                    continue
+                if teacher_id is not None:
+                    if course_id not in allowed_courses:
+                        allowed_courses[course_id] = self.cursor.execute(
+                            "SELECT 1 FROM Course WHERE CourseID = ? AND TeacherID = ?",
+                            (course_id, teacher_id)).fetchone() is not None
+                    if not allowed_courses[course_id]:
+                        skipped.append((line_no, f"course {course_id} is not taught by you"))
+                        continue
+                enrollment = self.cursor.execute(
+                    "SELECT EnrollID, Grade FROM Enrollment WHERE CourseID = ? AND StudentID = ?",
+                    (course_id, student_id)).fetchone()
+                if not enrollment:
+                    skipped.append((line_no, f"{student_id} is not registered in {course_id}"))
+                    continue
+                try:
+                    self.cursor.execute("UPDATE Enrollment SET Grade = ? WHERE EnrollID = ?",
+                                        (grade, enrollment['EnrollID']))
+                except sqlite3.IntegrityError:  # CHECK (Grade BETWEEN 0 AND 10)
+                    skipped.append((line_no, "grade must be from 0 to 10"))
+                    continue
+                self._apply_grade_change(course_id, enrollment['Grade'], grade)
+                updated += 1
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return updated, skipped
+
+    def batch_import_attendance(self, rows, batch_size=ATTENDANCE_BATCH):
+        """Record attendance from CSV dicts (ScheduleID, Date, StudentID, Status).
+
+        Status is P/L/A/E or present/late/absent/excused; Date (YYYY-MM-DD) must fall on the
+        slot's weekday. A mark already recorded for the session is replaced. Rows are written
+        in transactions of batch_size (None: all in one). Teachers may only record their own
+        courses. Returns (recorded, skipped).
+        """
+        teacher_id = None
+        if self.current_user['Role'].lower() == 'teacher':
+            teacher_id = self.get_teacher_id()
+            if not teacher_id:
+                raise ValueError("teacher information not found")
+        codes = {code: code for code in ATTENDANCE_STATUSES}
+        codes.update((name.upper(), code) for code, name in ATTENDANCE_STATUSES.items())
+        today = datetime.now().date()
+        slots = {}  # ScheduleID -> (DayOfWeek, {StudentID: EnrollID}) or the reason it is refused
+        recorded, skipped, pending = 0, [], []
+
+        def flush():
+            # Sorted into key order: each batch lands at the end of the table
+            pending.sort()
+            self.cursor.executemany("""
+                INSERT INTO Attendance (SessionDate, ScheduleID, EnrollID, Status) VALUES (?, ?, ?, ?)
+                ON CONFLICT (SessionDate, ScheduleID, EnrollID) DO UPDATE SET Status = excluded.Status
+                WHERE Status <> excluded.Status
+            """, pending)
+            self.conn.commit()
+            pending.clear()
+
+        try:
+            for line_no, row in enumerate(rows, 2):
+                student_id = (row.get('StudentID') or '').strip()
+                status = codes.get((row.get('Status') or '').strip().upper())
+                if status is None:
+                    skipped.append((line_no, "status must be P, L, A or E"))
+                    continue
+                try:
+                    schedule_id = int(row.get('ScheduleID'))
+                    session_date = datetime.strptime((row.get('Date') or '').strip(), "%Y-%m-%d").date()
+                except (TypeError, ValueError):
+                    skipped.append((line_no, "invalid ScheduleID or Date (YYYY-MM-DD)"))
+                    continue
+                if schedule_id not in slots:
+                    slot = self.cursor.execute("""
+                        SELECT s.DayOfWeek, c.CourseID, c.TeacherID
+                        FROM Schedule s JOIN Course c ON c.CourseID = s.CourseID WHERE s.ScheduleID = ?
+                    """, (schedule_id,)).fetchone()
+                    if slot is None:
+                        slots[schedule_id] = f"schedule {schedule_id} not found"
+                    elif teacher_id is not None and slot['TeacherID'] != teacher_id:
+                        slots[schedule_id] = f"course {slot['CourseID']} is not taught by you"
+                    else:
+                        slots[schedule_id] = (slot['DayOfWeek'], dict(self.cursor.execute(
+                            "SELECT StudentID, EnrollID FROM Enrollment WHERE CourseID = ?", (slot['CourseID'],))))
+                if isinstance(slots[schedule_id], str):
+                    skipped.append((line_no, slots[schedule_id]))
+                    continue
+                day, roster = slots[schedule_id]
+                if session_date.isoweekday() != day or session_date > today:
+                    skipped.append((line_no, f"{session_date} is not a past day-{day} session of schedule {schedule_id}"))
+                    continue
+                if student_id not in roster:
+                    skipped.append((line_no, f"{student_id} is not registered in this course"))
+                    continue
+                pending.append((session_date.isoformat(), schedule_id, roster[student_id], status))
+                recorded += 1
+                if batch_size and len(pending) >= batch_size:
+                    flush()
+            if pending:
+                flush()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return recorded, skipped
+
+    def attendance_rates(self, course_id=None, student_id=None):
+        """Attendance counts and Rate (%) per student of course_id, or per course of student_id"""
+        counts = "a.Sessions, a.Present, a.Late, a.Absent, a.Excused"
+        if course_id is not None:
+            return self.cursor.execute(f"""
+                SELECT e.StudentID, u.FullName, {counts}, {ATTENDANCE_RATE_SQL} AS Rate
+                FROM Enrollment e
+                JOIN Student s ON e.StudentID = s.StudentID
+                JOIN User u ON s.AccountID = u.AccountID
+                LEFT JOIN AttendanceSummary a ON a.EnrollID = e.EnrollID
+                WHERE e.CourseID = ?
+                ORDER BY e.StudentID
+            """, (course_id,)).fetchall()
+        return self.cursor.execute(f"""
+            SELECT e.CourseID, sub.SubjectName, c.Year, c.Semester, {counts}, {ATTENDANCE_RATE_SQL} AS Rate
+            FROM Enrollment e
+            JOIN Course c ON c.CourseID = e.CourseID
+            LEFT JOIN Subject sub ON sub.SubjectID = c.SubjectID
+            LEFT JOIN AttendanceSummary a ON a.EnrollID = e.EnrollID
+            WHERE e.StudentID = ?
+            ORDER BY c.Year DESC, c.Semester DESC, e.CourseID
+        """, (student_id,)).fetchall()
+
+    def course_attendance_rate(self, course_id):
+        """AttendanceCourseSummary row of course_id with its Rate (%), or None before the first roll call"""
+        return self.cursor.execute(f"SELECT a.*, {ATTENDANCE_RATE_SQL} AS Rate FROM AttendanceCourseSummary a "
+                                   f"WHERE a.CourseID = ?", (course_id,)).fetchone()
+
+    def audit_schedules(self):
+        """Find invalid schedule entries and room/teacher clashes within the same term.
+
+        Returns a list of (kind, detail) problems; empty means the timetable is clean.
+        """
+        problems = []
+        slots = []
+        for sch in self.cursor.execute("""
+            SELECT sch.ScheduleID, sch.CourseID, sch.DayOfWeek, sch.Start_Time, sch.End_Time, sch.Room,
+                   c.TeacherID, c.Year, c.Semester
+            FROM Schedule sch
+            JOIN Course c ON sch.CourseID = c.CourseID
+        """):
+            label = f"schedule {sch['ScheduleID']} ({sch['CourseID']})"
+            if sch['DayOfWeek'] not in range(1, 8):
+                problems.append(("invalid_day", f"{label}: day {sch['DayOfWeek']}"))
+                continue
+            if not (self._is_valid_time_format(sch['Start_Time']) and self._is_valid_time_format(sch['End_Time'])):
+                problems.append(("invalid_time", f"{label}: {sch['Start_Time']} - {sch['End_Time']}"))
+                continue
+            if not self._is_end_after_start(sch['Start_Time'], sch['End_Time']):
+                problems.append(("end_before_start", f"{label}: {sch['Start_Time']} - {sch['End_Time']}"))
+                continue
+            slots.append((sch, self._time_to_minutes(sch['Start_Time']), self._time_to_minutes(sch['End_Time'])))
+
+        # Sweep each (term, day, resource) group in start-time order
+        for kind, resource in (("room_clash", 'Room'), ("teacher_clash", 'TeacherID')):
+            groups = {}
+            for slot in slots:
+                sch = slot[0]
+                if sch[resource]:
+                    groups.setdefault((sch['Year'], sch['Semester'], sch['DayOfWeek'], sch[resource]), []).append(slot)
+            for (year, semester, day, value), group in groups.items():
+                group.sort(key=lambda x: x[1])
+                latest = group[0]
+                for slot in group[1:]:
+                    if slot[1] < latest[2]:
+                        problems.append((kind, f"{resource} {value}, {year} Sem{semester} day {day}: "
+                                               f"schedule {latest[0]['ScheduleID']} ({latest[0]['CourseID']}) overlaps "
+                                               f"schedule {slot[0]['ScheduleID']} ({slot[0]['CourseID']})"))
+                    if slot[2] > latest[2]:
+                        latest = slot
+        return problems
+
+
+    def find_orphans(self):
+        """Rows whose foreign key points at a missing parent, one set-based anti-join per reference.
+
+        Returns [(table, column, parent_table, parent_column, count)] for every declared
+        foreign key, including those with no orphans.
+        """
+        results = []
+        for table, column, parent, parent_column in self._foreign_keys():
+            count = self.conn.execute(f"""
+                SELECT COUNT(*) FROM "{table}" c
+                WHERE c."{column}" IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM "{parent}" p WHERE p."{parent_column}" = c."{column}")
+            """).fetchone()[0]
+            results.append((table, column, parent, parent_column, count))
+        return results
+
+    def schema_rejects(self):
+        """[(table, reason, count)] of the rows set aside by the constraint migration"""
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='SchemaRejects'").fetchone():
+            return []
+        return self.conn.execute(
+            "SELECT TableName, Reason, COUNT(*) FROM SchemaRejects GROUP BY TableName, Reason ORDER BY TableName, Reason"
+        ).fetchall()
+
+    def repair_orphans(self):
+        """Delete orphaned rows (or clear optional references, see OPTIONAL_REFERENCES).
+
+        Deleting an orphan can orphan its own children (e.g. a Student's enrollments), so
+        passes repeat until nothing is left; foreign key checks are deferred to the single
+        commit. Returns {(table, column): rows fixed}.
+        """
+        fixed = {}
+        foreign_keys = self._foreign_keys()
+        self._begin_deferred()
+        try:
+            while True:
+                changed = 0
+                for table, column, parent, parent_column in foreign_keys:
+                    missing = (f'"{column}" IS NOT NULL AND NOT EXISTS '
+                               f'(SELECT 1 FROM "{parent}" p WHERE p."{parent_column}" = "{table}"."{column}")')
+                    if (table, column) in OPTIONAL_REFERENCES:
+                        cur = self.conn.execute(f'UPDATE "{table}" SET "{column}" = NULL WHERE {missing}')
+                    else:
+                        cur = self.conn.execute(f'DELETE FROM "{table}" WHERE {missing}')
+                    if cur.rowcount:
+                        fixed[(table, column)] = fixed.get((table, column), 0) + cur.rowcount
+                        changed += cur.rowcount
+                if not changed:
+                    break
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        if any(table == "Enrollment" for table, _ in fixed):
+            self.rebuild_course_grade_stats()
+            self.rebuild_passed_subjects()
+        if any(table == "Prerequisite" for table, _ in fixed):
+            self.rebuild_prerequisite_closure()
+        return fixed
+
+    def teacher_workload(self, term):
+        """Load of every teacher in one (Year, Semester): rows of TeacherID, FullName, Sections,
+        Credits (sum over their sections) and Minutes (weekly contact time), heaviest first"""
+        return self.cursor.execute(f"""
+            WITH taught AS (
+                SELECT c.CourseID, c.TeacherID, COALESCE(sub.Credits, 0) AS Credits
+                FROM Course c LEFT JOIN Subject sub ON sub.SubjectID = c.SubjectID
+                WHERE c.Year = ? AND c.Semester = ? AND c.TeacherID IS NOT NULL
+            ),
+            sections AS (SELECT TeacherID, COUNT(*) AS Sections, SUM(Credits) AS Credits FROM taught GROUP BY TeacherID),
+            contact AS (
+                SELECT c.TeacherID, SUM({SCHEDULE_MINUTES}) AS Minutes
+                FROM taught c JOIN Schedule s ON s.CourseID = c.CourseID
+                GROUP BY c.TeacherID
+            )
+            SELECT t.TeacherID, u.FullName, COALESCE(sc.Sections, 0) AS Sections,
+                   COALESCE(sc.Credits, 0) AS Credits, COALESCE(ct.Minutes, 0) AS Minutes
+            FROM Teacher t
+            LEFT JOIN User u ON u.AccountID = t.AccountID
+            LEFT JOIN sections sc ON sc.TeacherID = t.TeacherID
+            LEFT JOIN contact ct ON ct.TeacherID = t.TeacherID
+            ORDER BY Minutes DESC, Credits DESC, t.TeacherID
+        """, term).fetchall()
+
+    def assign_teachers(self, term, max_hours=None, apply=False):
+        """Propose a teacher for every unassigned course section of term, balancing weekly load.
+
+        Greedy: sections with the most contact time go first, each to the least-loaded teacher
+        (a heap on weekly minutes, then credits) whose timetable has no clash with it and who
+        stays within max_hours. With apply, all proposals are written in one transaction.
+        Returns (proposals [(CourseID, TeacherID)], CourseIDs left without a teacher).
+        """
+        load = [(r['Minutes'], r['Credits'], r['TeacherID']) for r in self.teacher_workload(term)]
+        heapq.heapify(load)
+        busy = {}  # (TeacherID, DayOfWeek) -> [(start, end)] in minutes
+        sections = {}  # unassigned CourseID -> [credits, minutes, [(day, start, end)]]
+        for r in self.cursor.execute("""
+            SELECT c.CourseID, c.TeacherID, COALESCE(sub.Credits, 0) AS Credits, s.DayOfWeek, s.Start_Time, s.End_Time
+            FROM Course c
+            LEFT JOIN Subject sub ON sub.SubjectID = c.SubjectID
+            LEFT JOIN Schedule s ON s.CourseID = c.CourseID
+            WHERE c.Year = ? AND c.Semester = ?
+        """, term):
+            if r['TeacherID'] is None:
+                section = sections.setdefault(r['CourseID'], [r['Credits'], 0, []])
+            if r['DayOfWeek'] is None or not (self._is_valid_time_format(r['Start_Time'])
+                                              and self._is_valid_time_format(r['End_Time'])):
+                continue
+            start, end = self._time_to_minutes(r['Start_Time']), self._time_to_minutes(r['End_Time'])
+            if r['TeacherID'] is None:
+                section[1] += max(end - start, 0)
+                section[2].append((r['DayOfWeek'], start, end))
+            else:
+                busy.setdefault((r['TeacherID'], r['DayOfWeek']), []).append((start, end))
+
+        cap = max_hours * 60 if max_hours is not None else None
+        proposals, left = [], []
+        for course_id, (credits, minutes, slots) in sorted(sections.items(), key=lambda x: (-x[1][1], x[0])):
+            passed_over, chosen = [], None
+            while load:
+                entry = heapq.heappop(load)
+                if cap is not None and entry[0] + minutes > cap:
+                    passed_over.append(entry)
+                    break  # the least-loaded teacher is already too busy, so is everyone else
+                if any(s < e2 and s2 < e for day, s, e in slots for s2, e2 in busy.get((entry[2], day), ())):
+                    passed_over.append(entry)
+                    continue
+                chosen = entry
+                break
+            for entry in passed_over:
+                heapq.heappush(load, entry)
+            if chosen is None:
+                left.append(course_id)
+                continue
+            teacher_id = chosen[2]
+            for day, s, e in slots:
+                busy.setdefault((teacher_id, day), []).append((s, e))
+            heapq.heappush(load, (chosen[0] + minutes, chosen[1] + credits, teacher_id))
+            proposals.append((course_id, teacher_id))
+
+        if apply and proposals:
+            try:
+                self.cursor.executemany("UPDATE Course SET TeacherID = ? WHERE CourseID = ? AND TeacherID IS NULL",
+                                        [(t, c) for c, t in proposals])
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+        return proposals, left
+
+    def add_prerequisite(self, subject_id, required_id):
+        """Make required_id a prerequisite of subject_id and extend PrerequisiteClosure to match.
+
+        Raises ValueError for an unknown subject or an edge that would close a cycle. Returns
+        False if the edge already existed.
+        """
+        for sid in (subject_id, required_id):
+            if not self.catalog.subject(sid):
+                raise ValueError(f"subject {sid} not found")
+        self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")  # no other writer between the cycle check and the insert
+        try:
+            if subject_id == required_id:
+                raise ValueError(f"a subject cannot be its own prerequisite ({subject_id})")
+            if self.conn.execute(
+                    "SELECT 1 FROM PrerequisiteClosure WHERE SubjectID = ? AND RequiredID = ?",
+                    (required_id, subject_id)).fetchone():
+                raise ValueError(f"{required_id} already requires {subject_id}; the prerequisite would form a cycle")
+            added = self.conn.execute("INSERT OR IGNORE INTO Prerequisite (SubjectID, RequiredID) VALUES (?, ?)",
+                                      (subject_id, required_id)).rowcount
+            if added:
+                # subject_id and everything that needs it now need required_id and everything it needs
+                self.conn.execute("""
+                    INSERT OR IGNORE INTO PrerequisiteClosure (SubjectID, RequiredID)
+                    SELECT a.SubjectID, d.RequiredID
+                    FROM (SELECT ? AS SubjectID UNION SELECT SubjectID FROM PrerequisiteClosure WHERE RequiredID = ?) a,
+                         (SELECT ? AS RequiredID UNION SELECT RequiredID FROM PrerequisiteClosure WHERE SubjectID = ?) d
+                """, (subject_id, subject_id, required_id, required_id))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return bool(added)
+
+    def remove_prerequisite(self, subject_id, required_id):
+        """Drop one prerequisite edge; returns False if there was none"""
+        removed = self.cursor.execute("DELETE FROM Prerequisite WHERE SubjectID = ? AND RequiredID = ?",
+                                      (subject_id, required_id)).rowcount
+        if removed:
+            # Another path may still connect the pair, so the closure is derived again (same transaction)
+            self.rebuild_prerequisite_closure()
+        else:
+            self.conn.commit()
+        return bool(removed)
+
+    def missing_prerequisites(self, student_id, subject_id):
+        """Subjects that subject_id requires, directly or not, and the student has not passed"""
+        return [r[0] for r in self.conn.execute("""
+            SELECT pc.RequiredID FROM PrerequisiteClosure pc
+            WHERE pc.SubjectID = ?
+              AND NOT EXISTS (SELECT 1 FROM PassedSubject p WHERE p.StudentID = ? AND p.SubjectID = pc.RequiredID)
+            ORDER BY pc.RequiredID
+        """, (subject_id, student_id))]
+
+    def rollover_term(self, source, target, keep_teachers=True, prefix=None, force=False):
+        """Copy every course section of the source (Year, Semester) and its schedule into target.
+
+        New CourseIDs are prefix + a 5-digit number continuing after the prefix's highest one
+        (default prefix: C<yy><semester>-, as the generator names sections). One transaction of
+        set-based INSERT ... SELECTs through a temporary old -> new CourseID map. Without force,
+        a target term that already has sections is refused. Returns (courses, schedules) copied.
+        """
+        (from_year, from_semester), (to_year, to_semester) = source, target
+        if source == target:
+            raise ValueError("source and target term are the same")
+        if not self.conn.execute("SELECT 1 FROM Course WHERE Year = ? AND Semester = ? LIMIT 1", source).fetchone():
+            raise ValueError(f"no course sections in {from_year} semester {from_semester}")
+        existing = self.conn.execute("SELECT COUNT(*) FROM Course WHERE Year = ? AND Semester = ?", target).fetchone()[0]
+        if existing and not force:
+            raise ValueError(f"{to_year} semester {to_semester} already has {existing} course section(s) (use --force to add more)")
+        if prefix is None:
+            prefix = f"C{to_year % 100:02d}{to_semester}-"
+        last = self.conn.execute(
+            "SELECT MAX(CAST(substr(CourseID, ?) AS INTEGER)) FROM Course WHERE substr(CourseID, 1, ?) = ?",
+            (len(prefix) + 1, len(prefix), prefix)
+        ).fetchone()[0] or 0
+
+        self.conn.commit()
+        self.conn.execute("DROP TABLE IF EXISTS temp.RolloverMap")
+        self.conn.execute("CREATE TEMP TABLE RolloverMap (OldID TEXT PRIMARY KEY, NewID TEXT NOT NULL UNIQUE) WITHOUT ROWID")
+        try:
+            self.conn.execute("""
+                INSERT INTO temp.RolloverMap (OldID, NewID)
+                SELECT CourseID, ? || printf('%05d', ? + row_number() OVER (ORDER BY CourseID))
+                FROM Course WHERE Year = ? AND Semester = ?
+            """, (prefix, last, from_year, from_semester))
+            courses = self.conn.execute("""
+                INSERT INTO Course (CourseID, SubjectID, TeacherID, ClassName, Year, Semester, ClassSize, Description)
+                SELECT m.NewID, c.SubjectID, CASE WHEN ? THEN c.TeacherID END, c.ClassName, ?, ?, c.ClassSize, c.Description
+                FROM temp.RolloverMap m JOIN Course c ON c.CourseID = m.OldID
+                ORDER BY m.NewID
+            """, (keep_teachers, to_year, to_semester)).rowcount
+            schedules = self.conn.execute("""
+                INSERT INTO Schedule (CourseID, DayOfWeek, Start_Time, End_Time, Room)
+                SELECT m.NewID, s.DayOfWeek, s.Start_Time, s.End_Time, s.Room
+                FROM temp.RolloverMap m JOIN Schedule s ON s.CourseID = m.OldID
+                ORDER BY m.NewID, s.ScheduleID
+            """).rowcount
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.execute("DROP TABLE IF EXISTS temp.RolloverMap")
+        return courses, schedules
+
+    def archive_path(self, year, archive_dir=None):
+        """Archive file of one Year: <db name>-archive-<year>.db next to the database by default"""
+        stem = os.path.splitext(os.path.basename(self.db_name))[0]
+        return os.path.join(archive_dir or os.path.dirname(os.path.abspath(self.db_name)), f"{stem}-archive-{year}.db")
+
+    def archived_years(self):
+        """ArchiveYear rows (Year, Path, Courses, Enrollments, ArchivedAt), oldest year first;
+        Path is absolute"""
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='ArchiveYear'").fetchone():
+            return []
+        base = os.path.dirname(os.path.abspath(self.db_name))
+        return [dict(r, Path=os.path.join(base, r['Path']))
+                for r in self.conn.execute("SELECT Year, Path, Courses, Enrollments, ArchivedAt FROM ArchiveYear ORDER BY Year")]
+
+    def archive_year(self, year, archive_dir=None, force=False):
+        """Move one closed Year's courses, schedules and enrollments into its archive file.
+
+        Closed means older than the year of the current term; without force, every
+        enrollment must have a grade (archived rows can no longer be graded). Copy and
+        delete run in one transaction over the attached archive; run again for the same
+        year, it moves whatever was added since. Returns {table: rows moved}.
+        """
+        term = self.catalog.current_term()
+        if term is None or year >= term[0]:
+            raise ValueError(f"{year} is not a closed year (current term: {term[0] if term else 'none'})")
+        courses = self.conn.execute("SELECT COUNT(*) FROM Course WHERE Year = ?", (year,)).fetchone()[0]
+        if not courses:
+            raise ValueError(f"no course sections left in {year}")
+        if not force:
+            ungraded = self.conn.execute(f"SELECT COUNT(*) FROM Enrollment WHERE Grade IS NULL "
+                                         f"AND {ARCHIVED_TABLES['Enrollment']}", (year,)).fetchone()[0]
+            if ungraded:
+                raise ValueError(f"{ungraded} enrollment(s) of {year} have no grade yet (use --force to archive anyway)")
+
+        path = self.archive_path(year, archive_dir)
+        base = os.path.dirname(os.path.abspath(self.db_name))
+        self.conn.commit()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ArchiveYear (
+                Year INTEGER PRIMARY KEY,
+                Path TEXT NOT NULL,
+                Courses INTEGER,
+                Enrollments INTEGER,
+                ArchivedAt TEXT
+            )
+        """)
+        self.conn.execute("ATTACH DATABASE ? AS archive", (path,))
+        moved = {}
+        try:
+            for table in ARCHIVED_TABLES:
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} {_archive_definition(table)}")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_enrollment_student ON Enrollment(StudentID, CourseID)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_schedule_course ON Schedule(CourseID)")
+            # Enrollment goes before Course; ON DELETE CASCADE takes the derived CourseGradeStats rows
+            self._begin_deferred()
+            for table, where in ARCHIVED_TABLES.items():
+                columns = ", ".join(r['name'] for r in self.conn.execute(f"PRAGMA main.table_info({table})"))
+                moved[table] = self.conn.execute(f"INSERT OR REPLACE INTO archive.{table} ({columns}) "
+                                                 f"SELECT {columns} FROM main.{table} WHERE {where}", (year,)).rowcount
+            for table, where in reversed(ARCHIVED_TABLES.items()):
+                self.conn.execute(f"DELETE FROM main.{table} WHERE {where}", (year,))
+            self.conn.execute("""
+                INSERT OR REPLACE INTO ArchiveYear (Year, Path, Courses, Enrollments, ArchivedAt)
+                VALUES (?, ?, (SELECT COUNT(*) FROM archive.Course), (SELECT COUNT(*) FROM archive.Enrollment),
+                        datetime('now'))
+            """, (year, os.path.relpath(path, base) if os.path.dirname(path) == base else path))
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.execute("DETACH DATABASE archive")
+        return moved
+
+    def union_archives(self, select_sql, params=()):
+        """Rows of select_sql from the hot database followed by every archive file.
+
+        select_sql names the archived tables as {db}.Course, {db}.Schedule, {db}.Enrollment
+        (and anything else as main.<table>); it is UNION ALLed once per database, attaching
+        the archives ARCHIVE_ATTACH_BATCH at a time. No ORDER BY: callers sort.
+        """
+        archives = self.archived_years()
+        rows = []
+        for start in range(0, len(archives) or 1, ARCHIVE_ATTACH_BATCH):
+            attached = []
+            try:
+                for archive in archives[start:start + ARCHIVE_ATTACH_BATCH]:
+                    if not os.path.exists(archive['Path']):  # ATTACH would quietly create an empty file
+                        raise FileNotFoundError(f"archive of {archive['Year']} not found: {archive['Path']}")
+                    name = f"archive_{archive['Year']}"
+                    self.conn.execute(f"ATTACH DATABASE ? AS {name}", (archive['Path'],))
+                    attached.append(name)
+                schemas = (["main"] if start == 0 else []) + attached
+                sql = " UNION ALL ".join(select_sql.format(db=schema) for schema in schemas)
+                rows += self.cursor.execute(sql, tuple(params) * len(schemas)).fetchall()
+            finally:
+                for name in attached:
+                    self.conn.execute(f"DETACH DATABASE {name}")
+        return rows
+
+    def _begin_deferred(self):
+        """Start a transaction whose foreign key checks run at COMMIT instead of per statement.
+
+        SQLite clears defer_foreign_keys at the end of every transaction, including the implicit
+        one around a lone SELECT, so it is set only after BEGIN.
+        """
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.conn.execute("BEGIN")
+        self.conn.execute("PRAGMA defer_foreign_keys = ON")
+
+    def _foreign_keys(self):
+        """(table, column, parent_table, parent_column) for every single-column foreign key"""
+        keys = []
+        tables = [r[0] for r in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        for table in tables:
+            for fk in self.conn.execute(f'PRAGMA foreign_key_list("{table}")'):
+                parent_column = fk['to']
+                if parent_column is None:  # REFERENCES Parent: its primary key
+                    parent_column = next(r['name'] for r in self.conn.execute(f'PRAGMA table_info("{fk["table"]}")')
+                                         if r['pk'] == 1)
+                keys.append((table, fk['from'], fk['table'], parent_column))
+        return keys
+
+
+# Methods reported as the caller of a traced statement (menus and the login loop say nothing useful)
+_TRACED_METHODS = {name for name in vars(StudentManagementSystem)
+                   if not name.startswith("__") and name != "run" and not name.endswith("_menu")}
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+def _term(value):
+    """argparse type for YEAR-SEMESTER, e.g. 2025-2"""
+    try:
+        year, semester = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YEAR-SEMESTER (e.g. 2025-2), got '{value}'")
+    if semester not in (1, 2):
+        raise argparse.ArgumentTypeError("semester can only be 1 or 2")
+    return year, semester
+
+
+def _write_report(report_lines, rows, fmt, out):
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(["metric", "value"])
+        writer.writerows(rows)
+    elif fmt == 'json':
+        json.dump(dict(rows), out, indent=2)
+        out.write("\n")
+    else:
+        out.write("\n".join(report_lines) + "\n")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="sms",
+        description="UTH Student Management System. Without a command, starts the interactive menus.")
+    parser.add_argument("--db", default=os.environ.get("SMS_DB", "management_system.db"),
+                        help="SQLite database file (env SMS_DB)")
+    parser.add_argument("--user", default=os.environ.get("SMS_USER"), help="username (env SMS_USER)")
+    parser.add_argument("--password", default=os.environ.get("SMS_PASSWORD"), help="password (env SMS_PASSWORD)")
+    parser.add_argument("--slow-query-ms", type=float, default=os.environ.get("SMS_SLOW_QUERY_MS"),
+                        help="trace statements and log those slower than this (env SMS_SLOW_QUERY_MS)")
+    parser.add_argument("--slow-query-log", default=os.environ.get("SMS_SLOW_QUERY_LOG", SLOW_QUERY_LOG),
+                        help=f"slow-query log file (default {SLOW_QUERY_LOG}, env SMS_SLOW_QUERY_LOG)")
+    parser.add_argument("--latency-log", default=os.environ.get("SMS_LATENCY_LOG"),
+                        help="append the per-use-case latency report here on logout (env SMS_LATENCY_LOG)")
+    parser.add_argument("--latency-slo", metavar="FILE",
+                        help='JSON file of p95 objectives in ms, e.g. {"student_view_schedule": 200}')
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve use-case latency in Prometheus text format on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="write a cProfile .pstats file per menu action to DIR")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="with --profile, also write tracemalloc top-allocation reports (slower)")
+    parser.add_argument("--no-prefetch", action="store_true",
+                        help="do not load the likely next screen's data in the background")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    users = commands.add_parser("users", help="user accounts")
+    users_commands = users.add_subparsers(dest="action", metavar="action", required=True)
+    users_import = users_commands.add_parser("import", help="import users from a CSV file")
+    users_import.add_argument("file")
+
+    enroll = commands.add_parser("enroll", help="add students to a course section")
+    enroll.add_argument("--course", help="CourseID for the STUDENT arguments")
+    enroll.add_argument("students", nargs="*", metavar="STUDENT")
+    enroll.add_argument("--file", help="CSV file with CourseID,StudentID columns")
+    enroll.add_argument("--ignore-prerequisites", action="store_true", help="enroll even without the prerequisites")
+
+    grades = commands.add_parser("grades", help="grades")
+    grades_commands = grades.add_subparsers(dest="action", metavar="action", required=True)
+    grades_import = grades_commands.add_parser("import", help="import grades from a CSV file (CourseID,StudentID,Grade)")
+    grades_import.add_argument("file")
+
+    attendance = commands.add_parser("attendance", help="class attendance")
+    attendance_commands = attendance.add_subparsers(dest="action", metavar="action", required=True)
+    attendance_import = attendance_commands.add_parser(
+        "import", help="record attendance from a CSV file (ScheduleID,Date,StudentID,Status)")
+    attendance_import.add_argument("file")
+    attendance_import.add_argument("--batch-size", type=int, default=ATTENDANCE_BATCH,
+                                   help=f"rows per transaction (default {ATTENDANCE_BATCH})")
+    attendance_report = attendance_commands.add_parser("report", help="attendance rates of a course or a student")
+    attendance_of = attendance_report.add_mutually_exclusive_group(required=True)
+    attendance_of.add_argument("--course", help="one row per student of the course")
+    attendance_of.add_argument("--student", help="one row per course of the student")
+
+    report = commands.add_parser("report", help="print a statistical report")
+    report.add_argument("--type", required=True, choices=["1", "2", "3", "4", "5"])
+    report.add_argument("--format", default="txt", choices=["txt", "csv", "json"])
+    report.add_argument("--output", help="write to this file instead of stdout")
+
+    schedule = commands.add_parser("schedule", help="class schedules")
+    schedule_commands = schedule.add_subparsers(dest="action", metavar="action", required=True)
+    schedule_commands.add_parser("audit", help="report invalid entries and room/teacher clashes")
+
+    db = commands.add_parser("db", help="database maintenance")
+    db_commands = db.add_subparsers(dest="action", metavar="action", required=True)
+    db_check = db_commands.add_parser("check", help="report rows whose foreign keys point at missing rows")
+    db_check.add_argument("--repair", action="store_true", help="delete the orphaned rows (clear optional references)")
+
+    prereq = commands.add_parser("prereq", help="subject prerequisites")
+    prereq_commands = prereq.add_subparsers(dest="action", metavar="action", required=True)
+    for action, text in (("add", "make REQUIRED a prerequisite of SUBJECT"), ("remove", "drop that prerequisite")):
+        sub = prereq_commands.add_parser(action, help=text)
+        sub.add_argument("subject", metavar="SUBJECT")
+        sub.add_argument("required", metavar="REQUIRED")
+    prereq_list = prereq_commands.add_parser("list", help="direct and indirect prerequisites")
+    prereq_list.add_argument("subject", nargs="?", metavar="SUBJECT", help="only this subject")
+    prereq_check = prereq_commands.add_parser("check", help="prerequisites of SUBJECT that STUDENT has not passed")
+    prereq_check.add_argument("student", metavar="STUDENT")
+    prereq_check.add_argument("subject", metavar="SUBJECT")
+
+    curriculum = commands.add_parser("curriculum", help="degree requirements per Major")
+    curriculum_commands = curriculum.add_subparsers(dest="action", metavar="action", required=True)
+    curriculum_import = curriculum_commands.add_parser(
+        "import", help="replace curricula from a CSV file (Major,Kind,Group,Credits,SubjectID)")
+    curriculum_import.add_argument("file")
+
+    audit = commands.add_parser("audit", help="degree audit against the curricula")
+    audit_commands = audit.add_subparsers(dest="action", metavar="action", required=True)
+    audit_run = audit_commands.add_parser("run", help="audit every student into table DegreeAudit")
+    audit_run.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    audit_run.add_argument("--chunk-size", type=int, default=2000, help="students per worker task")
+    audit_student = audit_commands.add_parser("student", help="audit one student")
+    audit_student.add_argument("student", metavar="STUDENT")
+
+    workload = commands.add_parser("workload", help="teacher workload and teaching assignments")
+    workload_commands = workload.add_subparsers(dest="action", metavar="action", required=True)
+    workload_report = workload_commands.add_parser("report", help="sections, credits and weekly hours per teacher")
+    workload_assign = workload_commands.add_parser("assign", help="propose teachers for unassigned sections")
+    for sub in (workload_report, workload_assign):
+        sub.add_argument("--term", type=_term, metavar="YEAR-SEM", help="default: the current term")
+    workload_report.add_argument("--format", default="txt", choices=["txt", "csv"])
+    workload_assign.add_argument("--max-hours", type=float, help="weekly contact hours no teacher may exceed")
+    workload_assign.add_argument("--apply", action="store_true", help="write the proposals (default: only show them)")
+
+    exams = commands.add_parser("exams", help="clash-free exam timetable")
+    exams_commands = exams.add_subparsers(dest="action", metavar="action", required=True)
+    exams_plan = exams_commands.add_parser("plan", help="assign every section's exam a slot and room")
+    exams_list = exams_commands.add_parser("list", help="show the stored exam timetable")
+    for sub in (exams_plan, exams_list):
+        sub.add_argument("--term", type=_term, metavar="YEAR-SEM", help="default: the current term")
+    exams_plan.add_argument("--slots-per-day", type=int, default=3, help="exam periods per day (default 3)")
+
+    term = commands.add_parser("term", help="academic terms")
+    term_commands = term.add_subparsers(dest="action", metavar="action", required=True)
+    term_rollover = term_commands.add_parser("rollover", help="copy all course sections and schedules into the next term")
+    term_rollover.add_argument("--from", dest="source", type=_term, required=True, metavar="YEAR-SEM", help="e.g. 2025-2")
+    term_rollover.add_argument("--to", dest="target", type=_term, required=True, metavar="YEAR-SEM", help="e.g. 2026-1")
+    term_rollover.add_argument("--clear-teachers", action="store_true", help="leave the new sections without a teacher")
+    term_rollover.add_argument("--prefix", help="CourseID prefix of the new sections (default C<yy><sem>-)")
+    term_rollover.add_argument("--force", action="store_true", help="add sections even if the target term has some")
+
+    archive = commands.add_parser("archive", help="move closed academic years into per-year archive files")
+    archive_commands = archive.add_subparsers(dest="action", metavar="action", required=True)
+    archive_run = archive_commands.add_parser("run", help="archive the courses, schedules and enrollments of YEAR")
+    archive_run.add_argument("--year", type=int, required=True)
+    archive_run.add_argument("--dir", help="directory of the archive files (default: next to the database)")
+    archive_run.add_argument("--force", action="store_true", help="archive even if some enrollments have no grade")
+    archive_commands.add_parser("list", help="list the archived years")
+
+    transcript = commands.add_parser("transcript", help="a student's courses and grades of every year, archives included")
+    transcript.add_argument("student", nargs="?", help="StudentID (students get their own)")
+    transcript.add_argument("--format", default="txt", choices=["txt", "csv", "json"])
+
+    backup = commands.add_parser("backup", help="online backups of the database")
+    backup_commands = backup.add_subparsers(dest="action", metavar="action", required=True)
+    backup_create = backup_commands.add_parser("create", help="copy the live database, verify it and rotate old copies")
+    backup_list = backup_commands.add_parser("list", help="list the kept backups, newest first")
+    for sub in (backup_create, backup_list):
+        sub.add_argument("--dir", default=os.environ.get("SMS_BACKUP_DIR"),
+                         help="backup directory (default: backups/ next to the database, env SMS_BACKUP_DIR)")
+    backup_create.add_argument("--keep", type=int, default=7, help="generations to keep")
+    backup_create.add_argument("--pages", type=int, default=256, help="pages copied per step")
+    backup_create.add_argument("--sleep", type=float, default=0.02, help="seconds to pause between steps")
+    backup_create.add_argument("--quick", action="store_true", help="verify with quick_check instead of integrity_check")
+
+    serve = commands.add_parser("serve", help="run the local HTTP/JSON API server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--workers", type=int, default=8, help="pooled connections (requests served at once)")
+    serve.add_argument("--quiet", action="store_true", help="no access log")
+
+    serve_async = commands.add_parser("serve-async", help="run the asyncio API for many idle kiosk/portal connections")
+    serve_async.add_argument("--host", default="127.0.0.1")
+    serve_async.add_argument("--port", type=int, default=8081)
+    serve_async.add_argument("--workers", type=int, default=8, help="database threads (one connection each)")
+    serve_async.add_argument("--idle-timeout", type=float, default=60, help="seconds before an idle connection is closed")
+    serve_async.add_argument("--quiet", action="store_true", help="no access log")
+    return parser
+
+
+# Roles allowed to run each batch command
+BATCH_ROLES = {
+    "users": ("admin",),
+    "enroll": ("admin",),
+    "grades": ("admin", "teacher"),
+    "attendance": ("admin", "teacher"),
+    "report": ("admin",),
+    "schedule": ("admin",),
+    "db": ("admin",),
+    "prereq": ("admin",),
+    "curriculum": ("admin",),
+    "audit": ("admin",),
+    "workload": ("admin",),
+    "exams": ("admin",),
+    "term": ("admin",),
+    "archive": ("admin",),
+    "transcript": ("admin", "student"),
+    "backup": ("admin",),
+}
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    latency = LatencyRecorder()
+    if args.latency_slo:
+        try:
+            with open(args.latency_slo, encoding="utf-8") as f:
+                latency.slos.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"[Error]: Cannot read SLO file: {e}", file=sys.stderr)
+            return 1
+    if args.command == "serve":
+        # Imported lazily: http.server alone costs more than a batch command
+        import api_server
+        return api_server.serve_api(args, StudentManagementSystem, latency)
+    if args.command == "serve-async":
+        import async_server
+        return async_server.serve_async(args, StudentManagementSystem)
+    app = StudentManagementSystem(args.db)
+    if args.slow_query_ms is not None:
+        app.enable_query_trace(args.slow_query_ms, args.slow_query_log)
+    app.latency = latency
+    app.latency_log = args.latency_log
+    if args.profile:
+        app.profiler = ActionProfiler(args.profile, trace_memory=args.profile_memory)
+    if args.metrics_port is not None:
+        import api_server
+        api_server.start_metrics_server(latency, args.metrics_port)
+    if args.command is None:
+        if not args.no_prefetch:
+            app.prefetcher = Prefetcher(args.db)
+        app.enable_timetable_refresh()
+        app.run()
+        return 0
+
+    password = args.password
+    if args.user and password is None and sys.stdin.isatty():
+        password = getpass.getpass("Password: ")
+    user = app.authenticate(args.user, password) if args.user else None
+    if not user:
+        print("[Error]: Authentication failed (use --user/--password or SMS_USER/SMS_PASSWORD)", file=sys.stderr)
+        return 2
+    if user['Role'].lower() not in BATCH_ROLES[args.command]:
+        print(f"[Error]: Role '{user['Role']}' is not allowed to run '{args.command}'", file=sys.stderr)
+        return 2
+    app.current_user = user
+    if args.command == "backup":
+        import backup
+        return backup.run_backup_command(args)
+    if args.command == "exams":
+        import exam_timetable
+        try:
+            return exam_timetable.run_exams_command(app, args)
+        except sqlite3.Error as e:
+            print(f"[Error]: {e}", file=sys.stderr)
+            return 1
+    if args.command in ("audit", "curriculum"):
+        import degree_audit
+        try:
+            return degree_audit.run_audit_command(app, args)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"[Error]: {e}", file=sys.stderr)
+            return 1
+
+    try:
+        if args.command == "users":
+            added = app.batch_import_users(_read_csv(args.file))
+            print(f"[Success]: Imported {added} users.")
+
+        elif args.command == "enroll":
+            if args.students and not args.course:
+                print("[Error]: --course is required when StudentIDs are given", file=sys.stderr)
+                return 2
+            pairs = [(args.course, student_id) for student_id in args.students]
+            if args.file:
+                pairs += [((r.get('CourseID') or '').strip(), (r.get('StudentID') or '').strip())
+                          for r in _read_csv(args.file)]
+            added, skipped = app.batch_enroll(pairs, check_prerequisites=not args.ignore_prerequisites)
+            for course_id, student_id, reason in skipped:
+                print(f"[Skipped]: {student_id} -> {course_id}: {reason}", file=sys.stderr)
+            print(f"[Success]: Added {added} enrollments, skipped {len(skipped)}.")
+
+        elif args.command == "grades":
+            updated, skipped = app.batch_import_grades(_read_csv(args.file))
+            for line_no, reason in skipped:
+                print(f"[Skipped]: line {line_no}: {reason}", file=sys.stderr)
+            print(f"[Success]: Updated {updated} grades, skipped {len(skipped)}.")
+
+        elif args.command == "attendance" and args.action == "import":
+            if args.batch_size < 1:
+                raise ValueError("--batch-size must be at least 1")
+            with open(args.file, newline="", encoding="utf-8-sig") as f:
+                recorded, skipped = app.batch_import_attendance(csv.DictReader(f), args.batch_size)
+            for line_no, reason in skipped:
+                print(f"[Skipped]: line {line_no}: {reason}", file=sys.stderr)
+            print(f"[Success]: Recorded {recorded} attendance marks, skipped {len(skipped)}.")
+
+        elif args.command == "attendance":
+            if args.course:
+                owner = app.cursor.execute("SELECT TeacherID FROM Course WHERE CourseID = ?", (args.course,)).fetchone()
+                if owner is None:
+                    raise ValueError(f"course {args.course} not found")
+                if user['Role'].lower() == 'teacher' and owner['TeacherID'] != app.get_teacher_id():
+                    raise ValueError(f"course {args.course} is not taught by you")
+                print(f"ATTENDANCE {args.course}")
+                first = [("StudentID", 'StudentID', 11), ("Full Name", 'FullName', 25)]
+            else:
+                print(f"ATTENDANCE {args.student}")
+                first = [("CourseID", 'CourseID', 11), ("Subject", 'SubjectName', 25)]
+            app.render_table(first + [
+                ("Sessions", lambda r: r['Sessions'] or 0, 8),
+                ("Present", lambda r: r['Present'] or 0, 7),
+                ("Late", lambda r: r['Late'] or 0, 4),
+                ("Absent", lambda r: r['Absent'] or 0, 6),
+                ("Excused", lambda r: r['Excused'] or 0, 7),
+                ("Rate %", lambda r: '-' if r['Rate'] is None else r['Rate'], 6),
+            ], app.attendance_rates(course_id=args.course, student_id=args.student),
+                empty_message="No enrollments found.")
+            if args.course:
+                summary = app.course_attendance_rate(args.course)
+                if summary and summary['Rate'] is not None:
+                    print(f"[Completed]: Course attendance rate {summary['Rate']}% over {summary['Sessions']} student-sessions.")
+
+        elif args.command == "report":
+            report_lines, rows = app.build_report(args.type)
+            if args.output:
+                with open(args.output, "w", newline="", encoding="utf-8") as out:
+                    _write_report(report_lines, rows, args.format, out)
+                print(f"[Success]: Report saved to file: {args.output}")
+            else:
+                _write_report(report_lines, rows, args.format, sys.stdout)
+
+        elif args.command == "schedule":
+            problems = app.audit_schedules()
+            for kind, detail in problems:
+                print(f"{kind}: {detail}")
+            print(f"[Completed]: {len(problems)} problem(s) found.")
+            return 1 if problems else 0
+
+        elif args.command == "db":
+            if args.repair:
+                for (table, column), count in app.repair_orphans().items():
+                    print(f"[Repaired]: {table}.{column}: {count} row(s)")
+            orphans = [o for o in app.find_orphans() if o[4]]
+            for table, column, parent, parent_column, count in orphans:
+                print(f"orphan: {table}.{column} -> {parent}.{parent_column}: {count} row(s)")
+            for table, reason, count in app.schema_rejects():
+                print(f"[Notification]: {count} {table} row(s) set aside by the schema upgrade ({reason}), "
+                      f"see table SchemaRejects")
+            print(f"[Completed]: {sum(o[4] for o in orphans)} orphaned row(s) found.")
+            return 1 if orphans else 0
+
+        elif args.command == "prereq":
+            if args.action == "add":
+                if app.add_prerequisite(args.subject, args.required):
+                    print(f"[Success]: {args.required} is now a prerequisite of {args.subject}.")
+                else:
+                    print(f"[Notification]: {args.required} was already a prerequisite of {args.subject}.")
+            elif args.action == "remove":
+                if not app.remove_prerequisite(args.subject, args.required):
+                    print(f"[Error]: {args.required} is not a prerequisite of {args.subject}", file=sys.stderr)
+                    return 1
+                print(f"[Success]: {args.required} is no longer a prerequisite of {args.subject}.")
+            elif args.action == "check":
+                missing = app.missing_prerequisites(args.student, args.subject)
+                for subject_id in missing:
+                    print(f"missing: {subject_id}")
+                print(f"[Completed]: {args.student} is {'not ' if missing else ''}eligible for {args.subject}.")
+                return 1 if missing else 0
+            else:
+                rows = app.conn.execute("""
+                    SELECT pc.SubjectID, pc.RequiredID, p.SubjectID IS NOT NULL AS Direct
+                    FROM PrerequisiteClosure pc
+                    LEFT JOIN Prerequisite p ON p.SubjectID = pc.SubjectID AND p.RequiredID = pc.RequiredID
+                    WHERE ? IS NULL OR pc.SubjectID = ?
+                    ORDER BY pc.SubjectID, Direct DESC, pc.RequiredID
+                """, (args.subject, args.subject)).fetchall()
+                for r in rows:
+                    print(f"{r['SubjectID']} requires {r['RequiredID']}{'' if r['Direct'] else ' (indirect)'}")
+                print(f"[Completed]: {len(rows)} prerequisite(s).")
+
+        elif args.command == "workload":
+            term = args.term or app.catalog.current_term()
+            if term is None:
+                print("[Error]: No course sections yet", file=sys.stderr)
+                return 1
+            if args.action == "report":
+                rows = app.teacher_workload(term)
+                if args.format == 'csv':
+                    writer = csv.writer(sys.stdout)
+                    writer.writerow(["TeacherID", "FullName", "Sections", "Credits", "WeeklyHours"])
+                    writer.writerows((r['TeacherID'], r['FullName'], r['Sections'], r['Credits'],
+                                      round(r['Minutes'] / 60, 2)) for r in rows)
+                else:
+                    print(f"TEACHER WORKLOAD {term[0]} semester {term[1]}")
+                    app.render_table([
+                        ("TeacherID", 'TeacherID', 10),
+                        ("Name", 'FullName', 25),
+                        ("Sections", 'Sections', 8),
+                        ("Credits", 'Credits', 7),
+                        ("Hours/week", lambda r: f"{r['Minutes'] / 60:.1f}", 10),
+                    ], rows, empty_message="No teachers.")
+            else:
+                started = time.perf_counter()
+                proposals, left = app.assign_teachers(term, max_hours=args.max_hours, apply=args.apply)
+                elapsed = time.perf_counter() - started
+                for course_id, teacher_id in proposals:
+                    print(f"{course_id} -> {teacher_id}")
+                for course_id in left:
+                    print(f"[Warning]: {course_id}: no teacher without a clash within the hour limit", file=sys.stderr)
+                verb = "Assigned" if args.apply else "Proposed (not saved, use --apply)"
+                print(f"[Completed]: {verb} {len(proposals)} section(s), {len(left)} left unassigned, in {elapsed:.2f}s.")
+                return 1 if left else 0
+
+        elif args.command == "term":
+            started = time.perf_counter()
+            courses, schedules = app.rollover_term(args.source, args.target, keep_teachers=not args.clear_teachers,
+                                                   prefix=args.prefix, force=args.force)
+            print(f"[Success]: Copied {courses} course sections and {schedules} schedule entries from "
+                  f"{args.source[0]} semester {args.source[1]} to {args.target[0]} semester {args.target[1]} "
+                  f"in {time.perf_counter() - started:.2f}s.")
+
+        elif args.command == "archive":
+            if args.action == "run":
+                moved = app.archive_year(args.year, args.dir, force=args.force)
+                print(f"[Success]: Archived {args.year} to {app.archive_path(args.year, args.dir)}: "
+                      + ", ".join(f"{count} {table}" for table, count in moved.items()))
+            else:
+                for archive in app.archived_years():
+                    print(f"{archive['Year']}  {archive['Courses']:>6} courses {archive['Enrollments']:>8} enrollments  "
+                          f"{archive['ArchivedAt']}  {archive['Path']}")
+
+        elif args.command == "transcript":
+            student_id = app.get_student_id() if user['Role'].lower() == 'student' else args.student
+            if not student_id:
+                print("[Error]: StudentID is required", file=sys.stderr)
+                return 2
+            courses = app.fetch_student_courses(student_id, include_archives=True)
+            columns = ["Year", "Semester", "CourseID", "SubjectName", "ClassName", "Credits", "Grade"]
+            if args.format == 'json':
+                json.dump({"student": student_id, "courses": [{c: r[c] for c in columns} for r in courses]},
+                          sys.stdout, indent=2)
+                sys.stdout.write("\n")
+            elif args.format == 'csv':
+                writer = csv.writer(sys.stdout)
+                writer.writerow(columns)
+                writer.writerows([r[c] for c in columns] for r in courses)
+            else:
+                graded = [r for r in courses if r['Grade'] is not None]
+                earned = sum(r['Credits'] or 0 for r in graded if r['Grade'] >= PASS_GRADE)
+                print(f"TRANSCRIPT {student_id}")
+                app.render_table([
+                    ("Year", 'Year', 4),
+                    ("Sem", 'Semester', 3),
+                    ("CourseID", 'CourseID', 10),
+                    ("Subject", 'SubjectName', 25),
+                    ("Credits", 'Credits', 7),
+                    ("Grade", lambda r: r['Grade'] if r['Grade'] is not None else 'No grade', 8),
+                ], courses, empty_message="No courses.")
+                print(f"[Completed]: {len(courses)} course(s), {len(graded)} graded, {earned} credit(s) earned.")
+
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"[Error]: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
 if __name__ == "__main__":
-    app = StudentManagementSystem()
-    app.run()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""Replay recorded keystroke scripts through the interactive CLI.
+
+Each session runs StudentManagementSystem.run() in its own process with
+input()/getpass() patched to read from a script, timing every screen (the
+time between one answer and the next prompt). Many sessions run in parallel
+against one shared database, so lock contention shows up as it would with
+real admins and teachers:
+
+    python replay_sessions.py --db load.db --sessions 16 sessions/*.txt
+    python replay_sessions.py --record sessions/my_flow.txt --db load.db
+
+Script format: one answer per line, exactly as typed ("" = just Enter, written
+as an empty line). Lines starting with '#' are comments. A line of the form
+    ?<prompt text>=<answer>
+answers every consecutive prompt containing <prompt text> with <answer>
+(e.g. "?Enter new grade=7.5" grades a whole roster whatever its size).
+"""
+import argparse
+import builtins
+import getpass
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SECTION = re.compile(r"^-{3} (.+?) -{3}$")
+TITLE = re.compile(r"^[A-Z]{2,}\b")
+
+
+class ScriptExhausted(Exception):
+    pass
+
+
+def load_script(path):
+    steps = []
+    with open(path, encoding="utf-8") as f:
+        for line in f.read().splitlines():
+            if line.startswith("#"):
+                continue
+            if line.startswith("?") and "=" in line:
+                pattern, answer = line[1:].split("=", 1)
+                steps.append((pattern, answer))
+            else:
+                steps.append((None, line))
+    return steps
+
+
+class ScreenTracker:
+    """Stand-in for sys.stdout: remembers the current screen heading and recent lines"""
+
+    def __init__(self):
+        self.heading = "LOGIN"
+        self.new_screen = True
+        self.tail = []
+        self.db_errors = 0
+        self.locked = 0
+        self._partial = ""
+        self._after_rule = False
+        self._title_above = False
+
+    def write(self, text):
+        written = len(text)
+        lines = (self._partial + text.replace("\033[2J\033[H", "")).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            # Screens open with "====" / TITLE / "====", sub-screens with "--- TITLE ---"
+            stripped = line.strip()
+            match = SECTION.match(stripped)
+            is_title = False
+            if match:
+                self.heading, self.new_screen = match.group(1), True
+            elif self._after_rule and TITLE.match(stripped):
+                self.heading, self.new_screen, is_title = stripped, True, True
+            self._after_rule = line.startswith("====") and not self._title_above
+            self._title_above = is_title
+            if "[Database error]" in line:
+                self.db_errors += 1
+            if "database is locked" in line:
+                self.locked += 1
+            self.tail = (self.tail + [line])[-20:]
+        return written
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class Player:
+    """Feeds script answers to prompts and times each screen"""
+
+    def __init__(self, steps, screen, think_ms=0, rnd=None):
+        self.steps = steps
+        self.pos = 0
+        self.screen = screen
+        self.think = think_ms / 1000
+        self.rnd = rnd or random.Random()
+        self.timings = []  # (screen, prompt, ms)
+        self._last_answer = None
+        self._resumed = time.perf_counter()
+
+    def answer(self, prompt=""):
+        elapsed_ms = (time.perf_counter() - self._resumed) * 1000
+        prompt_text = (self.screen._partial + str(prompt)).strip()
+        self.screen._partial = ""
+        # Screens without a title of their own are named after the menu key that opened them
+        # (only short keys, so usernames and passwords never end up in the report)
+        label = self.screen.heading
+        if not self.screen.new_screen and self._last_answer is not None and len(self._last_answer) <= 2:
+            label += f" > {self._last_answer or 'Enter'}"
+        self.screen.new_screen = False
+        self.timings.append((label, prompt_text[-60:], elapsed_ms))
+        while self.pos < len(self.steps):
+            pattern, answer = self.steps[self.pos]
+            if pattern is None:
+                self.pos += 1
+                break
+            if pattern in prompt_text:
+                break
+            self.pos += 1  # repeat block finished; try the next step on this prompt
+        else:
+            raise ScriptExhausted(prompt_text)
+        if self.think:
+            time.sleep(self.rnd.uniform(0.5, 1.5) * self.think)
+        self._last_answer = answer
+        self._resumed = time.perf_counter()
+        return answer
+
+
+def run_session(job):
+    """Worker process: replay one script; returns a JSON-able result"""
+    app_file, db, script_path, think_ms, seed = job
+    spec = importlib.util.spec_from_file_location("sms_app", app_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    screen = ScreenTracker()
+    player = Player(load_script(script_path), screen, think_ms, random.Random(seed))
+    builtins.input = player.answer
+    getpass.getpass = player.answer
+    saved_stdout, sys.stdout = sys.stdout, screen
+    started = time.perf_counter()
+    status, detail = "ok", None
+    try:
+        module.StudentManagementSystem(db).run()
+    except SystemExit:
+        pass  # "2. Exit" on the login screen
+    except ScriptExhausted as e:
+        status, detail = "script_exhausted", f"no answer for prompt {str(e)!r}"
+    except sqlite3.OperationalError as e:
+        status, detail = "db_error", str(e)
+        screen.locked += "locked" in str(e)
+    except Exception as e:
+        status, detail = "error", f"{type(e).__name__}: {e}"
+    finally:
+        sys.stdout = saved_stdout
+    return {
+        "script": os.path.basename(script_path),
+        "status": status,
+        "detail": detail,
+        "db_errors": screen.db_errors,
+        "locked": screen.locked,
+        "wall_ms": (time.perf_counter() - started) * 1000,
+        "screens": player.timings,
+        "tail": screen.tail if status != "ok" else [],
+    }
+
+
+def summarize(results):
+    per_screen = {}
+    for result in results:
+        for heading, _, ms in result["screens"]:
+            per_screen.setdefault(heading, []).append(ms)
+    summary = {}
+    for heading, samples in sorted(per_screen.items()):
+        samples.sort()
+        summary[heading] = {
+            "n": len(samples),
+            "median_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max_ms": round(samples[-1], 3),
+        }
+    return summary
+
+
+def record(app_file, db, out_path):
+    """Run the CLI interactively and save every answer as a replayable script"""
+    spec = importlib.util.spec_from_file_location("sms_app", app_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    real_input, real_getpass = builtins.input, getpass.getpass
+    with open(out_path, "w", encoding="utf-8") as out:
+        out.write(f"# recorded {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+        def recorded(reader):
+            def ask(prompt=""):
+                answer = reader(prompt)
+                out.write(answer + "\n")
+                out.flush()
+                return answer
+            return ask
+
+        builtins.input, getpass.getpass = recorded(real_input), recorded(real_getpass)
+        try:
+            module.StudentManagementSystem(db).run()
+        except (SystemExit, KeyboardInterrupt, EOFError):
+            pass
+        finally:
+            builtins.input, getpass.getpass = real_input, real_getpass
+    print(f"[Success]: Script saved to {out_path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay keystroke scripts through the interactive CLI.")
+    parser.add_argument("scripts", nargs="*", help="session scripts (used round-robin)")
+    parser.add_argument("--app", default=os.path.join(HERE, "main_EN_1.0.3.py"))
+    parser.add_argument("--db", default="management_system.db", help="shared database for all sessions")
+    parser.add_argument("--sessions", type=int, default=1, help="total sessions to run")
+    parser.add_argument("--parallel", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause before each answer")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the full results as JSON")
+    parser.add_argument("--record", metavar="SCRIPT", help="record an interactive session instead")
+    args = parser.parse_args(argv)
+
+    app_file = os.path.abspath(args.app)
+    if args.record:
+        record(app_file, args.db, args.record)
+        return 0
+    if not args.scripts:
+        parser.error("at least one script is required")
+
+    jobs = [(app_file, args.db, args.scripts[i % len(args.scripts)], args.think_ms, args.seed + i)
+            for i in range(args.sessions)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(min(args.parallel, len(jobs))) as pool:
+        results = pool.map(run_session, jobs, chunksize=1)
+    wall = time.perf_counter() - started
+
+    summary = summarize(results)
+    failed = [r for r in results if r["status"] != "ok"]
+    print(f"{'screen':<40} {'n':>6} {'median':>10} {'p95':>10} {'max':>10}")
+    for heading, s in summary.items():
+        print(f"{heading[:40]:<40} {s['n']:>6} {s['median_ms']:>8.2f}ms {s['p95_ms']:>8.2f}ms {s['max_ms']:>8.2f}ms")
+    print(f"\n[Completed]: {len(results)} sessions in {wall:.2f}s, {len(failed)} failed, "
+          f"{sum(r['db_errors'] for r in results)} database errors shown to users, "
+          f"{sum(r['locked'] for r in results)} 'database is locked'")
+    for r in failed[:5]:
+        print(f"  {r['script']}: {r['status']}: {r['detail']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"wall_s": wall, "summary": summary, "sessions": results}, f, indent=2)
+        print(f"[Success]: Results saved to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""Shared fixtures: the app module (main_EN_1.0.3.py) and a seeded app on a scratch database."""
+import importlib.util
+import os
+
+import pytest
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main_EN_1.0.3.py")
+
+
+@pytest.fixture(scope="session")
+def sms():
+    spec = importlib.util.spec_from_file_location("sms_app", APP_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed(conn):
+    """Three subjects, one teacher, four students and two sections (with schedules) in 2024 semester 1"""
+    conn.executescript("""
+        INSERT INTO Subject VALUES ('SUB01', 'Calculus', 3), ('SUB02', 'Algebra', 3), ('SUB03', 'Analysis', 4);
+        INSERT INTO User VALUES ('ACC100', 'gv00001', '123456', 'Teacher One', 'Male', 1980, 't1@uth.edu.vn', 'teacher');
+        INSERT INTO Teacher VALUES ('GV00001', 'ACC100', 'IT');
+    """)
+    for i in range(1, 5):
+        conn.execute("INSERT INTO User VALUES (?, ?, '123456', ?, 'Female', 2004, ?, 'student')",
+                     (f"ACC20{i}", f"sv000000{i}", f"Student {i}", f"s{i}@uth.edu.vn"))
+        conn.execute("INSERT INTO Student VALUES (?, ?, 'IT')", (f"SV000000{i}", f"ACC20{i}"))
+    conn.executescript("""
+        INSERT INTO Course VALUES ('C241-00001', 'SUB01', 'GV00001', 'CS1', 2024, 1, 40, NULL);
+        INSERT INTO Course VALUES ('C241-00002', 'SUB02', 'GV00001', 'CS2', 2024, 1, 40, NULL);
+        INSERT INTO Schedule (CourseID, DayOfWeek, Start_Time, End_Time, Room) VALUES
+            ('C241-00001', 2, '07:00', '09:00', 'A101'),
+            ('C241-00001', 4, '07:00', '09:00', 'A101'),
+            ('C241-00002', 3, '13:00', '15:00', 'B202');
+    """)
+    conn.commit()
+
+
+@pytest.fixture
+def app(sms, tmp_path):
+    system = sms.StudentManagementSystem(str(tmp_path / "test.db"))
+    seed(system.conn)
+    yield system
+    system.conn.close()
@@ -0,0 +1,91 @@
+"""CourseGradeStats, kept online by _apply_grade_change(), against the same statistics computed from Enrollment."""
+import random
+
+import pytest
+
+COURSE = "C241-00001"
+
+
+def direct_stats(app, pass_grade):
+    return app.conn.execute("""
+        SELECT COUNT(Grade), AVG(Grade), SUM(Grade * Grade) - COUNT(Grade) * AVG(Grade) * AVG(Grade),
+               MIN(Grade), MAX(Grade), SUM(Grade >= ?)
+        FROM Enrollment WHERE CourseID = ? AND Grade IS NOT NULL
+    """, (pass_grade, COURSE)).fetchone()
+
+
+def assert_matches(app, sms):
+    count, mean, m2, low, high, passed = direct_stats(app, sms.PASS_GRADE)
+    stats = app.get_course_grade_stats(COURSE)
+    if not count:
+        assert stats is None
+        return
+    assert stats["count"] == count
+    assert stats["mean"] == pytest.approx(mean, abs=1e-9)
+    variance = m2 / (count - 1) if count > 1 else 0.0
+    assert stats["stddev"] ** 2 == pytest.approx(variance, abs=1e-9)
+    assert (stats["min"], stats["max"]) == (low, high)
+    assert stats["passed"] == passed
+
+
+def set_grade(app, student_id, grade):
+    old = app.conn.execute("SELECT Grade FROM Enrollment WHERE CourseID = ? AND StudentID = ?",
+                           (COURSE, student_id)).fetchone()
+    if old is None:
+        app.conn.execute("INSERT INTO Enrollment (CourseID, StudentID, Grade) VALUES (?, ?, ?)",
+                         (COURSE, student_id, grade))
+        old_grade = None
+    else:
+        app.conn.execute("UPDATE Enrollment SET Grade = ? WHERE CourseID = ? AND StudentID = ?",
+                         (grade, COURSE, student_id))
+        old_grade = old[0]
+    app._apply_grade_change(COURSE, old_grade, grade)
+
+
+def drop_enrollment(app, student_id):
+    old_grade = app.conn.execute("DELETE FROM Enrollment WHERE CourseID = ? AND StudentID = ? RETURNING Grade",
+                                 (COURSE, student_id)).fetchone()[0]
+    app._apply_grade_change(COURSE, old_grade, None)
+
+
+def test_inserts_updates_and_deletes(app, sms):
+    for student_id, grade in [("SV0000001", 8.5), ("SV0000002", 3.0), ("SV0000003", 10.0), ("SV0000004", 6.25)]:
+        set_grade(app, student_id, grade)
+        assert_matches(app, sms)
+    set_grade(app, "SV0000003", 5.0)  # the maximum moves down
+    assert_matches(app, sms)
+    set_grade(app, "SV0000002", 4.0)  # the minimum moves up and now passes
+    assert_matches(app, sms)
+    set_grade(app, "SV0000001", None)  # grade withdrawn, enrollment kept
+    assert_matches(app, sms)
+    drop_enrollment(app, "SV0000004")
+    assert_matches(app, sms)
+    drop_enrollment(app, "SV0000002")
+    assert_matches(app, sms)
+    drop_enrollment(app, "SV0000003")  # the last grade
+    assert_matches(app, sms)
+    assert tuple(app.conn.execute("SELECT Count, M2, MinGrade, MaxGrade, PassCount FROM CourseGradeStats "
+                            "WHERE CourseID = ?", (COURSE,)).fetchone()) == (0, 0, None, None, 0)
+    set_grade(app, "SV0000001", 7.0)  # graded again from empty
+    assert_matches(app, sms)
+
+
+def test_random_changes_match_rebuild(app, sms):
+    rng = random.Random(2024)
+    students = [f"SV000000{i}" for i in range(1, 5)]
+    for _ in range(500):
+        student_id = rng.choice(students)
+        enrolled = app.conn.execute("SELECT 1 FROM Enrollment WHERE CourseID = ? AND StudentID = ?",
+                                    (COURSE, student_id)).fetchone()
+        if enrolled and rng.random() < 0.2:
+            drop_enrollment(app, student_id)
+        else:
+            set_grade(app, student_id, rng.choice([None, round(rng.uniform(0, 10), 2), 0.0, 10.0]))
+        assert_matches(app, sms)
+    online = app.get_course_grade_stats(COURSE)
+    app.rebuild_course_grade_stats()
+    rebuilt = app.get_course_grade_stats(COURSE)
+    if online is None:
+        assert rebuilt is None
+    else:
+        assert online == pytest.approx(rebuilt, abs=1e-9)
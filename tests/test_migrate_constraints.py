@@ -0,0 +1,130 @@
+"""Opening a database created before SCHEMA_VERSION 1 rebuilds it with the constraints (_migrate_constraints)."""
+import json
+import sqlite3
+
+import pytest
+
+from conftest import seed
+
+# Tables as the baseline release created them: no CHECK or UNIQUE constraints, user_version 0
+BASELINE_SCHEMA = """
+    CREATE TABLE User (AccountID TEXT PRIMARY KEY, UserName TEXT UNIQUE, PassWord TEXT, FullName TEXT,
+                       Sex TEXT, YearOfBirth INT, Email TEXT, Role TEXT);
+    CREATE TABLE Student (StudentID TEXT PRIMARY KEY, AccountID TEXT, Major TEXT,
+                          FOREIGN KEY(AccountID) REFERENCES User(AccountID) ON DELETE CASCADE);
+    CREATE TABLE Teacher (TeacherID TEXT PRIMARY KEY, AccountID TEXT, InstituteName TEXT,
+                          FOREIGN KEY(AccountID) REFERENCES User(AccountID) ON DELETE CASCADE);
+    CREATE TABLE Admin (AdminID TEXT PRIMARY KEY, AccountID TEXT,
+                        FOREIGN KEY(AccountID) REFERENCES User(AccountID) ON DELETE CASCADE);
+    CREATE TABLE Subject (SubjectID TEXT PRIMARY KEY, SubjectName TEXT, Credits INTEGER);
+    CREATE TABLE Course (CourseID TEXT PRIMARY KEY, SubjectID TEXT, TeacherID TEXT, ClassName TEXT,
+                         Year INTEGER, Semester INTEGER, ClassSize INTEGER DEFAULT 50, Description TEXT,
+                         FOREIGN KEY(SubjectID) REFERENCES Subject(SubjectID),
+                         FOREIGN KEY(TeacherID) REFERENCES Teacher(TeacherID));
+    CREATE TABLE Schedule (ScheduleID INTEGER PRIMARY KEY AUTOINCREMENT, CourseID TEXT, DayOfWeek INTEGER,
+                           Start_Time TEXT, End_Time TEXT, Room TEXT,
+                           FOREIGN KEY(CourseID) REFERENCES Course(CourseID) ON DELETE CASCADE);
+    CREATE TABLE Enrollment (EnrollID INTEGER PRIMARY KEY AUTOINCREMENT, CourseID TEXT, StudentID TEXT, Grade REAL,
+                             FOREIGN KEY(CourseID) REFERENCES Course(CourseID),
+                             FOREIGN KEY(StudentID) REFERENCES Student(StudentID));
+"""
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    seed(conn)
+    conn.executescript("""
+        INSERT INTO Course VALUES ('C243-00001', 'SUB01', 'GV00001', 'CS9', 2024, 3, 40, NULL);
+        INSERT INTO Course VALUES ('C241-00003', 'SUB03', 'GV00001', 'CS3', 2024, 1, 0, NULL);
+        INSERT INTO Schedule (CourseID, DayOfWeek, Start_Time, End_Time, Room) VALUES
+            ('C241-00002', 9, '07:00', '09:00', 'B202');
+        INSERT INTO Enrollment (EnrollID, CourseID, StudentID, Grade) VALUES
+            (1, 'C241-00001', 'SV0000001', 8.0),
+            (2, 'C241-00001', 'SV0000002', 12.0),  -- out of range
+            (3, 'C241-00001', 'SV0000003', NULL),  -- duplicate, the graded row 4 is kept
+            (4, 'C241-00001', 'SV0000003', 7.0),
+            (5, 'C241-00001', 'SV0000004', 5.0),   -- duplicate, the newer graded row 6 is kept
+            (6, 'C241-00001', 'SV0000004', 6.0),
+            (7, 'C241-00001', 'SV0000004', NULL),  -- duplicate, ungraded
+            (8, 'C241-00002', 'SV0000001', -1.0);  -- out of range
+    """)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_violating_rows_are_moved_to_schema_rejects(sms, baseline_db, capsys):
+    app = sms.StudentManagementSystem(baseline_db)
+    try:
+        conn = app.conn
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == sms.SCHEMA_VERSION
+        assert [r[0] for r in conn.execute("SELECT CourseID FROM Course ORDER BY CourseID")] == \
+            ["C241-00001", "C241-00002"]
+        assert [tuple(r) for r in conn.execute("SELECT CourseID, DayOfWeek FROM Schedule ORDER BY ScheduleID")] == \
+            [("C241-00001", 2), ("C241-00001", 4), ("C241-00002", 3)]
+        assert [tuple(r) for r in conn.execute("SELECT EnrollID, StudentID, Grade FROM Enrollment ORDER BY EnrollID")] == \
+            [(1, "SV0000001", 8.0), (4, "SV0000003", 7.0), (6, "SV0000004", 6.0)]
+
+        rejects = [(r["TableName"], r["Reason"], json.loads(r["RowData"]))
+                   for r in conn.execute("SELECT TableName, Reason, RowData FROM SchemaRejects ORDER BY RejectID")]
+        assert [(table, reason, row.get("CourseID"), row.get("EnrollID")) for table, reason, row in rejects] == [
+            ("Course", "semester not 1 or 2", "C243-00001", None),
+            ("Course", "class size not positive", "C241-00003", None),
+            ("Schedule", "day of week not 1-7", "C241-00002", None),
+            ("Enrollment", "grade not 0-10", "C241-00001", 2),
+            ("Enrollment", "grade not 0-10", "C241-00002", 8),
+            ("Enrollment", "duplicate enrollment", "C241-00001", 3),
+            ("Enrollment", "duplicate enrollment", "C241-00001", 5),
+            ("Enrollment", "duplicate enrollment", "C241-00001", 7),
+        ]
+        assert rejects[3][2]["Grade"] == 12.0
+
+        err = capsys.readouterr().err
+        assert "moved 2 Course row(s) to SchemaRejects" not in err  # one line per reason
+        assert "moved 1 Course row(s) to SchemaRejects: semester not 1 or 2" in err
+        assert "moved 1 Course row(s) to SchemaRejects: class size not positive" in err
+        assert "moved 1 Schedule row(s) to SchemaRejects: day of week not 1-7" in err
+        assert "moved 2 Enrollment row(s) to SchemaRejects: grade not 0-10" in err
+        assert "moved 3 Enrollment row(s) to SchemaRejects: duplicate enrollment" in err
+        assert "sms db check" in err
+
+        # Derived tables are rebuilt from what was kept
+        stats = app.get_course_grade_stats("C241-00001")
+        assert (stats["count"], stats["min"], stats["max"]) == (3, 6.0, 8.0)
+
+        # and the constraints hold from now on
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO Enrollment (CourseID, StudentID) VALUES ('C241-00001', 'SV0000001')")
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("UPDATE Enrollment SET Grade = 10.5 WHERE EnrollID = 1")
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("UPDATE Course SET Semester = 3 WHERE CourseID = 'C241-00001'")
+    finally:
+        app.conn.close()
+
+    # Upgraded once: opening it again changes nothing
+    again = sms.StudentManagementSystem(baseline_db)
+    try:
+        assert capsys.readouterr().err == ""
+        assert again.conn.execute("SELECT COUNT(*) FROM SchemaRejects").fetchone()[0] == len(rejects)
+    finally:
+        again.conn.close()
+
+
+def test_clean_database_is_upgraded_without_rejects(sms, tmp_path, capsys):
+    path = str(tmp_path / "clean.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    seed(conn)
+    conn.close()
+    app = sms.StudentManagementSystem(path)
+    try:
+        assert app.conn.execute("PRAGMA user_version").fetchone()[0] == sms.SCHEMA_VERSION
+        assert app.conn.execute("SELECT COUNT(*) FROM SchemaRejects").fetchone()[0] == 0
+        assert app.conn.execute("SELECT COUNT(*) FROM Schedule").fetchone()[0] == 3
+        assert "SchemaRejects" not in capsys.readouterr().err
+    finally:
+        app.conn.close()
@@ -0,0 +1,50 @@
+"""Prerequisite edges, the PrerequisiteClosure kept by add/remove_prerequisite() and missing_prerequisites()."""
+import pytest
+
+
+def closure(app):
+    return {tuple(r) for r in app.conn.execute("SELECT SubjectID, RequiredID FROM PrerequisiteClosure")}
+
+
+def test_closure_follows_edges(app):
+    # SUB03 needs SUB02 needs SUB01; added out of order
+    assert app.add_prerequisite("SUB03", "SUB02")
+    assert app.add_prerequisite("SUB02", "SUB01")
+    assert not app.add_prerequisite("SUB02", "SUB01")
+    assert closure(app) == {("SUB03", "SUB02"), ("SUB02", "SUB01"), ("SUB03", "SUB01")}
+    online = closure(app)
+    app.rebuild_prerequisite_closure()
+    assert closure(app) == online
+
+    assert app.remove_prerequisite("SUB02", "SUB01")
+    assert not app.remove_prerequisite("SUB02", "SUB01")
+    assert closure(app) == {("SUB03", "SUB02")}
+
+
+def test_cycles_are_rejected(app):
+    app.add_prerequisite("SUB03", "SUB02")
+    app.add_prerequisite("SUB02", "SUB01")
+    with pytest.raises(ValueError, match="cycle"):
+        app.add_prerequisite("SUB01", "SUB03")  # closes SUB01 -> SUB03 -> SUB02 -> SUB01
+    with pytest.raises(ValueError, match="cycle"):
+        app.add_prerequisite("SUB02", "SUB03")
+    with pytest.raises(ValueError, match="its own prerequisite"):
+        app.add_prerequisite("SUB01", "SUB01")
+    with pytest.raises(ValueError, match="not found"):
+        app.add_prerequisite("SUB01", "SUB99")
+    assert closure(app) == {("SUB03", "SUB02"), ("SUB02", "SUB01"), ("SUB03", "SUB01")}
+    assert not app.conn.in_transaction
+
+
+def test_missing_prerequisites(app):
+    app.add_prerequisite("SUB03", "SUB02")
+    app.add_prerequisite("SUB02", "SUB01")
+    assert app.missing_prerequisites("SV0000001", "SUB03") == ["SUB01", "SUB02"]
+    assert app.missing_prerequisites("SV0000001", "SUB01") == []
+
+    # PassedSubject follows the grade: a pass in SUB01 (course C241-00001) counts, a failing regrade takes it back
+    app.conn.execute("INSERT INTO Enrollment (CourseID, StudentID, Grade) VALUES ('C241-00001', 'SV0000001', 8.0)")
+    assert app.missing_prerequisites("SV0000001", "SUB03") == ["SUB02"]
+    assert app.missing_prerequisites("SV0000002", "SUB03") == ["SUB01", "SUB02"]
+    app.conn.execute("UPDATE Enrollment SET Grade = 2.0 WHERE StudentID = 'SV0000001'")
+    assert app.missing_prerequisites("SV0000001", "SUB03") == ["SUB01", "SUB02"]
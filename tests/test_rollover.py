@@ -0,0 +1,58 @@
+"""rollover_term(): course sections and their schedules cloned into another term."""
+import pytest
+
+SOURCE = (2024, 1)
+TARGET = (2024, 2)
+
+
+def sections(app, term):
+    return [tuple(r) for r in app.conn.execute(
+        "SELECT CourseID, SubjectID, TeacherID, ClassName, ClassSize FROM Course WHERE Year = ? AND Semester = ? "
+        "ORDER BY CourseID", term)]
+
+
+def schedules(app, term):
+    return [tuple(r) for r in app.conn.execute("""
+        SELECT s.CourseID, s.DayOfWeek, s.Start_Time, s.End_Time, s.Room FROM Schedule s
+        JOIN Course c ON c.CourseID = s.CourseID WHERE c.Year = ? AND c.Semester = ?
+        ORDER BY s.CourseID, s.ScheduleID""", term)]
+
+
+def test_round_trip(app):
+    before = sections(app, SOURCE), schedules(app, SOURCE)
+    assert app.rollover_term(SOURCE, TARGET) == (2, 3)
+
+    assert sections(app, TARGET) == [("C242-00001", "SUB01", "GV00001", "CS1", 40),
+                                     ("C242-00002", "SUB02", "GV00001", "CS2", 40)]
+    assert schedules(app, TARGET) == [("C242-00001", 2, "07:00", "09:00", "A101"),
+                                      ("C242-00001", 4, "07:00", "09:00", "A101"),
+                                      ("C242-00002", 3, "13:00", "15:00", "B202")]
+    assert (sections(app, SOURCE), schedules(app, SOURCE)) == before
+    assert app.conn.execute("SELECT COUNT(*) FROM Enrollment").fetchone()[0] == 0
+    assert not app.conn.execute("SELECT 1 FROM temp.sqlite_master WHERE name = 'RolloverMap'").fetchone()
+
+    # and back into a third term: the copies carry everything the originals did
+    assert app.rollover_term(TARGET, (2025, 1)) == (2, 3)
+    assert [row[1:] for row in sections(app, (2025, 1))] == [row[1:] for row in before[0]]
+    assert [row[1:] for row in schedules(app, (2025, 1))] == [row[1:] for row in before[1]]
+
+
+def test_filled_target_needs_force(app):
+    app.rollover_term(SOURCE, TARGET)
+    with pytest.raises(ValueError, match="already has 2 course section"):
+        app.rollover_term(SOURCE, TARGET)
+    assert len(sections(app, TARGET)) == 2
+
+    # force adds a second set, numbered after the first
+    assert app.rollover_term(SOURCE, TARGET, force=True) == (2, 3)
+    assert [row[0] for row in sections(app, TARGET)] == ["C242-00001", "C242-00002", "C242-00003", "C242-00004"]
+    assert len(schedules(app, TARGET)) == 6
+
+
+def test_options_and_errors(app):
+    assert app.rollover_term(SOURCE, TARGET, keep_teachers=False, prefix="R-") == (2, 3)
+    assert [(row[0], row[2]) for row in sections(app, TARGET)] == [("R-00001", None), ("R-00002", None)]
+    with pytest.raises(ValueError, match="same"):
+        app.rollover_term(SOURCE, SOURCE)
+    with pytest.raises(ValueError, match="no course sections"):
+        app.rollover_term((2030, 1), (2030, 2))